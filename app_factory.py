@@ -0,0 +1,344 @@
+"""
+Application factory for Quantum Panel Bot
+Builds the telegram Application and registers every handler, shared by the
+polling entry point (main.py) and the webhook apps (flask_app.py, asgi_app.py).
+Rarely used admin handlers (logs, exports, emergency tools) are imported on
+first use so a cold worker serves its first update sooner
+"""
+
+import logging
+import time
+
+# Handler import time is measured from here; startup itself is timed from
+# the entry point (see build_application)
+IMPORT_STARTED_AT = time.monotonic()
+
+from telegram import Update
+from telegram.ext import (
+    Application,
+    CommandHandler,
+    CallbackQueryHandler,
+    MessageHandler,
+    ConversationHandler,
+    TypeHandler,
+    filters
+)
+
+# Import configuration
+from config import (
+    BOT_TOKEN, CONCURRENT_UPDATES, REAPER_INTERVAL,
+    WAITING_SELLER_ID, WAITING_PRODUCT_NAME, WAITING_PRODUCT_DESC,
+    WAITING_PRODUCT_IMAGE, WAITING_PRODUCT_SELLERS, WAITING_BROADCAST_MESSAGE,
+    WAITING_BLOCK_USER_ID, WAITING_UNBLOCK_USER_ID, WAITING_REMOVE_SELLER_ID,
+    WAITING_ASSIGN_PRODUCT_SELLERS, WAITING_REMOVE_SELLER_FROM_PRODUCT
+)
+
+# Import handlers (admin_handlers_part2 is loaded lazily, see PART2)
+from handlers import (
+    # User handlers
+    start, buy_keys_callback, product_selection_callback,
+    connect_with_seller_callback, accept_request_callback, take_next_customer_callback,
+    handle_message, stop, track_user_profile, gatekeep,
+    # Seller handlers
+    seller_panel, open_seller_panel_callback, seller_stats_callback,
+    seller_products_callback, seller_active_chat_callback, chats_command, seller_focus_callback,
+    seller_end_chat_callback,
+    seller_toggle_alerts_callback, seller_help_callback,
+    # Admin handlers
+    admin_panel, open_admin_panel_callback, admin_manage_sellers_callback,
+    admin_view_sellers_callback, admin_manage_products_callback, admin_remove_product_callback,
+    confirm_remove_product_callback, admin_view_products_callback,
+    admin_assign_sellers_callback, admin_remove_seller_product_callback,
+    admin_broadcast_callback, broadcast_cancel_callback, admin_global_stats_callback,
+    admin_monitor_sessions_callback, force_stop_session_callback, admin_back_callback
+)
+from handlers.admin_handlers import (
+    admin_select_product_add_seller_callback,
+    admin_select_product_remove_seller_callback,
+    admin_select_product_view_sellers_callback
+)
+
+# Import conversation handlers
+from conversations import (
+    admin_add_seller_callback, receive_seller_id,
+    admin_remove_seller_callback, receive_remove_seller_id,
+    admin_add_product_callback, receive_product_name,
+    receive_product_desc, receive_product_image, receive_product_sellers,
+    select_product_assign_callback, receive_assign_sellers,
+    select_product_remove_seller_callback, receive_remove_seller_from_product,
+    broadcast_users_callback, broadcast_sellers_callback,
+    broadcast_everyone_callback, receive_broadcast_message,
+    emergency_block_user_callback, receive_block_user_id,
+    emergency_unblock_user_callback, receive_unblock_user_id,
+    cancel
+)
+
+from utils import start_background_tasks, stop_background_tasks, create_rate_limiter, reap_idle
+from utils.callback_router import CallbackRouter, lazy_callback
+from utils.update_processor import PerUserUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Logs, exports and emergency tools
+PART2 = "handlers.admin_handlers_part2"
+
+IMPORTED_AT = time.monotonic()
+
+# ====================================================
+#                 STARTUP TIMING
+# ====================================================
+
+_first_update_seen = False
+# time.monotonic() at the top of the entry point, set by build_application
+_started_at = IMPORT_STARTED_AT
+
+async def _log_first_update(update, context):
+    """Log how long after startup the first update reached the handlers"""
+    global _first_update_seen
+    if _first_update_seen:
+        return
+    _first_update_seen = True
+    logger.info(
+        f"Time to first update: {time.monotonic() - _started_at:.2f}s "
+        f"(update {update.update_id})"
+    )
+
+# ====================================================
+#                HANDLER REGISTRATION
+# ====================================================
+
+def register_handlers(application):
+    """Register every command, callback and conversation handler on the application"""
+    # Run first (groups -3 to -1) for every update. The gatekeeper stops updates
+    # from blocked or flooding users; the others never stop an update
+    application.add_handler(TypeHandler(Update, _log_first_update), group=-3)
+    application.add_handler(TypeHandler(Update, gatekeep), group=-2)
+    application.add_handler(TypeHandler(Update, track_user_profile), group=-1)
+
+    # ====================================================
+    #            COMMAND HANDLERS
+    # ====================================================
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("stop", stop))
+    application.add_handler(CommandHandler("seller", seller_panel))
+    application.add_handler(CommandHandler("chats", chats_command))
+    application.add_handler(CommandHandler("admin", admin_panel))
+
+    # ====================================================
+    #            CALLBACK QUERIES
+    # ====================================================
+    router = CallbackRouter()
+
+    # User flow
+    router.add("user", "buy", buy_keys_callback)
+    router.add("user", "product", product_selection_callback)
+    router.add("user", "connect", connect_with_seller_callback)
+    router.add("req", "accept", accept_request_callback)
+    router.add("req", "next", take_next_customer_callback)
+
+    # Admin/Seller panel quick access
+    router.add("admin", "open", open_admin_panel_callback)
+    router.add("seller", "open", open_seller_panel_callback)
+
+    # Seller panel
+    router.add("seller", "stats", seller_stats_callback)
+    router.add("seller", "products", seller_products_callback)
+    router.add("seller", "chat", seller_active_chat_callback)
+    router.add("seller", "focus", seller_focus_callback)
+    router.add("seller", "end", seller_end_chat_callback)
+    router.add("seller", "alerts", seller_toggle_alerts_callback)
+    router.add("seller", "help", seller_help_callback)
+
+    # Admin panel
+    router.add("admin", "sellers", admin_manage_sellers_callback)
+    router.add("admin", "products", admin_manage_products_callback)
+    router.add("admin", "broadcast", admin_broadcast_callback)
+    router.add("admin", "stats", admin_global_stats_callback)
+    router.add("admin", "sessions", admin_monitor_sessions_callback)
+    router.add("admin", "logs", lazy_callback(PART2, "admin_logs_callback"))
+    router.add("admin", "export", lazy_callback(PART2, "admin_export_callback"))
+    router.add("admin", "emergency", lazy_callback(PART2, "admin_emergency_callback"))
+    router.add("admin", "back", admin_back_callback)
+    router.add("broadcast", "cancel", broadcast_cancel_callback)
+
+    # Manage sellers
+    router.add("sellers", "pick_add", admin_select_product_add_seller_callback)
+    router.add("sellers", "pick_remove", admin_select_product_remove_seller_callback)
+    router.add("sellers", "pick_view", admin_select_product_view_sellers_callback)
+    router.add("sellers", "view", admin_view_sellers_callback)
+
+    # Manage products
+    router.add("products", "view", admin_view_products_callback)
+    router.add("products", "pick_remove", admin_remove_product_callback)
+    router.add("products", "remove", confirm_remove_product_callback)
+    router.add("products", "pick_assign", admin_assign_sellers_callback)
+    router.add("products", "pick_unassign", admin_remove_seller_product_callback)
+
+    # Monitor sessions
+    router.add("sessions", "stop", force_stop_session_callback)
+
+    # Logs
+    router.add("logs", "chats", lazy_callback(PART2, "view_chat_logs_callback"))
+    router.add("logs", "sellers", lazy_callback(PART2, "view_seller_performance_callback"))
+
+    # Export
+    router.add("export", "users", lazy_callback(PART2, "export_users_callback"))
+    router.add("export", "sellers", lazy_callback(PART2, "export_sellers_callback"))
+    router.add("export", "products", lazy_callback(PART2, "export_products_callback"))
+    router.add("export", "chats", lazy_callback(PART2, "export_chats_callback"))
+
+    # Emergency tools (logs, exports and emergency tools load on first use)
+    router.add("emergency", "disable_buy", lazy_callback(PART2, "emergency_disable_buy_callback"))
+    router.add("emergency", "enable_buy", lazy_callback(PART2, "emergency_enable_buy_callback"))
+
+    # One handler for every route above: a dict lookup instead of ~45 regexes
+    application.add_handler(router.handler())
+
+    # ====================================================
+    #            CONVERSATION HANDLERS
+    # ====================================================
+
+    # Add seller conversation
+    add_seller_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(admin_add_seller_callback, pattern=CallbackRouter.matches("sellers", "add"))],
+        states={
+            WAITING_SELLER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_seller_id)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(add_seller_conv)
+
+    # Remove seller conversation
+    remove_seller_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(admin_remove_seller_callback, pattern=CallbackRouter.matches("sellers", "remove"))],
+        states={
+            WAITING_REMOVE_SELLER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_remove_seller_id)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(remove_seller_conv)
+
+    # Add product conversation
+    add_product_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(admin_add_product_callback, pattern=CallbackRouter.matches("products", "add"))],
+        states={
+            WAITING_PRODUCT_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_product_name)],
+            WAITING_PRODUCT_DESC: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_product_desc)],
+            WAITING_PRODUCT_IMAGE: [MessageHandler(filters.PHOTO, receive_product_image)],
+            WAITING_PRODUCT_SELLERS: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_product_sellers)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(add_product_conv)
+
+    # Assign sellers to product conversation
+    assign_sellers_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(select_product_assign_callback, pattern=CallbackRouter.matches("products", "assign"))],
+        states={
+            WAITING_ASSIGN_PRODUCT_SELLERS: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_assign_sellers)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(assign_sellers_conv)
+
+    # Remove seller from product conversation
+    remove_seller_product_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(select_product_remove_seller_callback, pattern=CallbackRouter.matches("products", "unassign"))],
+        states={
+            WAITING_REMOVE_SELLER_FROM_PRODUCT: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_remove_seller_from_product)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(remove_seller_product_conv)
+
+    # Broadcast conversation
+    broadcast_conv = ConversationHandler(
+        entry_points=[
+            CallbackQueryHandler(broadcast_users_callback, pattern=CallbackRouter.matches("broadcast", "users")),
+            CallbackQueryHandler(broadcast_sellers_callback, pattern=CallbackRouter.matches("broadcast", "sellers")),
+            CallbackQueryHandler(broadcast_everyone_callback, pattern=CallbackRouter.matches("broadcast", "everyone"))
+        ],
+        states={
+            WAITING_BROADCAST_MESSAGE: [
+                MessageHandler((filters.TEXT | filters.PHOTO) & ~filters.COMMAND, receive_broadcast_message)
+            ]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(broadcast_conv)
+
+    # Block user conversation
+    block_user_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(emergency_block_user_callback, pattern=CallbackRouter.matches("emergency", "block"))],
+        states={
+            WAITING_BLOCK_USER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_block_user_id)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(block_user_conv)
+
+    # Unblock user conversation
+    unblock_user_conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(emergency_unblock_user_callback, pattern=CallbackRouter.matches("emergency", "unblock"))],
+        states={
+            WAITING_UNBLOCK_USER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_unblock_user_id)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)]
+    )
+    application.add_handler(unblock_user_conv)
+
+    # ====================================================
+    #            REGULAR MESSAGE HANDLER (MUST BE LAST)
+    # ====================================================
+    application.add_handler(MessageHandler(
+        (filters.TEXT | filters.PHOTO | filters.Document.ALL | filters.VOICE | filters.VIDEO) & ~filters.COMMAND,
+        handle_message
+    ))
+
+# ====================================================
+#                APPLICATION FACTORY
+# ====================================================
+
+def schedule_jobs(application):
+    """Schedule repeating jobs; they run while the application is started"""
+    if application.job_queue is None:
+        logger.warning("JobQueue unavailable (install python-telegram-bot[job-queue]): idle sessions won't expire")
+        return
+    application.job_queue.run_repeating(reap_idle, interval=REAPER_INTERVAL, first=REAPER_INTERVAL, name="reap_idle")
+
+async def _post_init(application):
+    """Start background work (media pre-warm, profile refresh) once the bot is initialized"""
+    await start_background_tasks(application.bot)
+
+async def _post_shutdown(application):
+    """Cancel background work on shutdown"""
+    await stop_background_tasks()
+
+def build_application(webhook=False, started_at=None):
+    """Build the Application with every handler registered.
+    Updates run concurrently, in order per user. In webhook mode there is no
+    updater and the caller starts/stops the background tasks itself.
+    started_at is time.monotonic() taken first thing in the entry point, so
+    the startup timings include its imports (defaults to this module's import)"""
+    global _started_at
+    if started_at is not None:
+        _started_at = started_at
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES))
+        .rate_limiter(create_rate_limiter())
+    )
+    if webhook:
+        builder = builder.updater(None)
+    else:
+        builder = builder.post_init(_post_init).post_shutdown(_post_shutdown)
+
+    application = builder.build()
+    register_handlers(application)
+    schedule_jobs(application)
+    logger.info(
+        f"Application built {(time.monotonic() - _started_at) * 1000:.0f} ms after startup "
+        f"(handler imports {(IMPORTED_AT - IMPORT_STARTED_AT) * 1000:.0f} ms)"
+    )
+    return application
@@ -0,0 +1,204 @@
+"""
+ASGI Webhook Application for the Quantum Panel Telegram Bot
+Async alternative to flask_app.py that processes updates concurrently
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+"""
+
+import time
+
+# Startup timings in app_factory are measured from here
+STARTED_AT = time.monotonic()
+
+import json
+import logging
+
+from telegram import Update
+
+from app_factory import build_application
+from config import SECRET_PATH, WEBHOOK_URL, UPDATE_DEDUP_SIZE
+from utils import start_background_tasks, stop_background_tasks, gatekeeper, seller_router, wait_queue
+from utils.dedup import UpdateDeduplicator
+from utils.relay import relay_stats
+from utils.session_reaper import reaper_stats
+
+logger = logging.getLogger(__name__)
+
+# ====================================================
+#              INITIALIZE BOT APPLICATION
+# ====================================================
+
+# Webhook mode: no updater, updates are put on the update queue by the
+# webhook route and dispatched concurrently, in order per user
+application = build_application(webhook=True, started_at=STARTED_AT)
+
+# Recently seen update IDs, used to drop Telegram redeliveries
+update_dedup = UpdateDeduplicator(UPDATE_DEDUP_SIZE)
+
+# ====================================================
+#                 RESPONSE HELPERS
+# ====================================================
+
+async def _read_body(receive):
+    """Read the full request body from the ASGI receive channel"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+async def _send_response(send, status, body, content_type):
+    """Send a complete HTTP response"""
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type)]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _send_text(send, status, text):
+    """Send a plain text response"""
+    await _send_response(send, status, text.encode("utf-8"), b"text/plain; charset=utf-8")
+
+async def _send_json(send, status, data):
+    """Send a JSON response"""
+    await _send_response(send, status, json.dumps(data, default=str).encode("utf-8"), b"application/json")
+
+# ====================================================
+#                      ROUTES
+# ====================================================
+
+async def index(scope, receive, send):
+    """Health check endpoint"""
+    await _send_text(send, 200, "Quantum Panel Bot is running (ASGI)!")
+
+async def webhook(scope, receive, send):
+    """
+    Handle incoming webhook updates from Telegram
+    The update is queued and acknowledged immediately; the application
+    processes up to CONCURRENT_UPDATES updates at the same time.
+    Redelivered update IDs are acknowledged without being processed again
+    """
+    if scope["method"] != "POST":
+        await _send_text(send, 405, "Method Not Allowed")
+        return
+
+    update_id = None
+    try:
+        json_data = json.loads(await _read_body(receive))
+        update_id = json_data.get("update_id")
+        if not update_dedup.seen(update_id):
+            update = Update.de_json(json_data, application.bot)
+            await application.update_queue.put(update)
+        await _send_text(send, 200, "OK")
+    except Exception as e:
+        logger.error(f"Error processing webhook: {e}", exc_info=True)
+        update_dedup.forget(update_id)
+        await _send_text(send, 500, "Error")
+
+async def set_webhook(scope, receive, send):
+    """Register the webhook with Telegram"""
+    try:
+        await application.bot.set_webhook(url=WEBHOOK_URL)
+        await _send_text(send, 200, f"✅ Webhook set successfully to: {WEBHOOK_URL}")
+    except Exception as e:
+        logger.error(f"Failed to set webhook: {e}", exc_info=True)
+        await _send_text(send, 500, f"❌ Error setting webhook: {str(e)}")
+
+async def delete_webhook(scope, receive, send):
+    """Delete webhook (useful for debugging or switching back to polling)"""
+    try:
+        await application.bot.delete_webhook()
+        await _send_text(send, 200, "✅ Webhook deleted successfully")
+    except Exception as e:
+        logger.error(f"Failed to delete webhook: {e}", exc_info=True)
+        await _send_text(send, 500, f"❌ Error deleting webhook: {str(e)}")
+
+async def webhook_info(scope, receive, send):
+    """Check current webhook configuration"""
+    try:
+        info = await application.bot.get_webhook_info()
+        await _send_json(send, 200, {
+            'url': info.url,
+            'has_custom_certificate': info.has_custom_certificate,
+            'pending_update_count': info.pending_update_count,
+            'last_error_date': info.last_error_date,
+            'last_error_message': info.last_error_message,
+            'max_connections': info.max_connections,
+            'allowed_updates': info.allowed_updates
+        })
+    except Exception as e:
+        logger.error(f"Failed to get webhook info: {e}", exc_info=True)
+        await _send_json(send, 500, {'error': str(e)})
+
+async def webhook_stats(scope, receive, send):
+    """Report processing, de-duplication, gatekeeper and outbound counters"""
+    await _send_json(send, 200, {
+        'in_flight': application.update_processor.current_concurrent_updates,
+        'active_users': application.update_processor.active_lanes,
+        'dedup': update_dedup.stats(),
+        'outbound': {**application.bot.rate_limiter.stats, 'queued': application.bot.rate_limiter.queued},
+        'relay': relay_stats,
+        'gatekeeper': gatekeeper.stats,
+        'routing': seller_router.stats,
+        'wait_queue': dict(wait_queue.stats, waiting=len(wait_queue)),
+        'reaper': reaper_stats
+    })
+
+ROUTES = {
+    "/": index,
+    f"/{SECRET_PATH}": webhook,
+    "/set_webhook": set_webhook,
+    "/delete_webhook": delete_webhook,
+    "/webhook_info": webhook_info,
+    "/webhook_stats": webhook_stats
+}
+
+# ====================================================
+#                 ASGI APPLICATION
+# ====================================================
+
+async def lifespan(scope, receive, send):
+    """Initialize and start the bot on server startup, stop it on shutdown"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await application.initialize()
+                await application.start()
+                await start_background_tasks(application.bot)
+                logger.info("Quantum Panel bot ASGI app started")
+                await send({"type": "lifespan.startup.complete"})
+            except Exception as e:
+                logger.error(f"Failed to start application: {e}", exc_info=True)
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+        elif message["type"] == "lifespan.shutdown":
+            await stop_background_tasks()
+            await application.stop()
+            await application.shutdown()
+            logger.info("Quantum Panel bot ASGI app stopped")
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+        return
+
+    if scope["type"] != "http":
+        return
+
+    route = ROUTES.get(scope["path"])
+    if route is None:
+        await _send_text(send, 404, "Not Found")
+        return
+    await route(scope, receive, send)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,3 @@
+"""
+Micro-benchmarks for Quantum Panel Bot
+"""
@@ -0,0 +1,111 @@
+"""
+Stress test: concurrent request acceptance
+Every seller taps Accept on every pending request at the same time, mixed
+with Take Next Customer taps, while each Bot API call yields to the event
+loop so the handlers interleave. Checks that each request ends up in exactly
+one session, no seller goes over their session limit, the session maps agree
+and every request notification is closed.
+
+Run from the project root (uses a throwaway database):
+    python -m benchmarks.accept_race
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+import config
+
+config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "accept_race.db")
+SELLER_IDS = list(range(900001, 900021))
+config.ADMINS.extend(SELLER_IDS)
+
+from handlers.user_handlers import accept_request_callback, take_next_customer_callback
+from utils import active_sessions, catalog, reverse_sessions, seller_router, wait_queue
+from utils.callback_router import encode_callback
+
+PRODUCT = "Race Key"
+REQUESTS = 200
+SESSION_LIMIT = 15
+NEXT_TAPS = 100
+
+class FakeBot:
+    """Bot API stand-in: every call yields for a random moment"""
+
+    def __init__(self):
+        self.closed = []
+
+    async def _call(self):
+        await asyncio.sleep(random.random() / 1000)
+
+    async def send_message(self, **kwargs):
+        await self._call()
+
+    async def edit_message_text(self, chat_id, message_id, **kwargs):
+        await self._call()
+        self.closed.append((chat_id, message_id))
+
+    async def get_chat(self, chat_id):
+        await self._call()
+        return SimpleNamespace(full_name=f"Customer {chat_id}", username=None)
+
+class FakeMessage:
+    async def reply_text(self, *args, **kwargs):
+        await asyncio.sleep(random.random() / 1000)
+
+def tap(seller_id, data, answers):
+    async def answer(text=None, show_alert=False):
+        await asyncio.sleep(random.random() / 1000)
+        answers.append(text)
+    query = SimpleNamespace(
+        from_user=SimpleNamespace(id=seller_id, full_name=f"Seller {seller_id}", username=None),
+        data=data, message=FakeMessage(), answer=answer
+    )
+    return SimpleNamespace(callback_query=query)
+
+async def main():
+    catalog.add_product(PRODUCT, None, None, SELLER_IDS)
+    product_id = catalog.snapshot().ids[PRODUCT]
+    seller_router.max_sessions = SESSION_LIMIT
+    bot = FakeBot()
+    context = SimpleNamespace(bot=bot)
+
+    customers = list(range(1, REQUESTS + 1))
+    for user_id in customers:
+        wait_queue.add(user_id, PRODUCT)
+        # As if the request had been offered to every seller
+        seller_router.offers[user_id] = [(sid, user_id) for sid in SELLER_IDS]
+
+    answers = []
+    taps = [
+        accept_request_callback(tap(sid, encode_callback("req", "accept", uid, product_id), answers), context)
+        for uid in customers for sid in SELLER_IDS
+    ] + [
+        take_next_customer_callback(tap(random.choice(SELLER_IDS), encode_callback("req", "next"), answers), context)
+        for _ in range(NEXT_TAPS)
+    ]
+    random.shuffle(taps)
+
+    started = time.perf_counter()
+    await asyncio.gather(*taps)
+    elapsed = time.perf_counter() - started
+
+    accepted = sum(1 for text in answers if text and text.startswith("✅ Request accepted"))
+    pulled = sum(1 for text in answers if text and text.startswith("✅ Connecting"))
+    assert sorted(active_sessions) == customers, "every request accepted exactly once"
+    assert accepted + pulled == REQUESTS, "exactly one winner per request"
+    assert all(len(users) <= SESSION_LIMIT for users in reverse_sessions.values()), "session limit kept"
+    assert sorted(uid for users in reverse_sessions.values() for uid in users) == customers, "maps agree"
+    assert all(active_sessions[uid]["seller_id"] == sid for sid, users in reverse_sessions.items() for uid in users)
+    assert len(bot.closed) == REQUESTS * len(SELLER_IDS), "every notification closed once"
+    assert not wait_queue and not seller_router.offers
+
+    print(f"{len(taps)} concurrent taps on {REQUESTS} requests by {len(SELLER_IDS)} sellers in {elapsed:.2f}s")
+    print(f"winners: {accepted} via Accept, {pulled} via Take Next; rejected taps: {len(answers) - accepted - pulled}")
+    print(f"sessions per seller: {sorted(len(users) for users in reverse_sessions.values())}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
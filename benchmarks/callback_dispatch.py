@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: callback query dispatch
+Compares the old registration (one regex CallbackQueryHandler per button,
+tried in order) against the single CallbackRouter handler.
+
+Run from the project root (uses a throwaway database):
+    python -m benchmarks.callback_dispatch
+"""
+
+import os
+import tempfile
+import timeit
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+import config
+
+config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "callback_dispatch.db")
+
+from utils.callback_router import LEGACY_PREFIXES, LEGACY_ROUTES, CallbackRouter
+
+# Patterns in the order main.py used to register them
+OLD_PATTERNS = [
+    "^buy_keys$", "^open_admin_panel$", "^open_seller_panel$", "^product_", "^connect_", "^accept_",
+    "^seller_stats$", "^seller_products$", "^seller_active_chat$", "^seller_end_chat_",
+    "^seller_toggle_alerts$", "^seller_help$",
+    "^admin_manage_sellers$", "^admin_manage_products$", "^admin_broadcast$", "^broadcast_cancel_",
+    "^admin_global_stats$", "^admin_monitor_sessions$", "^admin_logs$", "^admin_export$",
+    "^admin_emergency$", "^admin_back$",
+    "^admin_select_product_add_seller$", "^admin_select_product_remove_seller$",
+    "^admin_select_product_view_sellers$", "^viewsellers_of_",
+    "^admin_view_products$", "^admin_remove_product$", "^remove_product_",
+    "^admin_assign_sellers$", "^admin_remove_seller_product$",
+    "^force_stop_",
+    "^view_chat_logs$", "^view_seller_performance$",
+    "^export_users$", "^export_sellers$", "^export_products$", "^export_chats$",
+    "^emergency_disable_buy$", "^emergency_enable_buy$",
+    # Conversation entry points
+    "^addseller_to_", "^remseller_from_", "^admin_add_product$", "^assign_to_",
+    "^rmseller_from_", "^broadcast_users$", "^broadcast_sellers$", "^broadcast_everyone$",
+    "^emergency_block_user$", "^emergency_unblock_user$",
+]
+
+CONVERSATION_ROUTES = {
+    "sellers:add", "sellers:remove", "products:add", "products:assign", "products:unassign",
+    "broadcast:users", "broadcast:sellers", "broadcast:everyone", "emergency:block", "emergency:unblock",
+}
+
+# (old callback_data, new callback_data) from early, middle and late in the old list
+SAMPLES = [
+    ("buy_keys", "2:user:buy"),
+    ("accept_123456789_Drip Client", "2:req:accept:123456789:3"),
+    ("admin_monitor_sessions", "2:admin:sessions"),
+    ("export_chats", "2:export:chats"),
+    ("emergency_enable_buy", "2:emergency:enable_buy"),
+    ("emergency_unblock_user", "2:emergency:unblock"),
+]
+
+async def _noop(update, context):
+    pass
+
+def _update(data):
+    user = User(id=1, first_name="Bench", is_bot=False)
+    return Update(update_id=1, callback_query=CallbackQuery(id="1", from_user=user, chat_instance="1", data=data))
+
+def old_handlers():
+    return [CallbackQueryHandler(_noop, pattern=pattern) for pattern in OLD_PATTERNS]
+
+def new_handlers():
+    router = CallbackRouter()
+    routes = set(LEGACY_ROUTES.values()) | {route for _, route, _ in LEGACY_PREFIXES}
+    for route in sorted(routes - CONVERSATION_ROUTES):
+        router.add(*route.split(":"), _noop)
+    entry_points = [
+        CallbackQueryHandler(_noop, pattern=CallbackRouter.matches(*route.split(":")))
+        for route in sorted(CONVERSATION_ROUTES)
+    ]
+    return [router.handler()] + entry_points
+
+def first_match(handlers, update):
+    """What Application.process_update does: check handlers in order until one matches"""
+    for handler in handlers:
+        if handler.check_update(update):
+            return handler
+    return None
+
+def main(number=20000):
+    old, new = old_handlers(), new_handlers()
+    print(f"{'callback_data':<36} {'regex (us)':>11} {'router (us)':>12}")
+    for old_data, new_data in SAMPLES:
+        old_update, new_update = _update(old_data), _update(new_data)
+        assert first_match(old, old_update) is not None and first_match(new, new_update) is not None
+        old_us = timeit.timeit(lambda: first_match(old, old_update), number=number) / number * 1e6
+        new_us = timeit.timeit(lambda: first_match(new, new_update), number=number) / number * 1e6
+        print(f"{old_data:<36} {old_us:>11.2f} {new_us:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ Configuration file for Quantum Panel Bot
 Contains all bot settings, constants, and conversation states
 """
 
+import os
+
 # ====================================================
 #                BOT TOKEN
 # ====================================================
@@ -20,6 +22,9 @@ SELLERS = [6170236685, 6562270244]
 #                PRODUCT CONFIGURATION
 # ====================================================
 
+# Initial catalog: seeded into the catalog store (utils.catalog) on first run.
+# Afterwards products are managed from the admin panel.
+
 # Product sellers mapping: product_name -> [seller_id1, seller_id2, ...]
 PRODUCT_SELLERS = {
     "KOS-8BP": [6562270244, 6170236685]
@@ -38,6 +43,116 @@ PRODUCT_IMAGES = {
 # Start image
 START_IMAGE = "Quantum.jpg"
 
+# Chat that receives the startup image uploads used to pre-warm the media
+# cache (see utils.media_cache). None uses the first admin
+MEDIA_CACHE_CHAT_ID = None
+
+# ====================================================
+#                WEBHOOK SETTINGS
+# ====================================================
+
+# Security: Use a secret random string for webhook path
+SECRET_PATH = "quantum_webhook_secure_path_123xyz"  # Change this to a random string!
+
+# Your PythonAnywhere domain - UPDATE THIS!
+# Example: "yourusername.pythonanywhere.com"
+PYTHONANYWHERE_DOMAIN = "yourusername.pythonanywhere.com"
+WEBHOOK_URL = f"https://{PYTHONANYWHERE_DOMAIN}/{SECRET_PATH}"
+
+# Flask webhook ingress queue: updates waiting beyond this are shed with a 503
+WEBHOOK_QUEUE_SIZE = 1000
+
+# Number of recent update IDs remembered to drop Telegram redeliveries
+UPDATE_DEDUP_SIZE = 10000
+
+# ====================================================
+#                UPDATE PROCESSING
+# ====================================================
+
+# Maximum number of updates processed at once (each user's updates stay in order)
+CONCURRENT_UPDATES = 32
+
+# How new requests reach sellers, see utils.seller_routing:
+# "round_robin" / "least_recent" offer a request to one seller first (least
+# loaded sellers first) and, each SELLER_OFFER_TIMEOUT seconds nobody accepts,
+# to twice as many more; after SELLER_ESCALATION_LIMIT seconds everyone left
+# is offered it at once (keep it well below PENDING_REQUEST_TIMEOUT);
+# "all" notifies every seller of the product at once
+SELLER_ROUTING = "round_robin"
+SELLER_OFFER_TIMEOUT = 45
+SELLER_ESCALATION_LIMIT = 300
+
+# Customers a seller can chat with at the same time;
+# SELLER_SESSION_LIMITS overrides it per seller: {seller_id: limit}
+SELLER_MAX_SESSIONS = 3
+SELLER_SESSION_LIMITS = {}
+
+# Waiting customers get their queue position and ETA (see utils.wait_queue),
+# edited in at most every WAIT_QUEUE_UPDATE_INTERVAL seconds. The ETA averages
+# the last WAIT_QUEUE_DURATION_WINDOW session durations of the product
+# (WAIT_QUEUE_DEFAULT_DURATION seconds until any have finished)
+WAIT_QUEUE_UPDATE_INTERVAL = 60
+WAIT_QUEUE_DURATION_WINDOW = 50
+WAIT_QUEUE_DEFAULT_DURATION = 300
+
+# Idle reaper, run every REAPER_INTERVAL seconds on the JobQueue: ends sessions
+# without a message for SESSION_IDLE_TIMEOUT seconds, expires requests nobody
+# accepted within PENDING_REQUEST_TIMEOUT and product selections older than
+# PRODUCT_SELECTION_TIMEOUT
+REAPER_INTERVAL = 60
+SESSION_IDLE_TIMEOUT = 1800
+PENDING_REQUEST_TIMEOUT = 900
+PRODUCT_SELECTION_TIMEOUT = 900
+
+# With SELLER_ROUTING = "all", notifications are sent this many at a time
+FANOUT_CONCURRENCY = 10
+
+# Broadcasts are sent in batches of this size; the admin's status message is
+# edited at most every BROADCAST_STATUS_INTERVAL seconds
+BROADCAST_CONCURRENCY = 20
+BROADCAST_STATUS_INTERVAL = 3.0
+
+# Outbound rate limits (messages per second), see utils.rate_limiter
+RATE_LIMIT_GLOBAL = 30
+RATE_LIMIT_PER_CHAT = 1
+RATE_LIMIT_CHAT_BURST = 3
+RATE_LIMIT_PER_GROUP = 20 / 60
+# Flood-control (429) waits honoured per request before it fails
+RATE_LIMIT_MAX_RETRIES = 3
+
+# User profiles (name/username) cached from incoming updates
+PROFILE_CACHE_SIZE = 5000
+PROFILE_CACHE_TTL = 3600  # seconds before a cached profile is refreshed
+PROFILE_REFRESH_INTERVAL = 300  # seconds between background refresh batches
+
+# Inbound flood limits per user as (updates per second, burst), see
+# utils.gatekeeper. Admins and sellers are exempt, and so are messages in a
+# live session and album parts
+FLOOD_LIMIT_MESSAGES = (1.0, 8)
+FLOOD_LIMIT_PRODUCT = (1.0, 5)
+FLOOD_LIMIT_CONNECT = (0.1, 2)
+
+# ====================================================
+#                    STORAGE
+# ====================================================
+
+# SQLite database holding users, sessions, stats and chat history.
+# Sessions are kept in memory per process: run one bot process (polling, or
+# a single webhook worker) per database
+# Next to this file, so every entry point opens the same database whatever
+# the working directory
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quantum_panel.db")
+
+# Queued writes are flushed once this many are waiting, or every interval
+DATABASE_BATCH_SIZE = 100
+DATABASE_FLUSH_INTERVAL = 1.0
+
+# Session journal events between compact snapshots
+SESSION_SNAPSHOT_EVERY = 500
+
+# Seconds between checks for catalog changes made by other workers
+CATALOG_REFRESH_INTERVAL = 5.0
+
 # ====================================================
 #                CONVERSATION STATES
 # ====================================================
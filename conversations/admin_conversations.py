@@ -8,13 +8,16 @@ from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
 from config import (
-    ADMINS, SELLERS, PRODUCT_SELLERS, PRODUCT_DESCRIPTIONS, PRODUCT_IMAGES,
+    ADMINS, SELLERS,
     WAITING_SELLER_ID, WAITING_REMOVE_SELLER_ID, WAITING_PRODUCT_NAME,
     WAITING_PRODUCT_DESC, WAITING_PRODUCT_IMAGE, WAITING_PRODUCT_SELLERS,
     WAITING_ASSIGN_PRODUCT_SELLERS, WAITING_REMOVE_SELLER_FROM_PRODUCT,
     WAITING_BROADCAST_MESSAGE, WAITING_BLOCK_USER_ID, WAITING_UNBLOCK_USER_ID
 )
-from utils.data import temp_data, all_users, blocked_users
+from utils.data import (
+    temp_data, all_users, blocked_users, inactive_users, catalog, profile_cache, broadcasts
+)
+from utils.helpers import product_from_callback
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +31,7 @@ async def admin_add_seller_callback(update: Update, context: ContextTypes.DEFAUL
     await query.answer()
     
     try:
-        product_name = query.data.split('_', 2)[2]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text("❌ Invalid product.")
         return ConversationHandler.END
@@ -46,6 +49,7 @@ async def receive_seller_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Receive and process seller ID"""
     user_id = update.message.from_user.id
     
+    snapshot = catalog.snapshot()
     try:
         seller_id = int(update.message.text.strip())
         product_name = temp_data[user_id]["product_for_seller"]
@@ -53,11 +57,11 @@ async def receive_seller_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if seller_id not in SELLERS:
             SELLERS.append(seller_id)
         
-        if product_name in PRODUCT_SELLERS:
-            if seller_id in PRODUCT_SELLERS[product_name]:
+        if product_name in snapshot.sellers:
+            if seller_id in snapshot.sellers[product_name]:
                 await update.message.reply_text(f"❌ Seller {seller_id} is already assigned to '{product_name}'.")
             else:
-                PRODUCT_SELLERS[product_name].append(seller_id)
+                catalog.add_sellers(product_name, [seller_id])
                 await update.message.reply_text(f"✅ Seller {seller_id} added to '{product_name}' successfully!")
         else:
             await update.message.reply_text("❌ Product not found.")
@@ -78,22 +82,24 @@ async def admin_remove_seller_callback(update: Update, context: ContextTypes.DEF
     await query.answer()
     
     try:
-        product_name = query.data.split('_', 2)[2]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text("❌ Invalid product.")
         return ConversationHandler.END
     
-    if product_name not in PRODUCT_SELLERS or not PRODUCT_SELLERS[product_name]:
+    snapshot = catalog.snapshot()
+    if product_name not in snapshot.sellers or not snapshot.sellers[product_name]:
         await query.message.reply_text(f"❌ No sellers assigned to '{product_name}'.")
         return ConversationHandler.END
     
     temp_data[query.from_user.id] = {"product_for_seller": product_name}
     
-    # Fetch seller details
+    # Seller details
+    profiles = await profile_cache.resolve_many(context.bot, snapshot.sellers[product_name])
     seller_list = []
-    for sid in PRODUCT_SELLERS[product_name]:
-        try:
-            seller_chat = await context.bot.get_chat(sid)
+    for sid in snapshot.sellers[product_name]:
+        seller_chat = profiles.get(sid)
+        if seller_chat:
             seller_name = seller_chat.full_name or "Unknown"
             seller_username = f"@{seller_chat.username}" if seller_chat.username else ""
             seller_info = f"• {seller_name}"
@@ -101,8 +107,7 @@ async def admin_remove_seller_callback(update: Update, context: ContextTypes.DEF
                 seller_info += f" {seller_username}"
             seller_info += f" (ID: `{sid}`)"
             seller_list.append(seller_info)
-        except Exception as e:
-            logger.error(f"Failed to fetch seller {sid}: {e}")
+        else:
             seller_list.append(f"• ID: `{sid}`")
     
     sellers_text = "\n".join(seller_list)
@@ -125,8 +130,7 @@ async def receive_remove_seller_id(update: Update, context: ContextTypes.DEFAULT
         seller_id = int(update.message.text.strip())
         product_name = temp_data[user_id]["product_for_seller"]
         
-        if product_name in PRODUCT_SELLERS and seller_id in PRODUCT_SELLERS[product_name]:
-            PRODUCT_SELLERS[product_name].remove(seller_id)
+        if catalog.remove_seller(product_name, seller_id):
             await update.message.reply_text(f"✅ Seller {seller_id} removed from '{product_name}' successfully.")
         else:
             await update.message.reply_text("❌ Seller not found in this product.")
@@ -157,7 +161,8 @@ async def receive_product_name(update: Update, context: ContextTypes.DEFAULT_TYP
     """Receive product name"""
     product_name = update.message.text.strip()
     
-    if product_name in PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if product_name in snapshot.sellers:
         await update.message.reply_text("❌ Product already exists.")
         return ConversationHandler.END
     
@@ -204,12 +209,12 @@ async def receive_product_sellers(update: Update, context: ContextTypes.DEFAULT_
         description = temp_data[user_id]["description"]
         image = temp_data[user_id]["image"]
         
-        PRODUCT_SELLERS[product_name] = seller_ids
-        PRODUCT_DESCRIPTIONS[product_name] = description
-        PRODUCT_IMAGES[product_name] = image
-        
         del temp_data[user_id]
         
+        if not catalog.add_product(product_name, description, image, seller_ids):
+            await update.message.reply_text("❌ Product already exists.")
+            return ConversationHandler.END
+        
         await update.message.reply_text(
             f"✅ Product '{product_name}' added successfully!\n"
             f"Assigned sellers: {', '.join(map(str, seller_ids))}"
@@ -230,7 +235,7 @@ async def select_product_assign_callback(update: Update, context: ContextTypes.D
     await query.answer()
     
     try:
-        product_name = query.data.split('_', 2)[2]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text("❌ Invalid product.")
         return ConversationHandler.END
@@ -252,15 +257,12 @@ async def receive_assign_sellers(update: Update, context: ContextTypes.DEFAULT_T
         seller_ids = [int(sid.strip()) for sid in seller_ids_text.split(',')]
         product_name = temp_data[user_id]["assign_product"]
         
-        if product_name in PRODUCT_SELLERS:
-            PRODUCT_SELLERS[product_name].extend(seller_ids)
-            PRODUCT_SELLERS[product_name] = list(set(PRODUCT_SELLERS[product_name]))
-            
+        if catalog.add_sellers(product_name, seller_ids):
             del temp_data[user_id]
             
             await update.message.reply_text(
                 f"✅ Sellers assigned to '{product_name}' successfully!\n"
-                f"Current sellers: {', '.join(map(str, PRODUCT_SELLERS[product_name]))}"
+                f"Current sellers: {', '.join(map(str, catalog.snapshot().sellers[product_name]))}"
             )
         else:
             await update.message.reply_text("❌ Product not found.")
@@ -279,22 +281,24 @@ async def select_product_remove_seller_callback(update: Update, context: Context
     await query.answer()
     
     try:
-        product_name = query.data.split('_', 2)[2]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text("❌ Invalid product.")
         return ConversationHandler.END
     
-    if product_name not in PRODUCT_SELLERS or not PRODUCT_SELLERS[product_name]:
+    snapshot = catalog.snapshot()
+    if product_name not in snapshot.sellers or not snapshot.sellers[product_name]:
         await query.message.reply_text("❌ No sellers assigned to this product.")
         return ConversationHandler.END
     
     temp_data[query.from_user.id] = {"remove_from_product": product_name}
     
-    # Fetch seller details
+    # Seller details
+    profiles = await profile_cache.resolve_many(context.bot, snapshot.sellers[product_name])
     seller_list = []
-    for sid in PRODUCT_SELLERS[product_name]:
-        try:
-            seller_chat = await context.bot.get_chat(sid)
+    for sid in snapshot.sellers[product_name]:
+        seller_chat = profiles.get(sid)
+        if seller_chat:
             seller_name = seller_chat.full_name or "Unknown"
             seller_username = f"@{seller_chat.username}" if seller_chat.username else ""
             seller_info = f"• {seller_name}"
@@ -302,8 +306,7 @@ async def select_product_remove_seller_callback(update: Update, context: Context
                 seller_info += f" {seller_username}"
             seller_info += f" (ID: `{sid}`)"
             seller_list.append(seller_info)
-        except Exception as e:
-            logger.error(f"Failed to fetch seller {sid}: {e}")
+        else:
             seller_list.append(f"• ID: `{sid}`")
     
     sellers_text = "\n".join(seller_list)
@@ -325,8 +328,7 @@ async def receive_remove_seller_from_product(update: Update, context: ContextTyp
         seller_id = int(update.message.text.strip())
         product_name = temp_data[user_id]["remove_from_product"]
         
-        if product_name in PRODUCT_SELLERS and seller_id in PRODUCT_SELLERS[product_name]:
-            PRODUCT_SELLERS[product_name].remove(seller_id)
+        if catalog.remove_seller(product_name, seller_id):
             del temp_data[user_id]
             
             await update.message.reply_text(
@@ -399,39 +401,18 @@ async def receive_broadcast_message(update: Update, context: ContextTypes.DEFAUL
     else:  # everyone
         recipients = list(all_users | set(SELLERS) | set(ADMINS))
     
-    success_count = 0
-    fail_count = 0
+    # Skip users a previous broadcast found unreachable
+    recipients = [rid for rid in recipients if rid not in inactive_users]
     
-    # Send broadcast
+    # Send in the background; the admin gets a live status message
     if update.message.photo:
-        photo = update.message.photo[-1].file_id
-        caption = update.message.caption or ""
-        
-        for recipient_id in recipients:
-            try:
-                await context.bot.send_photo(chat_id=recipient_id, photo=photo, caption=caption)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to broadcast to {recipient_id}: {e}")
-                fail_count += 1
+        content = {"photo": update.message.photo[-1].file_id, "caption": update.message.caption or ""}
     else:
-        message_text = update.message.text
-        
-        for recipient_id in recipients:
-            try:
-                await context.bot.send_message(chat_id=recipient_id, text=message_text)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to broadcast to {recipient_id}: {e}")
-                fail_count += 1
+        content = {"text": update.message.text}
     
     del temp_data[user_id]
     
-    await update.message.reply_text(
-        f"✅ Broadcast completed!\n"
-        f"Sent: {success_count}\n"
-        f"Failed: {fail_count}"
-    )
+    await broadcasts.submit(context.bot, user_id, content, target, recipients)
     
     return ConversationHandler.END
 
@@ -3,66 +3,26 @@ Flask Webhook Application for PythonAnywhere Deployment
 Wraps the Quantum Panel Telegram Bot for webhook-based operation
 """
 
+import time
+
+# Startup timings in app_factory are measured from here
+STARTED_AT = time.monotonic()
+
 from flask import Flask, request
 from telegram import Update
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    CallbackQueryHandler,
-    MessageHandler,
-    ConversationHandler,
-    filters
-)
 import asyncio
+import atexit
 import logging
+import threading
 
 # Import configuration
-from config import (
-    BOT_TOKEN,
-    WAITING_SELLER_ID, WAITING_PRODUCT_NAME, WAITING_PRODUCT_DESC,
-    WAITING_PRODUCT_IMAGE, WAITING_PRODUCT_SELLERS, WAITING_BROADCAST_MESSAGE,
-    WAITING_BLOCK_USER_ID, WAITING_UNBLOCK_USER_ID, WAITING_REMOVE_SELLER_ID,
-    WAITING_ASSIGN_PRODUCT_SELLERS, WAITING_REMOVE_SELLER_FROM_PRODUCT
-)
-
-# Import handlers
-from handlers import (
-    # User handlers
-    start, buy_keys_callback, product_selection_callback,
-    connect_with_seller_callback, accept_request_callback,
-    handle_message, stop,
-    # Seller handlers
-    seller_panel, seller_stats_callback, seller_products_callback,
-    seller_active_chat_callback, seller_end_chat_callback,
-    seller_toggle_alerts_callback, seller_help_callback,
-    # Admin handlers
-    admin_panel, admin_manage_sellers_callback, admin_view_sellers_callback,
-    admin_manage_products_callback, admin_remove_product_callback,
-    confirm_remove_product_callback, admin_view_products_callback,
-    admin_assign_sellers_callback, admin_remove_seller_product_callback,
-    admin_broadcast_callback, admin_global_stats_callback,
-    admin_monitor_sessions_callback, force_stop_session_callback,
-    admin_logs_callback, view_chat_logs_callback, view_seller_performance_callback,
-    admin_export_callback, export_users_callback, export_sellers_callback,
-    export_products_callback, export_chats_callback,
-    admin_emergency_callback, emergency_disable_buy_callback,
-    emergency_enable_buy_callback, admin_back_callback
-)
+from config import SECRET_PATH, WEBHOOK_URL, WEBHOOK_QUEUE_SIZE, UPDATE_DEDUP_SIZE
 
-# Import conversation handlers
-from conversations import (
-    admin_add_seller_callback, receive_seller_id,
-    admin_remove_seller_callback, receive_remove_seller_id,
-    admin_add_product_callback, receive_product_name,
-    receive_product_desc, receive_product_image, receive_product_sellers,
-    select_product_assign_callback, receive_assign_sellers,
-    select_product_remove_seller_callback, receive_remove_seller_from_product,
-    broadcast_users_callback, broadcast_sellers_callback,
-    broadcast_everyone_callback, receive_broadcast_message,
-    emergency_block_user_callback, receive_block_user_id,
-    emergency_unblock_user_callback, receive_unblock_user_id,
-    cancel
-)
+from app_factory import build_application
+from utils import start_background_tasks, stop_background_tasks, gatekeeper, seller_router, wait_queue
+from utils.dedup import UpdateDeduplicator
+from utils.relay import relay_stats
+from utils.session_reaper import reaper_stats
 
 # Configure logging
 logging.basicConfig(
@@ -77,182 +37,135 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Security: Use a secret random string for webhook path
-SECRET_PATH = "quantum_webhook_secure_path_123xyz"  # Change this to a random string!
+# ====================================================
+#              INITIALIZE BOT APPLICATION
+# ====================================================
 
-# Your PythonAnywhere domain - UPDATE THIS!
-# Example: "yourusername.pythonanywhere.com"
-PYTHONANYWHERE_DOMAIN = "yourusername.pythonanywhere.com"
-WEBHOOK_URL = f"https://{PYTHONANYWHERE_DOMAIN}/{SECRET_PATH}"
+# Build the application for WEBHOOK mode (not polling): there is no updater,
+# updates are fed in by the Flask view and processed concurrently, in order per user
+application = build_application(webhook=True, started_at=STARTED_AT)
 
 # ====================================================
-#              INITIALIZE BOT APPLICATION
+#              BACKGROUND EVENT LOOP
 # ====================================================
 
-# Build the application for WEBHOOK mode (not polling)
-# Set updater=None to indicate webhook mode - no need for initialize/start
-application = Application.builder().token(BOT_TOKEN).updater(None).build()
+# One long-lived event loop runs in a daemon thread for the lifetime of the
+# worker, so the Bot's HTTP client is reused across webhook requests instead
+# of being rebuilt by asyncio.run() for every update.
+bot_loop = asyncio.new_event_loop()
+
+def _run_bot_loop():
+    """Run the bot event loop forever in the background thread"""
+    asyncio.set_event_loop(bot_loop)
+    bot_loop.run_forever()
+
+bot_thread = threading.Thread(target=_run_bot_loop, name="bot-event-loop", daemon=True)
+bot_thread.start()
+
+def run_on_bot_loop(coro, timeout=None):
+    """Submit a coroutine to the background loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, bot_loop).result(timeout)
 
 # ====================================================
-#            REGISTER ALL HANDLERS
+#              WEBHOOK INGRESS QUEUE
 # ====================================================
 
-# Command handlers
-application.add_handler(CommandHandler("start", start))
-application.add_handler(CommandHandler("stop", stop))
-application.add_handler(CommandHandler("seller", seller_panel))
-application.add_handler(CommandHandler("admin", admin_panel))
-
-# User flow callbacks
-application.add_handler(CallbackQueryHandler(buy_keys_callback, pattern="^buy_keys$"))
-
-# Admin/Seller panel quick access
-from handlers.admin_handlers import open_admin_panel_callback
-from handlers.seller_handlers import open_seller_panel_callback
-application.add_handler(CallbackQueryHandler(open_admin_panel_callback, pattern="^open_admin_panel$"))
-application.add_handler(CallbackQueryHandler(open_seller_panel_callback, pattern="^open_seller_panel$"))
-application.add_handler(CallbackQueryHandler(product_selection_callback, pattern="^product_"))
-application.add_handler(CallbackQueryHandler(connect_with_seller_callback, pattern="^connect_"))
-application.add_handler(CallbackQueryHandler(accept_request_callback, pattern="^accept_"))
-
-# Seller panel callbacks
-application.add_handler(CallbackQueryHandler(seller_stats_callback, pattern="^seller_stats$"))
-application.add_handler(CallbackQueryHandler(seller_products_callback, pattern="^seller_products$"))
-application.add_handler(CallbackQueryHandler(seller_active_chat_callback, pattern="^seller_active_chat$"))
-application.add_handler(CallbackQueryHandler(seller_end_chat_callback, pattern="^seller_end_chat_"))
-application.add_handler(CallbackQueryHandler(seller_toggle_alerts_callback, pattern="^seller_toggle_alerts$"))
-application.add_handler(CallbackQueryHandler(seller_help_callback, pattern="^seller_help$"))
-
-# Admin panel callbacks
-application.add_handler(CallbackQueryHandler(admin_manage_sellers_callback, pattern="^admin_manage_sellers$"))
-application.add_handler(CallbackQueryHandler(admin_manage_products_callback, pattern="^admin_manage_products$"))
-application.add_handler(CallbackQueryHandler(admin_broadcast_callback, pattern="^admin_broadcast$"))
-application.add_handler(CallbackQueryHandler(admin_global_stats_callback, pattern="^admin_global_stats$"))
-application.add_handler(CallbackQueryHandler(admin_monitor_sessions_callback, pattern="^admin_monitor_sessions$"))
-application.add_handler(CallbackQueryHandler(admin_logs_callback, pattern="^admin_logs$"))
-application.add_handler(CallbackQueryHandler(admin_export_callback, pattern="^admin_export$"))
-application.add_handler(CallbackQueryHandler(admin_emergency_callback, pattern="^admin_emergency$"))
-application.add_handler(CallbackQueryHandler(admin_back_callback, pattern="^admin_back$"))
-
-# Manage sellers callbacks
-from handlers.admin_handlers import (
-    admin_select_product_add_seller_callback,
-    admin_select_product_remove_seller_callback,
-    admin_select_product_view_sellers_callback
-)
-application.add_handler(CallbackQueryHandler(admin_select_product_add_seller_callback, pattern="^admin_select_product_add_seller$"))
-application.add_handler(CallbackQueryHandler(admin_select_product_remove_seller_callback, pattern="^admin_select_product_remove_seller$"))
-application.add_handler(CallbackQueryHandler(admin_select_product_view_sellers_callback, pattern="^admin_select_product_view_sellers$"))
-application.add_handler(CallbackQueryHandler(admin_view_sellers_callback, pattern="^viewsellers_of_"))
-
-# Manage products callbacks
-application.add_handler(CallbackQueryHandler(admin_view_products_callback, pattern="^admin_view_products$"))
-application.add_handler(CallbackQueryHandler(admin_remove_product_callback, pattern="^admin_remove_product$"))
-application.add_handler(CallbackQueryHandler(confirm_remove_product_callback, pattern="^remove_product_"))
-application.add_handler(CallbackQueryHandler(admin_assign_sellers_callback, pattern="^admin_assign_sellers$"))
-application.add_handler(CallbackQueryHandler(admin_remove_seller_product_callback, pattern="^admin_remove_seller_product$"))
-
-# Monitor sessions callbacks
-application.add_handler(CallbackQueryHandler(force_stop_session_callback, pattern="^force_stop_"))
-
-# Logs callbacks
-application.add_handler(CallbackQueryHandler(view_chat_logs_callback, pattern="^view_chat_logs$"))
-application.add_handler(CallbackQueryHandler(view_seller_performance_callback, pattern="^view_seller_performance$"))
-
-# Export callbacks
-application.add_handler(CallbackQueryHandler(export_users_callback, pattern="^export_users$"))
-application.add_handler(CallbackQueryHandler(export_sellers_callback, pattern="^export_sellers$"))
-application.add_handler(CallbackQueryHandler(export_products_callback, pattern="^export_products$"))
-application.add_handler(CallbackQueryHandler(export_chats_callback, pattern="^export_chats$"))
-
-# Emergency tools callbacks
-application.add_handler(CallbackQueryHandler(emergency_disable_buy_callback, pattern="^emergency_disable_buy$"))
-application.add_handler(CallbackQueryHandler(emergency_enable_buy_callback, pattern="^emergency_enable_buy$"))
-
-# Conversation handlers
-add_seller_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(admin_add_seller_callback, pattern="^addseller_to_")],
-    states={
-        WAITING_SELLER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_seller_id)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(add_seller_conv)
-
-remove_seller_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(admin_remove_seller_callback, pattern="^remseller_from_")],
-    states={
-        WAITING_REMOVE_SELLER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_remove_seller_id)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(remove_seller_conv)
-
-add_product_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(admin_add_product_callback, pattern="^admin_add_product$")],
-    states={
-        WAITING_PRODUCT_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_product_name)],
-        WAITING_PRODUCT_DESC: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_product_desc)],
-        WAITING_PRODUCT_IMAGE: [MessageHandler(filters.PHOTO, receive_product_image)],
-        WAITING_PRODUCT_SELLERS: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_product_sellers)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(add_product_conv)
-
-assign_sellers_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(select_product_assign_callback, pattern="^assign_to_")],
-    states={
-        WAITING_ASSIGN_PRODUCT_SELLERS: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_assign_sellers)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(assign_sellers_conv)
-
-remove_seller_product_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(select_product_remove_seller_callback, pattern="^rmseller_from_")],
-    states={
-        WAITING_REMOVE_SELLER_FROM_PRODUCT: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_remove_seller_from_product)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(remove_seller_product_conv)
-
-broadcast_conv = ConversationHandler(
-    entry_points=[
-        CallbackQueryHandler(broadcast_users_callback, pattern="^broadcast_users$"),
-        CallbackQueryHandler(broadcast_sellers_callback, pattern="^broadcast_sellers$"),
-        CallbackQueryHandler(broadcast_everyone_callback, pattern="^broadcast_everyone$")
-    ],
-    states={
-        WAITING_BROADCAST_MESSAGE: [
-            MessageHandler((filters.TEXT | filters.PHOTO) & ~filters.COMMAND, receive_broadcast_message)
-        ]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(broadcast_conv)
-
-block_user_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(emergency_block_user_callback, pattern="^emergency_block_user$")],
-    states={
-        WAITING_BLOCK_USER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_block_user_id)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(block_user_conv)
-
-unblock_user_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(emergency_unblock_user_callback, pattern="^emergency_unblock_user$")],
-    states={
-        WAITING_UNBLOCK_USER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_unblock_user_id)]
-    },
-    fallbacks=[CommandHandler("cancel", cancel)]
-)
-application.add_handler(unblock_user_conv)
+# Counters for the webhook ingress path, exposed on /webhook_stats
+webhook_metrics = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+_metrics_lock = threading.Lock()
+
+# Free slots in the ingress queue: taken by the Flask view, returned once
+# the update has been fully processed
+_ingress_slots = threading.BoundedSemaphore(WEBHOOK_QUEUE_SIZE)
+ingress_queue = None
+_ingress_dispatcher = None
+_ingress_tasks = set()
 
-# Regular message handler (must be last)
-application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+# Recently seen update IDs, used to drop Telegram redeliveries
+update_dedup = UpdateDeduplicator(UPDATE_DEDUP_SIZE)
+
+def _count(metric):
+    """Increment a webhook metric"""
+    with _metrics_lock:
+        webhook_metrics[metric] += 1
+
+async def _process_queued_update(update):
+    """Process one queued update through the per-user update processor"""
+    try:
+        await application.update_processor.process_update(update, application.process_update(update))
+        _count("processed")
+    except Exception as e:
+        logger.error(f"Error processing update {update.update_id}: {e}", exc_info=True)
+        _count("failed")
+    finally:
+        _ingress_slots.release()
+        ingress_queue.task_done()
+
+async def _dispatch_ingress_queue():
+    """Start a task per queued update; the update processor bounds concurrency"""
+    while True:
+        update = await ingress_queue.get()
+        task = asyncio.create_task(_process_queued_update(update))
+        _ingress_tasks.add(task)
+        task.add_done_callback(_ingress_tasks.discard)
+
+async def _start_ingress_dispatcher():
+    """Create the ingress queue and its dispatcher on the bot loop"""
+    global ingress_queue, _ingress_dispatcher
+    ingress_queue = asyncio.Queue()
+    _ingress_dispatcher = asyncio.create_task(_dispatch_ingress_queue())
+
+async def _stop_ingress_dispatcher(timeout):
+    """Let queued and in-flight updates finish, then stop the dispatcher"""
+    try:
+        await asyncio.wait_for(ingress_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Dropping {ingress_queue.qsize()} queued updates on shutdown")
+    _ingress_dispatcher.cancel()
+    for task in list(_ingress_tasks):
+        task.cancel()
+    await asyncio.gather(_ingress_dispatcher, *_ingress_tasks, return_exceptions=True)
+
+def enqueue_update(update):
+    """Queue an update for processing; returns False when the queue is full"""
+    if not _ingress_slots.acquire(blocking=False):
+        _count("rejected")
+        return False
+    bot_loop.call_soon_threadsafe(ingress_queue.put_nowait, update)
+    _count("accepted")
+    return True
+
+def shutdown_bot_loop():
+    """Shut down the application and stop the background loop on worker exit"""
+    if not bot_loop.is_running():
+        return
+    try:
+        run_on_bot_loop(_stop_ingress_dispatcher(timeout=10), timeout=15)
+    except Exception as e:
+        logger.error(f"Failed to stop webhook dispatcher: {e}", exc_info=True)
+    try:
+        run_on_bot_loop(stop_background_tasks(), timeout=10)
+    except Exception as e:
+        logger.error(f"Failed to stop background tasks: {e}", exc_info=True)
+    try:
+        run_on_bot_loop(application.stop(), timeout=15)
+        run_on_bot_loop(application.shutdown(), timeout=10)
+    except Exception as e:
+        logger.error(f"Failed to shut down application: {e}", exc_info=True)
+    bot_loop.call_soon_threadsafe(bot_loop.stop)
+    bot_thread.join(timeout=5)
+    bot_loop.close()
+    logger.info("Background bot event loop stopped")
+
+run_on_bot_loop(application.initialize())
+# Started (not polling) so tasks from Application.create_task are tracked and
+# awaited on stop; updates still arrive through the ingress queue below
+run_on_bot_loop(application.start())
+run_on_bot_loop(_start_ingress_dispatcher())
+atexit.register(shutdown_bot_loop)
+
+# Media pre-warm and profile refresh run in the background on the bot loop
+run_on_bot_loop(start_background_tasks(application.bot))
 
 logger.info("Quantum Panel bot Flask app loaded for PythonAnywhere")
 
@@ -269,22 +182,29 @@ def index():
 def webhook():
     """
     Handle incoming webhook updates from Telegram
-    For webhook mode, we use asyncio.run() for each request
-    This is the recommended approach for WSGI servers like PythonAnywhere
+    The update is queued for processing and acknowledged right away,
+    so Telegram never waits on our handlers. A full queue sheds load with 503
+    and redelivered update IDs are dropped before parsing
     """
+    update_id = None
     try:
         json_data = request.get_json(force=True)
+        update_id = json_data.get("update_id")
+        if update_dedup.seen(update_id):
+            return 'OK', 200
         update = Update.de_json(json_data, application.bot)
-        
-        # Process update - creates new event loop for this request
-        # This is correct for webhook mode with WSGI
-        asyncio.run(application.process_update(update))
-        
-        return 'OK', 200
     except Exception as e:
-        logger.error(f"Error processing webhook: {e}", exc_info=True)
+        logger.error(f"Error parsing webhook update: {e}", exc_info=True)
+        update_dedup.forget(update_id)
         return 'Error', 500
 
+    if not enqueue_update(update):
+        logger.warning(f"Webhook queue full, rejecting update {update.update_id}")
+        update_dedup.forget(update_id)
+        return 'Busy', 503
+
+    return 'OK', 200
+
 @app.route('/set_webhook')
 def set_webhook():
     """
@@ -292,7 +212,7 @@ def set_webhook():
     Visit this URL once after deployment to activate the bot
     """
     try:
-        asyncio.run(application.bot.set_webhook(url=WEBHOOK_URL))
+        run_on_bot_loop(application.bot.set_webhook(url=WEBHOOK_URL))
         return f'✅ Webhook set successfully to: {WEBHOOK_URL}'
     except Exception as e:
         logger.error(f"Failed to set webhook: {e}", exc_info=True)
@@ -302,7 +222,7 @@ def set_webhook():
 def delete_webhook():
     """Delete webhook (useful for debugging or switching back to polling)"""
     try:
-        asyncio.run(application.bot.delete_webhook())
+        run_on_bot_loop(application.bot.delete_webhook())
         return '✅ Webhook deleted successfully'
     except Exception as e:
         logger.error(f"Failed to delete webhook: {e}", exc_info=True)
@@ -312,7 +232,7 @@ def delete_webhook():
 def webhook_info():
     """Check current webhook configuration"""
     try:
-        info = asyncio.run(application.bot.get_webhook_info())
+        info = run_on_bot_loop(application.bot.get_webhook_info())
         return {
             'url': info.url,
             'has_custom_certificate': info.has_custom_certificate,
@@ -326,6 +246,24 @@ def webhook_info():
         logger.error(f"Failed to get webhook info: {e}", exc_info=True)
         return {'error': str(e)}, 500
 
+@app.route('/webhook_stats')
+def webhook_stats():
+    """Report ingress queue depth, processing, de-duplication, gatekeeper and outbound counters"""
+    with _metrics_lock:
+        stats = dict(webhook_metrics)
+    stats['queue_size'] = ingress_queue.qsize() if ingress_queue else 0
+    stats['queue_capacity'] = WEBHOOK_QUEUE_SIZE
+    stats['in_flight'] = application.update_processor.current_concurrent_updates
+    stats['active_users'] = application.update_processor.active_lanes
+    stats['dedup'] = update_dedup.stats()
+    stats['outbound'] = {**application.bot.rate_limiter.stats, 'queued': application.bot.rate_limiter.queued}
+    stats['relay'] = dict(relay_stats)
+    stats['gatekeeper'] = dict(gatekeeper.stats)
+    stats['routing'] = dict(seller_router.stats)
+    stats['wait_queue'] = dict(wait_queue.stats, waiting=len(wait_queue))
+    stats['reaper'] = dict(reaper_stats)
+    return stats
+
 # ====================================================
 #              WSGI APPLICATION
 # ====================================================
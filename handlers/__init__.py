@@ -3,6 +3,8 @@ Handlers package initialization
 Exports all handler functions for the Telegram bot
 """
 
+import importlib
+
 # User handlers
 from .user_handlers import (
     start,
@@ -10,8 +12,11 @@ from .user_handlers import (
     product_selection_callback,
     connect_with_seller_callback,
     accept_request_callback,
+    take_next_customer_callback,
     handle_message,
-    stop
+    stop,
+    track_user_profile,
+    gatekeep
 )
 
 # Seller handlers
@@ -21,6 +26,8 @@ from .seller_handlers import (
     seller_stats_callback,
     seller_products_callback,
     seller_active_chat_callback,
+    chats_command,
+    seller_focus_callback,
     seller_end_chat_callback,
     seller_toggle_alerts_callback,
     seller_help_callback
@@ -39,44 +46,55 @@ from .admin_handlers import (
     admin_assign_sellers_callback,
     admin_remove_seller_product_callback,
     admin_broadcast_callback,
+    broadcast_cancel_callback,
     admin_global_stats_callback,
     admin_monitor_sessions_callback,
     force_stop_session_callback,
     admin_back_callback
 )
 
-# Admin handlers - Part 2
-from .admin_handlers_part2 import (
-    admin_logs_callback,
-    view_chat_logs_callback,
-    view_seller_performance_callback,
-    admin_export_callback,
-    export_users_callback,
-    export_sellers_callback,
-    export_products_callback,
-    export_chats_callback,
-    admin_emergency_callback,
-    emergency_disable_buy_callback,
-    emergency_enable_buy_callback,
-    emergency_block_user_callback,
-    emergency_unblock_user_callback
-)
+# Admin handlers - Part 2 (logs, exports, emergency tools) are rarely used,
+# so the module is only imported when one of them is first looked up
+_LAZY_HANDLERS = {
+    name: ".admin_handlers_part2" for name in (
+        'admin_logs_callback',
+        'view_chat_logs_callback',
+        'view_seller_performance_callback',
+        'admin_export_callback',
+        'export_users_callback',
+        'export_sellers_callback',
+        'export_products_callback',
+        'export_chats_callback',
+        'admin_emergency_callback',
+        'emergency_disable_buy_callback',
+        'emergency_enable_buy_callback',
+        'emergency_block_user_callback',
+        'emergency_unblock_user_callback'
+    )
+}
+
+def __getattr__(name):
+    """Import lazily loaded handlers on first access"""
+    module = _LAZY_HANDLERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
 
 __all__ = [
     # User handlers
     'start', 'buy_keys_callback', 'product_selection_callback',
-    'connect_with_seller_callback', 'accept_request_callback',
-    'handle_message', 'stop',
+    'connect_with_seller_callback', 'accept_request_callback', 'take_next_customer_callback',
+    'handle_message', 'stop', 'track_user_profile', 'gatekeep',
     # Seller handlers
     'seller_panel', 'open_seller_panel_callback', 'seller_stats_callback', 'seller_products_callback',
-    'seller_active_chat_callback', 'seller_end_chat_callback',
+    'seller_active_chat_callback', 'chats_command', 'seller_focus_callback', 'seller_end_chat_callback',
     'seller_toggle_alerts_callback', 'seller_help_callback',
     # Admin handlers
     'admin_panel', 'open_admin_panel_callback', 'admin_manage_sellers_callback', 'admin_view_sellers_callback',
     'admin_manage_products_callback', 'admin_remove_product_callback',
     'confirm_remove_product_callback', 'admin_view_products_callback',
     'admin_assign_sellers_callback', 'admin_remove_seller_product_callback',
-    'admin_broadcast_callback', 'admin_global_stats_callback',
+    'admin_broadcast_callback', 'broadcast_cancel_callback', 'admin_global_stats_callback',
     'admin_monitor_sessions_callback', 'force_stop_session_callback',
     'admin_logs_callback', 'view_chat_logs_callback', 'view_seller_performance_callback',
     'admin_export_callback', 'export_users_callback', 'export_sellers_callback',
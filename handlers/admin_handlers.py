@@ -9,12 +9,14 @@ from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from config import ADMINS, SELLERS, PRODUCT_SELLERS, PRODUCT_DESCRIPTIONS, PRODUCT_IMAGES
+from config import ADMINS, SELLERS
 from utils import (
     is_admin, get_seller_stats, active_sessions, reverse_sessions,
-    session_start_times, chat_history, all_users, blocked_users,
-    log_chat, seller_stats
+    session_start_times, chat_history, all_users, blocked_users, inactive_users,
+    log_chat, seller_stats, end_session, catalog, profile_cache, broadcasts,
+    product_from_callback, seller_router, has_session_capacity
 )
+from utils.callback_router import callback_args, encode_callback
 import utils.data
 
 logger = logging.getLogger(__name__)
@@ -30,12 +32,12 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_name = user.full_name
     username = f"@{user.username}" if user.username else "No username"
 
-    # Check if admin is in an active session
-    if user_id in reverse_sessions:
+    # Sellers can take more chats until they reach their session limit
+    if user_id in reverse_sessions and not has_session_capacity(user_id):
         await update.message.reply_text(
-            f"⚠️ *Active Session Detected*\n\n"
+            f"⚠️ *Active Session Limit Reached*\n\n"
             f"👤 {user_name} ({username})\n\n"
-            f"Please use /stop to end the current conversation before using other commands.",
+            f"Please use /stop to end one of your conversations before using other commands.",
             parse_mode="Markdown"
         )
         return
@@ -50,14 +52,14 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     keyboard = [
-        [InlineKeyboardButton("🔧 Manage Sellers", callback_data="admin_manage_sellers"),
-         InlineKeyboardButton("🛍 Manage Products", callback_data="admin_manage_products")],
-        [InlineKeyboardButton("📨 Broadcast", callback_data="admin_broadcast"),
-         InlineKeyboardButton("📊 Global Statistics", callback_data="admin_global_stats")],
-        [InlineKeyboardButton("🧵 Monitor Sessions", callback_data="admin_monitor_sessions"),
-         InlineKeyboardButton("📝 Logs", callback_data="admin_logs")],
-        [InlineKeyboardButton("📤 Export Data", callback_data="admin_export"),
-         InlineKeyboardButton("🚨 Emergency Tools", callback_data="admin_emergency")]
+        [InlineKeyboardButton("🔧 Manage Sellers", callback_data=encode_callback("admin", "sellers")),
+         InlineKeyboardButton("🛍 Manage Products", callback_data=encode_callback("admin", "products"))],
+        [InlineKeyboardButton("📨 Broadcast", callback_data=encode_callback("admin", "broadcast")),
+         InlineKeyboardButton("📊 Global Statistics", callback_data=encode_callback("admin", "stats"))],
+        [InlineKeyboardButton("🧵 Monitor Sessions", callback_data=encode_callback("admin", "sessions")),
+         InlineKeyboardButton("📝 Logs", callback_data=encode_callback("admin", "logs"))],
+        [InlineKeyboardButton("📤 Export Data", callback_data=encode_callback("admin", "export")),
+         InlineKeyboardButton("🚨 Emergency Tools", callback_data=encode_callback("admin", "emergency"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -98,14 +100,14 @@ async def open_admin_panel_callback(update: Update, context: ContextTypes.DEFAUL
         return
 
     keyboard = [
-        [InlineKeyboardButton("🔧 Manage Sellers", callback_data="admin_manage_sellers"),
-         InlineKeyboardButton("🛍 Manage Products", callback_data="admin_manage_products")],
-        [InlineKeyboardButton("📨 Broadcast", callback_data="admin_broadcast"),
-         InlineKeyboardButton("📊 Global Statistics", callback_data="admin_global_stats")],
-        [InlineKeyboardButton("🧵 Monitor Sessions", callback_data="admin_monitor_sessions"),
-         InlineKeyboardButton("📝 Logs", callback_data="admin_logs")],
-        [InlineKeyboardButton("📤 Export Data", callback_data="admin_export"),
-         InlineKeyboardButton("🚨 Emergency Tools", callback_data="admin_emergency")]
+        [InlineKeyboardButton("🔧 Manage Sellers", callback_data=encode_callback("admin", "sellers")),
+         InlineKeyboardButton("🛍 Manage Products", callback_data=encode_callback("admin", "products"))],
+        [InlineKeyboardButton("📨 Broadcast", callback_data=encode_callback("admin", "broadcast")),
+         InlineKeyboardButton("📊 Global Statistics", callback_data=encode_callback("admin", "stats"))],
+        [InlineKeyboardButton("🧵 Monitor Sessions", callback_data=encode_callback("admin", "sessions")),
+         InlineKeyboardButton("📝 Logs", callback_data=encode_callback("admin", "logs"))],
+        [InlineKeyboardButton("📤 Export Data", callback_data=encode_callback("admin", "export")),
+         InlineKeyboardButton("🚨 Emergency Tools", callback_data=encode_callback("admin", "emergency"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -142,10 +144,10 @@ async def admin_manage_sellers_callback(update: Update, context: ContextTypes.DE
     admin_id = admin.id
 
     keyboard = [
-        [InlineKeyboardButton("➕ Add Seller to Product", callback_data="admin_select_product_add_seller"),
-         InlineKeyboardButton("➖ Remove Seller from Product", callback_data="admin_select_product_remove_seller")],
-        [InlineKeyboardButton("👁 View Sellers by Product", callback_data="admin_select_product_view_sellers")],
-        [InlineKeyboardButton("« Back", callback_data="admin_back")]
+        [InlineKeyboardButton("➕ Add Seller to Product", callback_data=encode_callback("sellers", "pick_add")),
+         InlineKeyboardButton("➖ Remove Seller from Product", callback_data=encode_callback("sellers", "pick_remove"))],
+        [InlineKeyboardButton("👁 View Sellers by Product", callback_data=encode_callback("sellers", "pick_view"))],
+        [InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -172,14 +174,15 @@ async def admin_select_product_add_seller_callback(update: Update, context: Cont
     query = update.callback_query
     await query.answer()
 
-    if not PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if not snapshot.sellers:
         await query.message.reply_text("❌ No products available.")
         return
 
     keyboard = []
-    for product in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(product, callback_data=f"addseller_to_{product}")])
-    keyboard.append([InlineKeyboardButton("« Cancel", callback_data="admin_manage_sellers")])
+    for product in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(product, callback_data=encode_callback("sellers", "add", snapshot.ids[product]))])
+    keyboard.append([InlineKeyboardButton("« Cancel", callback_data=encode_callback("admin", "sellers"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("Select a product to add seller to:", reply_markup=reply_markup)
@@ -189,14 +192,15 @@ async def admin_select_product_remove_seller_callback(update: Update, context: C
     query = update.callback_query
     await query.answer()
 
-    if not PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if not snapshot.sellers:
         await query.message.reply_text("❌ No products available.")
         return
 
     keyboard = []
-    for product in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(product, callback_data=f"remseller_from_{product}")])
-    keyboard.append([InlineKeyboardButton("« Cancel", callback_data="admin_manage_sellers")])
+    for product in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(product, callback_data=encode_callback("sellers", "remove", snapshot.ids[product]))])
+    keyboard.append([InlineKeyboardButton("« Cancel", callback_data=encode_callback("admin", "sellers"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("Select a product to remove seller from:", reply_markup=reply_markup)
@@ -206,14 +210,15 @@ async def admin_select_product_view_sellers_callback(update: Update, context: Co
     query = update.callback_query
     await query.answer()
 
-    if not PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if not snapshot.sellers:
         await query.message.reply_text("❌ No products available.")
         return
 
     keyboard = []
-    for product in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(product, callback_data=f"viewsellers_of_{product}")])
-    keyboard.append([InlineKeyboardButton("« Cancel", callback_data="admin_manage_sellers")])
+    for product in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(product, callback_data=encode_callback("sellers", "view", snapshot.ids[product]))])
+    keyboard.append([InlineKeyboardButton("« Cancel", callback_data=encode_callback("admin", "sellers"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("Select a product to view sellers:", reply_markup=reply_markup)
@@ -229,19 +234,21 @@ async def admin_view_sellers_callback(update: Update, context: ContextTypes.DEFA
     admin_id = admin.id
 
     try:
-        product_name = query.data.split('_', 2)[2]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text("❌ *Invalid product.*", parse_mode="Markdown")
         return
 
     username_line = f"🆔 *Username:* {admin_username}\n" if admin_username else ""
 
-    if product_name in PRODUCT_SELLERS and PRODUCT_SELLERS[product_name]:
+    snapshot = catalog.snapshot()
+    if product_name in snapshot.sellers and snapshot.sellers[product_name]:
         # Fetch seller details
+        profiles = await profile_cache.resolve_many(context.bot, snapshot.sellers[product_name])
         seller_list = []
-        for sid in PRODUCT_SELLERS[product_name]:
-            try:
-                seller_chat = await query.message.get_bot().get_chat(sid)
+        for sid in snapshot.sellers[product_name]:
+            seller_chat = profiles.get(sid)
+            if seller_chat:
                 seller_name = seller_chat.full_name or "Unknown"
                 seller_username = f"@{seller_chat.username}" if seller_chat.username else ""
                 seller_info = f"  👤 {seller_name}"
@@ -249,8 +256,7 @@ async def admin_view_sellers_callback(update: Update, context: ContextTypes.DEFA
                     seller_info += f" {seller_username}"
                 seller_info += f"\n     🔑 ID: `{sid}`"
                 seller_list.append(seller_info)
-            except Exception as e:
-                logger.error(f"Failed to fetch seller {sid}: {e}")
+            else:
                 seller_list.append(f"  👤 Unknown Seller\n     🔑 ID: `{sid}`")
         
         sellers_text = "\n\n".join(seller_list)
@@ -293,12 +299,12 @@ async def admin_manage_products_callback(update: Update, context: ContextTypes.D
     admin_id = admin.id
 
     keyboard = [
-        [InlineKeyboardButton("➕ Add Product", callback_data="admin_add_product"),
-         InlineKeyboardButton("➖ Remove Product", callback_data="admin_remove_product")],
-        [InlineKeyboardButton("🧑‍💼 Assign Sellers", callback_data="admin_assign_sellers"),
-         InlineKeyboardButton("🚫 Remove Seller", callback_data="admin_remove_seller_product")],
-        [InlineKeyboardButton("📦 View Products", callback_data="admin_view_products")],
-        [InlineKeyboardButton("« Back", callback_data="admin_back")]
+        [InlineKeyboardButton("➕ Add Product", callback_data=encode_callback("products", "add")),
+         InlineKeyboardButton("➖ Remove Product", callback_data=encode_callback("products", "pick_remove"))],
+        [InlineKeyboardButton("🧑‍💼 Assign Sellers", callback_data=encode_callback("products", "pick_assign")),
+         InlineKeyboardButton("🚫 Remove Seller", callback_data=encode_callback("products", "pick_unassign"))],
+        [InlineKeyboardButton("📦 View Products", callback_data=encode_callback("products", "view"))],
+        [InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -325,14 +331,15 @@ async def admin_remove_product_callback(update: Update, context: ContextTypes.DE
     query = update.callback_query
     await query.answer()
 
-    if not PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if not snapshot.sellers:
         await query.message.reply_text("❌ No products to remove.")
         return
 
     keyboard = []
-    for product in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(product, callback_data=f"remove_product_{product}")])
-    keyboard.append([InlineKeyboardButton("« Cancel", callback_data="admin_manage_products")])
+    for product in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(product, callback_data=encode_callback("products", "remove", snapshot.ids[product]))])
+    keyboard.append([InlineKeyboardButton("« Cancel", callback_data=encode_callback("admin", "products"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("Select a product to remove:", reply_markup=reply_markup)
@@ -343,18 +350,12 @@ async def confirm_remove_product_callback(update: Update, context: ContextTypes.
     await query.answer()
 
     try:
-        product_name = query.data.split('_', 2)[2]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text("❌ Invalid product.")
         return
 
-    if product_name in PRODUCT_SELLERS:
-        del PRODUCT_SELLERS[product_name]
-        if product_name in PRODUCT_DESCRIPTIONS:
-            del PRODUCT_DESCRIPTIONS[product_name]
-        if product_name in PRODUCT_IMAGES:
-            del PRODUCT_IMAGES[product_name]
-
+    if catalog.remove_product(product_name):
         await query.message.reply_text(f"✅ Product '{product_name}' removed successfully.")
     else:
         await query.message.reply_text("❌ Product not found.")
@@ -371,14 +372,18 @@ async def admin_view_products_callback(update: Update, context: ContextTypes.DEF
 
     username_line = f"🆔 *Username:* {admin_username}\n" if admin_username else ""
 
-    if PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if snapshot.sellers:
+        profiles = await profile_cache.resolve_many(
+            context.bot, [sid for sellers in snapshot.sellers.values() for sid in sellers]
+        )
         product_list = []
-        for product, sellers in PRODUCT_SELLERS.items():
+        for product, sellers in snapshot.sellers.items():
             if sellers:
                 seller_details = []
                 for sid in sellers:
-                    try:
-                        seller_chat = await context.bot.get_chat(sid)
+                    seller_chat = profiles.get(sid)
+                    if seller_chat:
                         seller_name = seller_chat.full_name or "Unknown"
                         seller_username = f"@{seller_chat.username}" if seller_chat.username else ""
                         seller_info = f"{seller_name}"
@@ -386,8 +391,7 @@ async def admin_view_products_callback(update: Update, context: ContextTypes.DEF
                             seller_info += f" {seller_username}"
                         seller_info += f" (`{sid}`)"
                         seller_details.append(seller_info)
-                    except Exception as e:
-                        logger.error(f"Failed to fetch seller {sid}: {e}")
+                    else:
                         seller_details.append(f"`{sid}`")
                 seller_list = ", ".join(seller_details)
             else:
@@ -421,14 +425,15 @@ async def admin_assign_sellers_callback(update: Update, context: ContextTypes.DE
     query = update.callback_query
     await query.answer()
 
-    if not PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if not snapshot.sellers:
         await query.message.reply_text("❌ No products available.")
         return
 
     keyboard = []
-    for product in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(product, callback_data=f"assign_to_{product}")])
-    keyboard.append([InlineKeyboardButton("« Cancel", callback_data="admin_manage_products")])
+    for product in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(product, callback_data=encode_callback("products", "assign", snapshot.ids[product]))])
+    keyboard.append([InlineKeyboardButton("« Cancel", callback_data=encode_callback("admin", "products"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("Select a product to assign sellers:", reply_markup=reply_markup)
@@ -438,14 +443,15 @@ async def admin_remove_seller_product_callback(update: Update, context: ContextT
     query = update.callback_query
     await query.answer()
 
-    if not PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if not snapshot.sellers:
         await query.message.reply_text("❌ No products available.")
         return
 
     keyboard = []
-    for product in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(product, callback_data=f"rmseller_from_{product}")])
-    keyboard.append([InlineKeyboardButton("« Cancel", callback_data="admin_manage_products")])
+    for product in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(product, callback_data=encode_callback("products", "unassign", snapshot.ids[product]))])
+    keyboard.append([InlineKeyboardButton("« Cancel", callback_data=encode_callback("admin", "products"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("Select a product to remove sellers from:", reply_markup=reply_markup)
@@ -465,10 +471,10 @@ async def admin_broadcast_callback(update: Update, context: ContextTypes.DEFAULT
     admin_id = admin.id
 
     keyboard = [
-        [InlineKeyboardButton("📢 To Users", callback_data="broadcast_users"),
-         InlineKeyboardButton("📢 To Sellers", callback_data="broadcast_sellers")],
-        [InlineKeyboardButton("📢 To Everyone", callback_data="broadcast_everyone")],
-        [InlineKeyboardButton("« Back", callback_data="admin_back")]
+        [InlineKeyboardButton("📢 To Users", callback_data=encode_callback("broadcast", "users")),
+         InlineKeyboardButton("📢 To Sellers", callback_data=encode_callback("broadcast", "sellers"))],
+        [InlineKeyboardButton("📢 To Everyone", callback_data=encode_callback("broadcast", "everyone"))],
+        [InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -490,6 +496,20 @@ async def admin_broadcast_callback(update: Update, context: ContextTypes.DEFAULT
         parse_mode="Markdown"
     )
 
+async def broadcast_cancel_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cancel a running broadcast job from its status message"""
+    query = update.callback_query
+
+    if not is_admin(query.from_user.id):
+        await query.answer("⛔ Access denied.", show_alert=True)
+        return
+
+    job_id = callback_args(query.data)[0]
+    if broadcasts.cancel(job_id):
+        await query.answer("🛑 Cancelling broadcast...")
+    else:
+        await query.answer("❌ This broadcast is no longer running.", show_alert=True)
+
 # ====================================================
 #            GLOBAL STATISTICS
 # ====================================================
@@ -505,6 +525,7 @@ async def admin_global_stats_callback(update: Update, context: ContextTypes.DEFA
     admin_id = admin.id
 
     total_users = len(all_users)
+    pruned_users = len(inactive_users)
     active_users = len(active_sessions)
     total_chats = len(chat_history)
     closed_chats = sum(1 for chat in chat_history if chat["end_time"] is not None)
@@ -532,6 +553,7 @@ async def admin_global_stats_callback(update: Update, context: ContextTypes.DEFA
         f"━━━━━━━━━━━━━━━━━\n"
         f"📈 *System Overview:*\n\n"
         f"👥 *Total Users:* {total_users}\n"
+        f"🚫 *Unreachable (pruned):* {pruned_users}\n"
         f"🔄 *Active Sessions:* {active_users}\n"
         f"💬 *Total Chats:* {total_chats}\n"
         f"✅ *Closed Chats:* {closed_chats}\n\n"
@@ -607,7 +629,8 @@ async def admin_monitor_sessions_callback(update: Update, context: ContextTypes.
 
         message += (
             f"👤 *User:* `{user_id}`\n"
-            f"💼 *Seller:* `{seller_id}`\n"
+            f"💼 *Seller:* `{seller_id}` "
+            f"({len(reverse_sessions.get(seller_id, ()))}/{seller_router.session_limit(seller_id)} chats)\n"
             f"📦 *Product:* {product}\n"
             f"⏱️ *Duration:* {duration_str}\n"
             f"━━━━━━━━━━━━━━━━━\n"
@@ -616,9 +639,9 @@ async def admin_monitor_sessions_callback(update: Update, context: ContextTypes.
     keyboard = []
     for user_id in active_sessions.keys():
         keyboard.append([
-            InlineKeyboardButton(f"🛑 Force Stop User {user_id}", callback_data=f"force_stop_{user_id}")
+            InlineKeyboardButton(f"🛑 Force Stop User {user_id}", callback_data=encode_callback("sessions", "stop", user_id))
         ])
-    keyboard.append([InlineKeyboardButton("« Back", callback_data="admin_back")])
+    keyboard.append([InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
@@ -629,7 +652,7 @@ async def force_stop_session_callback(update: Update, context: ContextTypes.DEFA
     await query.answer()
 
     try:
-        user_id = int(query.data.split('_')[2])
+        user_id = int(callback_args(query.data)[0])
     except (IndexError, ValueError):
         await query.message.reply_text("❌ Invalid session.")
         return
@@ -638,10 +661,14 @@ async def force_stop_session_callback(update: Update, context: ContextTypes.DEFA
         await query.message.reply_text("❌ Session not found.")
         return
 
-    session_info = active_sessions[user_id]
+    start_time = session_start_times.get(user_id, datetime.now())
+    # Ended before the first await, so the idle reaper can't end it a second time
+    session_info = end_session(user_id)
+    if session_info is None:
+        await query.message.reply_text("❌ Session not found.")
+        return
     seller_id = session_info["seller_id"]
     product = session_info["product"]
-    start_time = session_start_times.get(user_id, datetime.now())
 
     log_chat(user_id, seller_id, product, start_time)
 
@@ -661,11 +688,6 @@ async def force_stop_session_callback(update: Update, context: ContextTypes.DEFA
     except Exception as e:
         logger.error(f"Failed to notify seller {seller_id}: {e}")
 
-    del active_sessions[user_id]
-    del reverse_sessions[seller_id]
-    if user_id in session_start_times:
-        del session_start_times[user_id]
-
     await query.message.reply_text(f"✅ Session with user {user_id} force stopped.")
 
 # ====================================================
@@ -678,14 +700,14 @@ async def admin_back_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     keyboard = [
-        [InlineKeyboardButton("🔧 Manage Sellers", callback_data="admin_manage_sellers"),
-         InlineKeyboardButton("🛍 Manage Products", callback_data="admin_manage_products")],
-        [InlineKeyboardButton("📨 Broadcast", callback_data="admin_broadcast"),
-         InlineKeyboardButton("📊 Global Statistics", callback_data="admin_global_stats")],
-        [InlineKeyboardButton("🧵 Monitor Sessions", callback_data="admin_monitor_sessions"),
-         InlineKeyboardButton("📝 Logs", callback_data="admin_logs")],
-        [InlineKeyboardButton("📤 Export Data", callback_data="admin_export"),
-         InlineKeyboardButton("🚨 Emergency Tools", callback_data="admin_emergency")]
+        [InlineKeyboardButton("🔧 Manage Sellers", callback_data=encode_callback("admin", "sellers")),
+         InlineKeyboardButton("🛍 Manage Products", callback_data=encode_callback("admin", "products"))],
+        [InlineKeyboardButton("📨 Broadcast", callback_data=encode_callback("admin", "broadcast")),
+         InlineKeyboardButton("📊 Global Statistics", callback_data=encode_callback("admin", "stats"))],
+        [InlineKeyboardButton("🧵 Monitor Sessions", callback_data=encode_callback("admin", "sessions")),
+         InlineKeyboardButton("📝 Logs", callback_data=encode_callback("admin", "logs"))],
+        [InlineKeyboardButton("📤 Export Data", callback_data=encode_callback("admin", "export")),
+         InlineKeyboardButton("🚨 Emergency Tools", callback_data=encode_callback("admin", "emergency"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
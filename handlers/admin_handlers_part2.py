@@ -10,11 +10,12 @@ from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from config import ADMINS, SELLERS, PRODUCT_SELLERS, PRODUCT_DESCRIPTIONS
+from config import ADMINS, SELLERS
 from utils import (
-    get_seller_stats, chat_history, all_users, blocked_users,
-    active_sessions, reverse_sessions, session_start_times
+    get_seller_stats, chat_history, all_users, blocked_users, inactive_users,
+    active_sessions, reverse_sessions, session_start_times, catalog, profile_cache
 )
+from utils.callback_router import encode_callback
 import utils.data
 
 logger = logging.getLogger(__name__)
@@ -29,9 +30,9 @@ async def admin_logs_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     keyboard = [
-        [InlineKeyboardButton("📜 Chat Logs", callback_data="view_chat_logs"),
-         InlineKeyboardButton("📊 Seller Performance", callback_data="view_seller_performance")],
-        [InlineKeyboardButton("« Back", callback_data="admin_back")]
+        [InlineKeyboardButton("📜 Chat Logs", callback_data=encode_callback("logs", "chats")),
+         InlineKeyboardButton("📊 Seller Performance", callback_data=encode_callback("logs", "sellers"))],
+        [InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -63,11 +64,13 @@ async def view_chat_logs_callback(update: Update, context: ContextTypes.DEFAULT_
         seller_username = f"(@{seller_info.get('username')})" if seller_info.get('username') else ''
 
         start = log["start_time"].strftime("%Y-%m-%d %H:%M") if isinstance(log["start_time"], datetime) else "Unknown"
+        ended_by_line = f"⌛ Ended by: {log['ended_by']}\n" if log.get("ended_by") else ""
         message += (
             f"👤 User: {user_name} {user_username}\n"
             f"🧑‍💼 Seller: {seller_name} {seller_username}\n"
             f"📦 Product: {log['product']}\n"
             f"⏳ Start: {start}\n"
+            f"{ended_by_line}"
             f"--------------------\n"
         )
 
@@ -80,15 +83,18 @@ async def view_seller_performance_callback(update: Update, context: ContextTypes
 
     message = "📊 *SELLER PERFORMANCE*\n\n━━━━━━━━━━━━━━━━━\n\n"
 
-    for seller_id in set(SELLERS + ADMINS):
+    seller_ids = set(SELLERS + ADMINS)
+    profiles = await profile_cache.resolve_many(context.bot, seller_ids)
+
+    for seller_id in seller_ids:
         stats = get_seller_stats(seller_id)
         
-        # Fetch seller details
-        try:
-            seller_chat = await query.message.chat.get_chat(seller_id)
+        # Seller details
+        seller_chat = profiles.get(seller_id)
+        if seller_chat:
             seller_name = seller_chat.full_name or "Unknown"
             seller_username = f"@{seller_chat.username}" if seller_chat.username else ""
-        except Exception:
+        else:
             seller_name = "Unknown"
             seller_username = ""
 
@@ -112,11 +118,11 @@ async def admin_export_callback(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
 
     keyboard = [
-        [InlineKeyboardButton("👥 Export Users", callback_data="export_users"),
-         InlineKeyboardButton("🧑‍💼 Export Sellers", callback_data="export_sellers")],
-        [InlineKeyboardButton("📦 Export Products", callback_data="export_products"),
-         InlineKeyboardButton("💬 Export Chats", callback_data="export_chats")],
-        [InlineKeyboardButton("« Back", callback_data="admin_back")]
+        [InlineKeyboardButton("👥 Export Users", callback_data=encode_callback("export", "users")),
+         InlineKeyboardButton("🧑‍💼 Export Sellers", callback_data=encode_callback("export", "sellers"))],
+        [InlineKeyboardButton("📦 Export Products", callback_data=encode_callback("export", "products")),
+         InlineKeyboardButton("💬 Export Chats", callback_data=encode_callback("export", "chats"))],
+        [InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -136,13 +142,16 @@ async def export_users_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
     with open(filename, 'w', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(['User ID'])
+        writer.writerow(['User ID', 'Status'])
         for user_id in all_users:
-            writer.writerow([user_id])
+            writer.writerow([user_id, 'inactive' if user_id in inactive_users else 'active'])
 
     try:
         with open(filename, 'rb') as f:
-            await context.bot.send_document(chat_id=query.from_user.id, document=f, filename=filename)
+            await context.bot.send_document(
+                chat_id=query.from_user.id, document=f, filename=filename,
+                caption=f"👥 {len(all_users)} users, {len(inactive_users)} unreachable (pruned)"
+            )
         os.remove(filename)
     except Exception as e:
         logger.error(f"Failed to export users: {e}")
@@ -176,12 +185,13 @@ async def export_products_callback(update: Update, context: ContextTypes.DEFAULT
 
     filename = f"products_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
+    snapshot = catalog.snapshot()
     with open(filename, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(['Product Name', 'Description', 'Sellers'])
 
-        for product, sellers in PRODUCT_SELLERS.items():
-            description = PRODUCT_DESCRIPTIONS.get(product, "")
+        for product, sellers in snapshot.sellers.items():
+            description = snapshot.descriptions.get(product, "")
             seller_list = ', '.join(map(str, sellers))
             writer.writerow([product, description, seller_list])
 
@@ -202,12 +212,12 @@ async def export_chats_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
     with open(filename, 'w', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(['User ID', 'Seller ID', 'Product', 'Start Time', 'End Time'])
+        writer.writerow(['User ID', 'Seller ID', 'Product', 'Start Time', 'End Time', 'Ended By'])
 
         for chat in chat_history:
             start = chat["start_time"].strftime("%Y-%m-%d %H:%M:%S") if isinstance(chat["start_time"], datetime) else "Unknown"
             end = chat["end_time"].strftime("%Y-%m-%d %H:%M:%S") if isinstance(chat.get("end_time"), datetime) else "Ongoing"
-            writer.writerow([chat["user_id"], chat["seller_id"], chat["product"], start, end])
+            writer.writerow([chat["user_id"], chat["seller_id"], chat["product"], start, end, chat.get("ended_by", "")])
 
     try:
         with open(filename, 'rb') as f:
@@ -229,11 +239,11 @@ async def admin_emergency_callback(update: Update, context: ContextTypes.DEFAULT
     buy_status = "🟢 *ENABLED*" if utils.data.buy_button_enabled else "🔴 *DISABLED*"
 
     keyboard = [
-        [InlineKeyboardButton("🔴 Disable Buy", callback_data="emergency_disable_buy"),
-         InlineKeyboardButton("🟢 Enable Buy", callback_data="emergency_enable_buy")],
-        [InlineKeyboardButton("🚫 Block User", callback_data="emergency_block_user"),
-         InlineKeyboardButton("✅ Unblock User", callback_data="emergency_unblock_user")],
-        [InlineKeyboardButton("« Back", callback_data="admin_back")]
+        [InlineKeyboardButton("🔴 Disable Buy", callback_data=encode_callback("emergency", "disable_buy")),
+         InlineKeyboardButton("🟢 Enable Buy", callback_data=encode_callback("emergency", "enable_buy"))],
+        [InlineKeyboardButton("🚫 Block User", callback_data=encode_callback("emergency", "block")),
+         InlineKeyboardButton("✅ Unblock User", callback_data=encode_callback("emergency", "unblock"))],
+        [InlineKeyboardButton("« Back", callback_data=encode_callback("admin", "back"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -9,9 +9,11 @@ from telegram.ext import ContextTypes
 
 from utils import (
     is_seller, get_seller_stats, get_products_for_seller,
-    reverse_sessions, active_sessions, seller_alerts,
-    session_start_times, update_seller_stats, log_chat
+    reverse_sessions, active_sessions, seller_alerts, seller_router,
+    session_start_times, update_seller_stats, log_chat, end_session,
+    seller_sessions, has_session_capacity, reply_target, set_reply_target, wait_queue
 )
+from utils.callback_router import callback_args, encode_callback
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,11 @@ logger = logging.getLogger(__name__)
 #                SELLER PANEL
 # ====================================================
 
+def next_customer_button(seller_id):
+    """Button pulling the longest-waiting customer for the seller's products"""
+    waiting = wait_queue.waiting(get_products_for_seller(seller_id))
+    return InlineKeyboardButton(f"⏭️ Take Next Customer ({waiting} waiting)", callback_data=encode_callback("req", "next"))
+
 async def seller_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Open seller panel"""
     user_id = update.message.from_user.id
@@ -26,12 +33,12 @@ async def seller_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_name = user.full_name
     username = f"@{user.username}" if user.username else "No username"
 
-    # Check if seller is in an active session
-    if user_id in reverse_sessions:
+    # Sellers can take more chats until they reach their session limit
+    if user_id in reverse_sessions and not has_session_capacity(user_id):
         await update.message.reply_text(
-            f"⚠️ *Active Session Detected*\n\n"
+            f"⚠️ *Active Session Limit Reached*\n\n"
             f"👤 {user_name} ({username})\n\n"
-            f"Please use /stop to end the current conversation before using other commands.",
+            f"Please use /stop to end one of your conversations before using other commands.",
             parse_mode="Markdown"
         )
         return
@@ -46,11 +53,12 @@ async def seller_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     keyboard = [
-        [InlineKeyboardButton("📊 My Stats", callback_data="seller_stats"),
-         InlineKeyboardButton("📦 Products I Sell", callback_data="seller_products")],
-        [InlineKeyboardButton("🔄 Active Chat", callback_data="seller_active_chat"),
-         InlineKeyboardButton("🔔 Toggle Alerts", callback_data="seller_toggle_alerts")],
-        [InlineKeyboardButton("ℹ️ Help", callback_data="seller_help")]
+        [InlineKeyboardButton("📊 My Stats", callback_data=encode_callback("seller", "stats")),
+         InlineKeyboardButton("📦 Products I Sell", callback_data=encode_callback("seller", "products"))],
+        [InlineKeyboardButton("🔄 Active Chat", callback_data=encode_callback("seller", "chat")),
+         InlineKeyboardButton("🔔 Toggle Alerts", callback_data=encode_callback("seller", "alerts"))],
+        [next_customer_button(user_id)],
+        [InlineKeyboardButton("ℹ️ Help", callback_data=encode_callback("seller", "help"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -78,11 +86,12 @@ async def open_seller_panel_callback(update: Update, context: ContextTypes.DEFAU
         return
 
     keyboard = [
-        [InlineKeyboardButton("📊 My Stats", callback_data="seller_stats"),
-         InlineKeyboardButton("📦 Products I Sell", callback_data="seller_products")],
-        [InlineKeyboardButton("🔄 Active Chat", callback_data="seller_active_chat"),
-         InlineKeyboardButton("🔔 Toggle Alerts", callback_data="seller_toggle_alerts")],
-        [InlineKeyboardButton("ℹ️ Help", callback_data="seller_help")]
+        [InlineKeyboardButton("📊 My Stats", callback_data=encode_callback("seller", "stats")),
+         InlineKeyboardButton("📦 Products I Sell", callback_data=encode_callback("seller", "products"))],
+        [InlineKeyboardButton("🔄 Active Chat", callback_data=encode_callback("seller", "chat")),
+         InlineKeyboardButton("🔔 Toggle Alerts", callback_data=encode_callback("seller", "alerts"))],
+        [next_customer_button(user_id)],
+        [InlineKeyboardButton("ℹ️ Help", callback_data=encode_callback("seller", "help"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -177,53 +186,91 @@ async def seller_products_callback(update: Update, context: ContextTypes.DEFAULT
 #            SELLER ACTIVE CHAT
 # ====================================================
 
+def active_chats_view(seller):
+    """Text and keyboard listing a seller's chats, with a switch and an end
+    button per customer (✅ marks the one plain messages go to)"""
+    seller_id = seller.id
+    seller_username = f"@{seller.username}" if seller.username else None
+    username_line = f"🆔 *Seller Username:* {seller_username}\n" if seller_username else ""
+    header = (
+        f"💼 *Seller:* {seller.full_name}\n"
+        f"{username_line}"
+        f"🔑 *Seller ID:* `{seller_id}`\n\n"
+    )
+
+    customers = seller_sessions(seller_id)
+    if not customers:
+        message = (
+            f"❌ *NO ACTIVE CHAT*\n\n"
+            f"━━━━━━━━━━━━━━━━━\n"
+            f"{header}"
+            f"━━━━━━━━━━━━━━━━━\n"
+            f"You don't have any active conversations."
+        )
+        return message, InlineKeyboardMarkup([[next_customer_button(seller_id)]])
+
+    current = reply_target(seller_id)
+    keyboard = [[next_customer_button(seller_id)]] if seller_router.has_capacity(seller_id) else []
+    lines = []
+    for user_id in customers:
+        product = active_sessions[user_id]["product"]
+        mark = "✅ " if user_id == current else ""
+        lines.append(f"{mark}👤 `{user_id}` · 📦 {product}\n")
+        keyboard.append([
+            InlineKeyboardButton(f"{mark}💬 {user_id}", callback_data=encode_callback("seller", "focus", user_id)),
+            InlineKeyboardButton("❌ End Chat", callback_data=encode_callback("seller", "end", user_id))
+        ])
+
+    message = (
+        f"🔄 *ACTIVE CHAT SESSIONS* ({len(customers)}/{seller_router.session_limit(seller_id)})\n\n"
+        f"━━━━━━━━━━━━━━━━━\n"
+        f"{header}"
+        f"━━━━━━━━━━━━━━━━━\n"
+        f"{''.join(lines)}\n"
+        f"━━━━━━━━━━━━━━━━━\n"
+        f"💬 Messages go to the ✅ customer. Tap a customer to switch, "
+        f"or reply to one of their messages to answer them directly."
+    )
+    return message, InlineKeyboardMarkup(keyboard)
+
 async def seller_active_chat_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show seller's active chat"""
+    """Show seller's active chats"""
     query = update.callback_query
     await query.answer()
 
-    seller_id = query.from_user.id
-    seller = query.from_user
-    seller_name = seller.full_name
-    seller_username = f"@{seller.username}" if seller.username else None
+    message, reply_markup = active_chats_view(query.from_user)
+    await query.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
 
-    username_line = f"🆔 *Seller Username:* {seller_username}\n" if seller_username else ""
+async def chats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /chats command - list active chats and switch between them"""
+    seller = update.message.from_user
 
-    if seller_id in reverse_sessions:
-        user_id = reverse_sessions[seller_id]
-        session_info = active_sessions[user_id]
-        product = session_info["product"]
+    if not is_seller(seller.id):
+        return
 
-        keyboard = [
-            [InlineKeyboardButton("❌ End Chat", callback_data=f"seller_end_chat_{user_id}")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    message, reply_markup = active_chats_view(seller)
+    await update.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
 
-        message = (
-            f"🔄 *ACTIVE CHAT SESSION*\n\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💼 *Seller:* {seller_name}\n"
-            f"{username_line}"
-            f"🔑 *Seller ID:* `{seller_id}`\n\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"👤 *Customer ID:* `{user_id}`\n"
-            f"📦 *Product:* {product}\n\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💬 Chat is currently active!"
-        )
+async def seller_focus_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send the seller's plain messages to another of their customers"""
+    query = update.callback_query
 
-        await query.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
+    try:
+        user_id = int(callback_args(query.data)[0])
+    except (IndexError, ValueError):
+        await query.answer("❌ Invalid request.", show_alert=True)
+        return
+
+    if not set_reply_target(query.from_user.id, user_id):
+        await query.answer("❌ This chat is no longer active.", show_alert=True)
     else:
-        message = (
-            f"❌ *NO ACTIVE CHAT*\n\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💼 *Seller:* {seller_name}\n"
-            f"{username_line}"
-            f"🔑 *Seller ID:* `{seller_id}`\n\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"You don't have any active conversations."
-        )
-        await query.message.reply_text(message, parse_mode="Markdown")
+        await query.answer(f"💬 Now chatting with {user_id}")
+
+    message, reply_markup = active_chats_view(query.from_user)
+    try:
+        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode="Markdown")
+    except Exception as e:
+        logger.debug(f"Failed to refresh chat list: {e}")
 
 # ====================================================
 #            SELLER END CHAT
@@ -240,7 +287,7 @@ async def seller_end_chat_callback(update: Update, context: ContextTypes.DEFAULT
     seller_username = f"@{seller.username}" if seller.username else None
 
     try:
-        user_id = int(query.data.split('_')[3])
+        user_id = int(callback_args(query.data)[0])
     except (IndexError, ValueError):
         await query.message.reply_text(
             f"❌ *INVALID REQUEST*\n\n"
@@ -249,7 +296,7 @@ async def seller_end_chat_callback(update: Update, context: ContextTypes.DEFAULT
         )
         return
 
-    if seller_id not in reverse_sessions or reverse_sessions[seller_id] != user_id:
+    if user_id not in seller_sessions(seller_id):
         await query.message.reply_text(
             f"❌ *CHAT NOT ACTIVE*\n\n"
             f"This chat is no longer active.",
@@ -257,9 +304,12 @@ async def seller_end_chat_callback(update: Update, context: ContextTypes.DEFAULT
         )
         return
 
-    session_info = active_sessions[user_id]
-    product = session_info["product"]
     start_time = session_start_times.get(user_id, datetime.now())
+    # Ended before the first await, so the idle reaper can't end it a second time
+    session_info = end_session(user_id)
+    if session_info is None:
+        return
+    product = session_info["product"]
 
     update_seller_stats(seller_id, user_id)
     log_chat(user_id, seller_id, product, start_time)
@@ -293,10 +343,9 @@ async def seller_end_chat_callback(update: Update, context: ContextTypes.DEFAULT
         parse_mode="Markdown"
     )
 
-    del reverse_sessions[seller_id]
-    del active_sessions[user_id]
-    if user_id in session_start_times:
-        del session_start_times[user_id]
+    if seller_sessions(seller_id):
+        message, reply_markup = active_chats_view(query.from_user)
+        await query.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
 
 # ====================================================
 #            SELLER TOGGLE ALERTS
@@ -354,7 +403,8 @@ async def seller_help_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         f"━━━━━━━━━━━━━━━━━\n"
         f"📱 *Available Commands:*\n\n"
         f"  • `/seller` - Open seller panel\n"
-        f"  • `/stop` - End active conversation\n\n"
+        f"  • `/chats` - List and switch active conversations\n"
+        f"  • `/stop` - End active conversation (`/stop <user_id>` for a specific one)\n\n"
         f"━━━━━━━━━━━━━━━━━\n"
         f"✨ *What You Can Do:*\n\n"
         f"  ✅ Accept connection requests\n"
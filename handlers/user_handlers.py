@@ -2,21 +2,27 @@
 User flow handlers for Quantum Panel Bot
 """
 
+import asyncio
 import logging
+import time
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.ext import ApplicationHandlerStop, ContextTypes
 
-from config import (
-    START_IMAGE, PRODUCT_IMAGES, PRODUCT_DESCRIPTIONS,
-    PRODUCT_SELLERS, ADMINS, SELLERS
-)
+from config import START_IMAGE, ADMINS, SELLERS
 from utils import (
-    active_sessions, reverse_sessions, pending_requests,
-    user_product_selection, seller_alerts, all_users,
-    blocked_users, buy_button_enabled, session_start_times,
-    update_seller_stats, log_chat
+    is_seller, active_sessions, reverse_sessions, pending_requests,
+    user_product_selection, all_users,
+    gatekeeper, inactive_users, buy_button_enabled, session_start_times,
+    update_seller_stats, log_chat, end_session, catalog,
+    media_cache, profile_cache, product_from_callback, seller_router,
+    seller_sessions, has_session_capacity, reply_target, wait_queue, claim_request, claim_next_request, last_activity,
+    offer_request, close_offer, taken_text
 )
+from handlers.seller_handlers import next_customer_button
+from utils.callback_router import callback_args, encode_callback
+from utils.relay import relay_message, relay_origin
+from utils.wait_queue import status_text
 
 logger = logging.getLogger(__name__)
 
@@ -31,9 +37,11 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_name = user.full_name
     username = f"@{user.username}" if user.username else "No username"
     all_users.add(user_id)
+    # Reachable again (e.g. unblocked the bot): include in broadcasts again
+    inactive_users.discard(user_id)
 
     # Check if user is in an active session
-    if user_id in active_sessions or user_id in reverse_sessions:
+    if user_id in active_sessions:
         await update.message.reply_text(
             f"⚠️ *Active Session Detected*\n\n"
             f"👤 {user_name} ({username})\n"
@@ -42,11 +50,12 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    if user_id in blocked_users:
+    # Sellers can take more chats until they reach their session limit
+    if user_id in reverse_sessions and not has_session_capacity(user_id):
         await update.message.reply_text(
-            f"⛔ *ACCESS DENIED*\n\n"
-            f"You have been blocked from using this bot.\n\n"
-            f"👤 {user_name} ({username})",
+            f"⚠️ *Active Session Limit Reached*\n\n"
+            f"👤 {user_name} ({username})\n"
+            f"Please use /stop to end one of your conversations before using other commands.",
             parse_mode="Markdown"
         )
         return
@@ -54,8 +63,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Check if user is admin or seller
     if user_id in ADMINS:
         keyboard = [
-            [InlineKeyboardButton("🔧 Admin Panel", callback_data="open_admin_panel"),
-             InlineKeyboardButton("💼 Seller Panel", callback_data="open_seller_panel")]
+            [InlineKeyboardButton("🔧 Admin Panel", callback_data=encode_callback("admin", "open")),
+             InlineKeyboardButton("💼 Seller Panel", callback_data=encode_callback("seller", "open"))]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -69,13 +78,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
         try:
-            with open(START_IMAGE, 'rb') as photo:
-                await update.message.reply_photo(
-                    photo=photo,
-                    caption=admin_message,
-                    reply_markup=reply_markup,
-                    parse_mode="Markdown"
-                )
+            await media_cache.send_photo(
+                update.message.reply_photo,
+                START_IMAGE,
+                caption=admin_message,
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            )
         except FileNotFoundError:
             logger.warning(f"Start image not found: {START_IMAGE}")
             await update.message.reply_text(admin_message, reply_markup=reply_markup, parse_mode="Markdown")
@@ -85,7 +94,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     elif user_id in SELLERS:
         keyboard = [
-            [InlineKeyboardButton("💼 Seller Panel", callback_data="open_seller_panel")]
+            [InlineKeyboardButton("💼 Seller Panel", callback_data=encode_callback("seller", "open"))]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -99,13 +108,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
         try:
-            with open(START_IMAGE, 'rb') as photo:
-                await update.message.reply_photo(
-                    photo=photo,
-                    caption=seller_message,
-                    reply_markup=reply_markup,
-                    parse_mode="Markdown"
-                )
+            await media_cache.send_photo(
+                update.message.reply_photo,
+                START_IMAGE,
+                caption=seller_message,
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            )
         except FileNotFoundError:
             logger.warning(f"Start image not found: {START_IMAGE}")
             await update.message.reply_text(seller_message, reply_markup=reply_markup, parse_mode="Markdown")
@@ -115,7 +124,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     keyboard = [
-        [InlineKeyboardButton("🔑 Buy Key(s)", callback_data="buy_keys")]
+        [InlineKeyboardButton("🔑 Buy Key(s)", callback_data=encode_callback("user", "buy"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -130,13 +139,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
     try:
-        with open(START_IMAGE, 'rb') as photo:
-            await update.message.reply_photo(
-                photo=photo,
-                caption=welcome_message,
-                reply_markup=reply_markup,
-                parse_mode="Markdown"
-            )
+        await media_cache.send_photo(
+            update.message.reply_photo,
+            START_IMAGE,
+            caption=welcome_message,
+            reply_markup=reply_markup,
+            parse_mode="Markdown"
+        )
     except FileNotFoundError:
         logger.warning(f"Start image not found: {START_IMAGE}")
         await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode="Markdown")
@@ -144,6 +153,50 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Failed to send start image: {e}")
         await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode="Markdown")
 
+# ====================================================
+#                  GATEKEEPER
+# ====================================================
+
+async def gatekeep(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Drop updates from blocked or flooding users (runs before all other handlers).
+    Admins and sellers, including ones added at runtime, skip the flood limits"""
+    user = update.effective_user
+    reason = gatekeeper.check(update, exempt=user is not None and is_seller(user.id))
+    if reason is None:
+        return
+
+    try:
+        if update.callback_query is not None:
+            # Stop the button's loading spinner; answering isn't a chat send
+            await update.callback_query.answer(
+                "⛔ You have been blocked from using this bot." if reason == "blocked"
+                else "⏳ Too many requests. Please slow down.",
+                show_alert=True
+            )
+        elif reason == "blocked" and update.message and (update.message.text or "").startswith("/start"):
+            username = f"@{user.username}" if user.username else "No username"
+            await update.message.reply_text(
+                f"⛔ *ACCESS DENIED*\n\n"
+                f"You have been blocked from using this bot.\n\n"
+                f"👤 {user.full_name} ({username})",
+                parse_mode="Markdown"
+            )
+        elif reason == "flood_message" and gatekeeper.warn_once(user.id, reason):
+            await update.message.reply_text(
+                "⏳ You're sending messages too fast. Messages sent in the next few seconds won't be delivered."
+            )
+    except Exception as e:
+        logger.debug(f"Failed to notify dropped update {update.update_id}: {e}")
+    raise ApplicationHandlerStop
+
+# ====================================================
+#            PROFILE TRACKING
+# ====================================================
+
+async def track_user_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cache the sender's name/username from every update that passed the gatekeeper"""
+    profile_cache.observe(update.effective_user)
+
 # ====================================================
 #            PRODUCT SELECTION MENU
 # ====================================================
@@ -158,19 +211,6 @@ async def buy_keys_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_name = user.full_name
     username = f"@{user.username}" if user.username else "No username"
 
-    if user_id in blocked_users:
-        await query.message.delete()
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=(
-                f"⛔ *ACCESS BLOCKED*\n\n"
-                f"You have been blocked from using this bot.\n\n"
-                f"👤 {user_name} ({username})"
-            ),
-            parse_mode="Markdown"
-        )
-        return
-
     if not buy_button_enabled:
         await query.message.delete()
         await context.bot.send_message(
@@ -214,8 +254,9 @@ async def buy_keys_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     keyboard = []
-    for product_name in PRODUCT_SELLERS.keys():
-        keyboard.append([InlineKeyboardButton(f"🎯 {product_name}", callback_data=f"product_{product_name}")])
+    snapshot = catalog.snapshot()
+    for product_name in snapshot.sellers.keys():
+        keyboard.append([InlineKeyboardButton(f"🎯 {product_name}", callback_data=encode_callback("user", "product", snapshot.ids[product_name]))])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -247,7 +288,7 @@ async def product_selection_callback(update: Update, context: ContextTypes.DEFAU
     username = f"@{user.username}" if user.username else "No username"
 
     try:
-        product_name = query.data.split('_', 1)[1]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.delete()
         await context.bot.send_message(
@@ -257,7 +298,8 @@ async def product_selection_callback(update: Update, context: ContextTypes.DEFAU
         )
         return
 
-    if product_name not in PRODUCT_SELLERS:
+    snapshot = catalog.snapshot()
+    if product_name not in snapshot.sellers:
         await query.message.delete()
         await context.bot.send_message(
             chat_id=user_id,
@@ -266,7 +308,7 @@ async def product_selection_callback(update: Update, context: ContextTypes.DEFAU
         )
         return
 
-    if not PRODUCT_SELLERS[product_name]:
+    if not snapshot.sellers[product_name]:
         await query.message.delete()
         await context.bot.send_message(
             chat_id=user_id,
@@ -280,10 +322,11 @@ async def product_selection_callback(update: Update, context: ContextTypes.DEFAU
         return
 
     user_product_selection[user_id] = product_name
-    description = PRODUCT_DESCRIPTIONS.get(product_name, "No description available.")
+    last_activity[user_id] = time.monotonic()
+    description = snapshot.descriptions.get(product_name, "No description available.")
 
     keyboard = [
-        [InlineKeyboardButton("🔗 Connect with Seller", callback_data=f"connect_{product_name}")]
+        [InlineKeyboardButton("🔗 Connect with Seller", callback_data=encode_callback("user", "connect", snapshot.ids[product_name]))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -299,18 +342,18 @@ async def product_selection_callback(update: Update, context: ContextTypes.DEFAU
 
     await query.message.delete()
 
-    if product_name in PRODUCT_IMAGES:
+    if product_name in snapshot.images:
         try:
-            with open(PRODUCT_IMAGES[product_name], 'rb') as photo:
-                await context.bot.send_photo(
-                    chat_id=user_id,
-                    photo=photo,
-                    caption=product_message,
-                    reply_markup=reply_markup,
-                    parse_mode="Markdown"
-                )
+            await media_cache.send_photo(
+                context.bot.send_photo,
+                snapshot.images[product_name],
+                chat_id=user_id,
+                caption=product_message,
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            )
         except FileNotFoundError:
-            logger.warning(f"Product image not found: {PRODUCT_IMAGES[product_name]}")
+            logger.warning(f"Product image not found: {snapshot.images[product_name]}")
             await context.bot.send_message(chat_id=user_id, text=product_message, reply_markup=reply_markup, parse_mode="Markdown")
         except Exception as e:
             logger.error(f"Failed to send product image: {e}")
@@ -333,7 +376,7 @@ async def connect_with_seller_callback(update: Update, context: ContextTypes.DEF
     username = f"@{user.username}" if user.username else "No username"
 
     try:
-        product_name = query.data.split('_', 1)[1]
+        product_name = product_from_callback(query.data)
     except (IndexError, ValueError):
         await query.message.reply_text(
             f"❌ *Invalid Request*\n\n👤 {user_full_name} ({username})",
@@ -341,7 +384,8 @@ async def connect_with_seller_callback(update: Update, context: ContextTypes.DEF
         )
         return
 
-    if product_name not in PRODUCT_SELLERS or not PRODUCT_SELLERS[product_name]:
+    snapshot = catalog.snapshot()
+    if product_name not in snapshot.sellers or not snapshot.sellers[product_name]:
         await query.message.reply_text(
             f"❌ *Product Unavailable*\n\nSorry, this product is currently unavailable.\n\n👤 {user_full_name} ({username})",
             parse_mode="Markdown"
@@ -377,93 +421,62 @@ async def connect_with_seller_callback(update: Update, context: ContextTypes.DEF
         parse_mode="Markdown"
     )
 
-    keyboard = [
-        [InlineKeyboardButton("✅ Accept Request", callback_data=f"accept_{user_id}_{product_name}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    request_message = (
-        f"🆕 *NEW CONNECTION REQUEST*\n\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"📦 *Product:* {product_name}\n"
-        f"👤 *Customer:* {user_full_name}\n"
-        f"🆔 *Username:* {username}\n"
-        f"🔑 *User ID:* `{user_id}`\n\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"✨ Click *\"Accept\"* to take this customer!"
-    )
-
-    product_sellers = PRODUCT_SELLERS[product_name]
-
-    for seller_id in product_sellers:
-        if seller_alerts.get(seller_id, True):
-            try:
-                await context.bot.send_message(
-                    chat_id=seller_id,
-                    text=request_message,
-                    reply_markup=reply_markup,
-                    parse_mode="Markdown"
-                )
-            except Exception as e:
-                logger.error(f"Failed to send request to seller {seller_id}: {e}")
+    # Queued before any seller can see the request (and accept it)
+    wait_queue.add(user_id, product_name)
+    position = wait_queue.position(user_id)
+    try:
+        status = await context.bot.send_message(
+            chat_id=user_id,
+            text=status_text(product_name, position, wait_queue.eta_minutes(product_name, position)),
+            parse_mode="Markdown"
+        )
+        wait_queue.track_status(user_id, status)
+    except Exception as e:
+        logger.error(f"Failed to send queue status to {user_id}: {e}")
 
-    pending_requests[user_id] = {"product": product_name}
+    # Offer the request to sellers in the background; this update is done
+    offer_request(context.bot, user_id, product_name, user_full_name, username)
 
 # ====================================================
 #            ACCEPT REQUEST
 # ====================================================
 
-async def accept_request_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle Accept Request button press - ONLY ADMINS CAN ACCEPT"""
-    query = update.callback_query
-    acceptor_id = query.from_user.id
-    acceptor = query.from_user
-    acceptor_name = acceptor.full_name
-    acceptor_username = f"@{acceptor.username}" if acceptor.username else "No username"
-
-    try:
-        parts = query.data.split('_')
-        user_id = int(parts[1])
-        product_name = parts[2]
-    except (IndexError, ValueError):
-        await query.answer("❌ Invalid request.", show_alert=True)
-        return
-
-    if acceptor_id not in ADMINS:
-        await query.answer("❌ You are not allowed to accept requests.", show_alert=True)
-        return
-
-    if user_id not in pending_requests:
-        await query.answer("❌ This request is no longer active.", show_alert=True)
-        return
-
-    if user_id in active_sessions:
-        await query.answer("❌ Another seller has already accepted this request.", show_alert=True)
-        return
-
-    active_sessions[user_id] = {"seller_id": acceptor_id, "product": product_name}
-    reverse_sessions[acceptor_id] = user_id
-    session_start_times[user_id] = datetime.now()
-
-    del pending_requests[user_id]
+# Alerts for requests that could not be claimed (see claim_request)
+CLAIM_ALERTS = {
+    "taken": "❌ Another seller has already accepted this request.",
+    "gone": "❌ This request is no longer active.",
+    "full": "❌ You have reached your limit of active chats. End one with /stop before taking more.",
+    "empty": "✅ No customers are waiting for your products."
+}
+
+async def connect_customer(context, message, seller, user_id, product_name):
+    """Tell both sides about a session started by claim_request/claim_next_request
+    and close the request notifications other sellers got.
+    message is the seller-side message to reply to"""
+    acceptor_id = seller.id
+    acceptor_name = seller.full_name
+    acceptor_username = f"@{seller.username}" if seller.username else "No username"
+
+    offers = seller_router.accepted(user_id, acceptor_id)
+    await asyncio.gather(*(
+        close_offer(context.bot, seller_id, message_id, taken_text(product_name, user_id, seller_id == acceptor_id))
+        for seller_id, message_id in offers
+    ))
 
     if user_id in user_product_selection:
         del user_product_selection[user_id]
 
-    await query.answer("✅ Request accepted!", show_alert=True)
-
-    try:
-        user = await context.bot.get_chat(user_id)
+    user = await profile_cache.resolve(context.bot, user_id)
+    if user:
         user_full_name = user.full_name
         user_username = f"@{user.username}" if user.username else "No username"
-    except Exception as e:
-        logger.error(f"Failed to get user info: {e}")
+    else:
         user_full_name = "Unknown User"
         user_username = "No username"
 
     customer_username_line = f"  • Username: {user_username}\n" if user_username != "No username" else ""
 
-    await query.message.reply_text(
+    await message.reply_text(
         f"📞 *CONNECTION STARTED*\n\n"
         f"━━━━━━━━━━━━━━━━━\n"
         f"📦 *Product:* {product_name}\n\n"
@@ -474,6 +487,7 @@ async def accept_request_callback(update: Update, context: ContextTypes.DEFAULT_
         f"━━━━━━━━━━━━━━━━━\n"
         f"💬 You are now connected!\n"
         f"📝 Send messages normally.\n"
+        f"🔀 Use /chats to switch between customers.\n"
         f"🛑 Use /stop to end the conversation.",
         parse_mode="Markdown"
     )
@@ -499,38 +513,73 @@ async def accept_request_callback(update: Update, context: ContextTypes.DEFAULT_
     except Exception as e:
         logger.error(f"Failed to notify user {user_id}: {e}")
 
+async def accept_request_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle Accept Request button press - ONLY ADMINS CAN ACCEPT"""
+    query = update.callback_query
+    acceptor_id = query.from_user.id
+
+    try:
+        user_id = int(callback_args(query.data, 2)[0])
+        product_name = product_from_callback(query.data, 1, 2)
+    except (IndexError, ValueError):
+        await query.answer("❌ Invalid request.", show_alert=True)
+        return
+
+    if acceptor_id not in ADMINS:
+        await query.answer("❌ You are not allowed to accept requests.", show_alert=True)
+        return
+
+    outcome, product_name = claim_request(user_id, acceptor_id, product_name)
+    if outcome != "accepted":
+        await query.answer(CLAIM_ALERTS[outcome], show_alert=True)
+        return
+
+    await query.answer("✅ Request accepted!", show_alert=True)
+    await connect_customer(context, query.message, query.from_user, user_id, product_name)
+
+async def take_next_customer_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle Take Next Customer button - connect the seller with the customer
+    who has waited longest for one of their products"""
+    query = update.callback_query
+    seller_id = query.from_user.id
+
+    if seller_id not in ADMINS:
+        await query.answer("❌ You are not allowed to accept requests.", show_alert=True)
+        return
+
+    outcome, user_id, product_name = claim_next_request(seller_id)
+    if outcome != "accepted":
+        await query.answer(CLAIM_ALERTS[outcome], show_alert=True)
+        return
+
+    await query.answer(f"✅ Connecting you with customer {user_id}")
+    await connect_customer(context, query.message, query.from_user, user_id, product_name)
+
 # ====================================================
 #        ACTIVE CONVERSATION ROUTING
 # ====================================================
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Route messages between users and assigned admins only"""
-    if not update.message or not update.message.text:
+    """Route messages (text and media) between users and assigned admins only"""
+    if not update.message:
         return
 
     sender_id = update.message.from_user.id
     sender = update.message.from_user
     sender_name = sender.full_name
     sender_username = f"@{sender.username}" if sender.username else "No username"
-    message_text = update.message.text
 
     if sender_id in active_sessions:
         session_info = active_sessions[sender_id]
         seller_id = session_info["seller_id"]
         product = session_info["product"]
+        # Keeps the session clear of the idle reaper
+        last_activity[sender_id] = time.monotonic()
 
         try:
-            await context.bot.send_message(
-                chat_id=seller_id,
-                text=(
-                    f"💬 *Message from Customer*\n\n"
-                    f"👤 {sender_name} ({sender_username})\n"
-                    f"🔑 ID: `{sender_id}`\n"
-                    f"📦 Product: {product}\n\n"
-                    f"━━━━━━━━━━━━━━━━━\n"
-                    f"{message_text}"
-                ),
-                parse_mode="Markdown"
+            await relay_message(
+                context.bot, update.message, seller_id,
+                header=f"💬 Customer: {sender_name} ({sender_username}) · ID {sender_id} · 📦 {product}"
             )
         except Exception as e:
             logger.error(f"Failed to forward message to seller {seller_id}: {e}")
@@ -540,17 +589,21 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
 
     elif sender_id in reverse_sessions:
-        user_id = reverse_sessions[sender_id]
+        # Replying to a customer's relayed message answers that customer;
+        # anything else goes to the customer picked in /chats
+        user_id = None
+        reply_to = update.message.reply_to_message
+        if reply_to:
+            origin = relay_origin(sender_id, reply_to.message_id)
+            if origin in reverse_sessions[sender_id]:
+                user_id = origin
+        if user_id is None:
+            user_id = reply_target(sender_id)
+        last_activity[user_id] = time.monotonic()
         try:
-            await context.bot.send_message(
-                chat_id=user_id,
-                text=(
-                    f"💼 *Message from Seller*\n\n"
-                    f"👤 {sender_name} ({sender_username})\n\n"
-                    f"━━━━━━━━━━━━━━━━━\n"
-                    f"{message_text}"
-                ),
-                parse_mode="Markdown"
+            await relay_message(
+                context.bot, update.message, user_id,
+                header=f"💼 Seller: {sender_name} ({sender_username})"
             )
         except Exception as e:
             logger.error(f"Failed to forward message to user {user_id}: {e}")
@@ -564,7 +617,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ====================================================
 
 async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /stop command - only assigned seller can stop conversation"""
+    """Handle /stop command - only assigned seller can stop conversation.
+    Ends the chat with the current customer, or /stop <user_id> a specific one"""
     seller_id = update.message.from_user.id
     seller = update.message.from_user
     seller_name = seller.full_name
@@ -577,20 +631,35 @@ async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    user_id = reverse_sessions[seller_id]
-    session_info = active_sessions[user_id]
-    product = session_info["product"]
+    user_id = reply_target(seller_id)
+    if context.args:
+        try:
+            user_id = int(context.args[0])
+        except ValueError:
+            user_id = None
+        if user_id not in seller_sessions(seller_id):
+            await update.message.reply_text(
+                "❌ *CHAT NOT ACTIVE*\n\n"
+                "You are not chatting with that customer. Use /chats to see your active chats.",
+                parse_mode="Markdown"
+            )
+            return
+
     start_time = session_start_times.get(user_id, datetime.now())
+    # Ended before the first await, so the idle reaper can't end it a second time
+    session_info = end_session(user_id)
+    if session_info is None:
+        return
+    product = session_info["product"]
 
     update_seller_stats(seller_id, user_id)
     log_chat(user_id, seller_id, product, start_time)
 
-    try:
-        user = await context.bot.get_chat(user_id)
+    user = await profile_cache.resolve(context.bot, user_id)
+    if user:
         user_name = user.full_name
         user_username = f"@{user.username}" if user.username else "No username"
-    except Exception as e:
-        logger.error(f"Failed to get user info: {e}")
+    else:
         user_name = "Unknown User"
         user_username = "No username"
 
@@ -629,7 +698,11 @@ async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode="Markdown"
     )
 
-    del reverse_sessions[seller_id]
-    del active_sessions[user_id]
-    if user_id in session_start_times:
-        del session_start_times[user_id]
\ No newline at end of file
+    remaining = seller_sessions(seller_id)
+    if remaining:
+        await update.message.reply_text(
+            f"💬 {len(remaining)} chat(s) still active. Replies now go to customer "
+            f"`{reply_target(seller_id)}`, use /chats to switch.",
+            reply_markup=InlineKeyboardMarkup([[next_customer_button(seller_id)]]),
+            parse_mode="Markdown"
+        )
\ No newline at end of file
@@ -8,21 +8,50 @@ from .helpers import (
     get_seller_stats,
     update_seller_stats,
     log_chat,
-    get_products_for_seller
+    start_session,
+    end_session,
+    claim_request,
+    claim_next_request,
+    seller_sessions,
+    has_session_capacity,
+    reply_target,
+    set_reply_target,
+    request_is_pending,
+    offer_request,
+    close_offer,
+    taken_text,
+    get_products_for_seller,
+    product_from_callback,
+    prewarm_media,
+    create_rate_limiter,
+    start_background_tasks,
+    stop_background_tasks
 )
 
+from .session_reaper import reap_idle
+
 from .data import (
     active_sessions,
     reverse_sessions,
+    seller_focus,
     pending_requests,
     user_product_selection,
+    last_activity,
     seller_alerts,
     seller_stats,
     chat_history,
     all_users,
     blocked_users,
+    inactive_users,
+    gatekeeper,
     buy_button_enabled,
     session_start_times,
+    seller_router,
+    wait_queue,
+    catalog,
+    media_cache,
+    profile_cache,
+    broadcasts,
     temp_data
 )
 
@@ -32,17 +61,45 @@ __all__ = [
     'get_seller_stats',
     'update_seller_stats',
     'log_chat',
+    'start_session',
+    'end_session',
+    'claim_request',
+    'claim_next_request',
+    'seller_sessions',
+    'has_session_capacity',
+    'reply_target',
+    'set_reply_target',
+    'request_is_pending',
+    'offer_request',
+    'close_offer',
+    'taken_text',
     'get_products_for_seller',
+    'product_from_callback',
+    'prewarm_media',
+    'create_rate_limiter',
+    'start_background_tasks',
+    'stop_background_tasks',
+    'reap_idle',
     'active_sessions',
     'reverse_sessions',
+    'seller_focus',
     'pending_requests',
     'user_product_selection',
+    'last_activity',
     'seller_alerts',
     'seller_stats',
     'chat_history',
     'all_users',
     'blocked_users',
+    'inactive_users',
+    'gatekeeper',
     'buy_button_enabled',
     'session_start_times',
+    'seller_router',
+    'wait_queue',
+    'catalog',
+    'media_cache',
+    'profile_cache',
+    'broadcasts',
     'temp_data'
 ]
\ No newline at end of file
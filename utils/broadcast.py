@@ -0,0 +1,202 @@
+"""
+Broadcast engine for Quantum Panel Bot
+Broadcasts run as background jobs. Each job persists its recipient list once
+and a cursor after every batch, so it resumes after a restart. The admin gets
+one status message that is edited in place and carries a cancel button
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden
+
+from utils.callback_router import encode_callback
+from utils.rate_limiter import PRIORITY_BROADCAST
+
+logger = logging.getLogger(__name__)
+
+JOBS_NAMESPACE = "broadcast_jobs"
+RECIPIENTS_NAMESPACE = "broadcast_recipients"
+
+def is_unreachable(error):
+    """True when a send failed because the chat can never be reached again
+    (the user blocked the bot, deleted the account or the chat is gone)"""
+    if isinstance(error, Forbidden):
+        return True
+    return isinstance(error, BadRequest) and "chat not found" in str(error).lower()
+
+# ====================================================
+#                BROADCAST ENGINE
+# ====================================================
+
+class BroadcastEngine:
+    """Runs, persists and resumes broadcast jobs"""
+
+    def __init__(self, store, inactive_users, concurrency=20, status_interval=3.0):
+        # Recipients found unreachable are added here and left out of later broadcasts
+        self.inactive_users = inactive_users
+        self.concurrency = concurrency
+        self.status_interval = status_interval
+        # job_id -> {admin_id, status_message_id, content, target, cursor,
+        #            sent, failed, pruned, total, status, created_at}
+        self.jobs = store.dict(JOBS_NAMESPACE)
+        # job_id -> [recipient_id, ...]; removed once the job finishes
+        self.recipients = store.dict(RECIPIENTS_NAMESPACE)
+        self._tasks = {}
+
+    # ---------- job lifecycle ----------
+
+    async def submit(self, bot, admin_id, content, target, recipients):
+        """Create a broadcast job, post its status message and start sending.
+        content is {"text": ...} or {"photo": file_id, "caption": ...}"""
+        job_id = uuid.uuid4().hex[:8]
+        recipients = list(dict.fromkeys(recipients))
+        job = {
+            "admin_id": admin_id,
+            "status_message_id": None,
+            "content": content,
+            "target": target,
+            "cursor": 0,
+            "sent": 0,
+            "failed": 0,
+            "pruned": 0,
+            "total": len(recipients),
+            "status": "running",
+            "created_at": datetime.now()
+        }
+        message = await bot.send_message(
+            chat_id=admin_id,
+            text=self.status_text(job_id, job),
+            reply_markup=self._cancel_markup(job_id)
+        )
+        job["status_message_id"] = message.message_id
+        self.recipients[job_id] = recipients
+        self.jobs[job_id] = job
+        self._start(bot, job_id)
+        return job_id
+
+    def cancel(self, job_id):
+        """Ask a running job to stop after its current batch; returns False if it isn't running"""
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "running":
+            return False
+        self.jobs[job_id] = {**job, "status": "cancelled"}
+        return True
+
+    def resume(self, bot):
+        """Restart every job that was still running when the process stopped"""
+        for job_id, job in list(self.jobs.items()):
+            if job["status"] == "running" and job_id not in self._tasks:
+                logger.info(f"Resuming broadcast {job_id} at {job['cursor']}/{job['total']}")
+                self._start(bot, job_id)
+
+    async def shutdown(self):
+        """Stop running jobs; they stay marked as running and resume on next start"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, bot, job_id):
+        task = asyncio.create_task(self._run(bot, job_id), name=f"broadcast_{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    # ---------- sending ----------
+
+    async def _send(self, bot, chat_id, content):
+        if "photo" in content:
+            await bot.send_photo(
+                chat_id=chat_id, photo=content["photo"], caption=content.get("caption") or "",
+                rate_limit_args=PRIORITY_BROADCAST
+            )
+        else:
+            await bot.send_message(chat_id=chat_id, text=content["text"], rate_limit_args=PRIORITY_BROADCAST)
+
+    async def _send_one(self, bot, chat_id, content):
+        """Send to one recipient; returns "sent", "failed" or "pruned" (now marked inactive)"""
+        try:
+            await self._send(bot, chat_id, content)
+            return "sent"
+        except Exception as e:
+            if is_unreachable(e):
+                logger.info(f"Marking {chat_id} inactive: {e}")
+                self.inactive_users.add(chat_id)
+                return "pruned"
+            logger.error(f"Failed to broadcast to {chat_id}: {e}")
+            return "failed"
+
+    async def _run(self, bot, job_id):
+        recipients = self.recipients.get(job_id, [])
+        job = self.jobs[job_id]
+        started = time.monotonic()
+        last_status = 0.0
+
+        while job["cursor"] < len(recipients):
+            batch = recipients[job["cursor"]:job["cursor"] + self.concurrency]
+            results = await asyncio.gather(*(self._send_one(bot, cid, job["content"]) for cid in batch))
+
+            # Re-read: cancel() may have replaced the record meanwhile
+            job = self.jobs[job_id]
+            job = {
+                **job,
+                "cursor": job["cursor"] + len(batch),
+                "sent": job["sent"] + results.count("sent"),
+                "failed": job["failed"] + results.count("failed"),
+                "pruned": job.get("pruned", 0) + results.count("pruned")
+            }
+            self.jobs[job_id] = job
+
+            if job["status"] != "running":
+                break
+            if time.monotonic() - last_status >= self.status_interval:
+                last_status = time.monotonic()
+                await self._update_status(bot, job_id, job)
+
+        if job["status"] == "running":
+            job = {**job, "status": "done"}
+            self.jobs[job_id] = job
+        self.recipients.pop(job_id, None)
+        await self._update_status(bot, job_id, job)
+        logger.info(
+            f"Broadcast {job_id} {job['status']} in {time.monotonic() - started:.1f}s: "
+            f"{job['sent']} sent, {job['failed']} failed, {job.get('pruned', 0)} pruned of {job['total']}"
+        )
+
+    # ---------- status message ----------
+
+    @staticmethod
+    def _cancel_markup(job_id):
+        return InlineKeyboardMarkup([[InlineKeyboardButton("🛑 Cancel Broadcast", callback_data=encode_callback("broadcast", "cancel", job_id))]])
+
+    @staticmethod
+    def status_text(job_id, job):
+        headline = {
+            "running": "📢 Broadcast in progress...",
+            "done": "✅ Broadcast completed!",
+            "cancelled": "🛑 Broadcast cancelled."
+        }[job["status"]]
+        return (
+            f"{headline}\n"
+            f"Job: {job_id} ({job['target']})\n\n"
+            f"Sent: {job['sent']}\n"
+            f"Failed: {job['failed']}\n"
+            f"Unreachable (pruned): {job.get('pruned', 0)}\n"
+            f"Remaining: {job['total'] - job['cursor']}"
+        )
+
+    async def _update_status(self, bot, job_id, job):
+        try:
+            await bot.edit_message_text(
+                chat_id=job["admin_id"],
+                message_id=job["status_message_id"],
+                text=self.status_text(job_id, job),
+                reply_markup=self._cancel_markup(job_id) if job["status"] == "running" else None
+            )
+        except Exception as e:
+            # "Message is not modified" and deleted status messages are harmless
+            logger.debug(f"Failed to update broadcast {job_id} status: {e}")
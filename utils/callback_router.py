@@ -0,0 +1,194 @@
+"""
+Callback query router for Quantum Panel Bot
+callback_data uses a compact, versioned "2:namespace:action[:args]" scheme
+built with encode_callback(). Products are referred to by catalog ID, and
+args too long for Telegram's 64-byte limit are stored server-side. One
+CallbackQueryHandler looks the route up in a dict instead of trying dozens
+of regex patterns in turn. Conversation entry points keep their own
+CallbackQueryHandler and match with router.matches(...)
+"""
+
+import hashlib
+import importlib
+import logging
+import time
+
+from telegram.ext import CallbackQueryHandler
+
+import utils.data
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = ":"
+
+# Version 2 carries product IDs; version 1 ("namespace:action:args", no
+# version field) carried product names, version 0 is the LEGACY_* scheme
+CALLBACK_VERSION = 2
+MAX_CALLBACK_BYTES = 64
+# Marks args stored in utils.data.callback_payloads instead of inline
+STORED_MARKER = "~"
+
+# Buttons sent before the namespace:action scheme, so they keep working
+LEGACY_ROUTES = {
+    "buy_keys": "user:buy",
+    "open_admin_panel": "admin:open",
+    "open_seller_panel": "seller:open",
+    "seller_stats": "seller:stats",
+    "seller_products": "seller:products",
+    "seller_active_chat": "seller:chat",
+    "seller_toggle_alerts": "seller:alerts",
+    "seller_help": "seller:help",
+    "admin_manage_sellers": "admin:sellers",
+    "admin_manage_products": "admin:products",
+    "admin_broadcast": "admin:broadcast",
+    "admin_global_stats": "admin:stats",
+    "admin_monitor_sessions": "admin:sessions",
+    "admin_logs": "admin:logs",
+    "admin_export": "admin:export",
+    "admin_emergency": "admin:emergency",
+    "admin_back": "admin:back",
+    "admin_select_product_add_seller": "sellers:pick_add",
+    "admin_select_product_remove_seller": "sellers:pick_remove",
+    "admin_select_product_view_sellers": "sellers:pick_view",
+    "admin_add_product": "products:add",
+    "admin_remove_product": "products:pick_remove",
+    "admin_assign_sellers": "products:pick_assign",
+    "admin_remove_seller_product": "products:pick_unassign",
+    "admin_view_products": "products:view",
+    "broadcast_users": "broadcast:users",
+    "broadcast_sellers": "broadcast:sellers",
+    "broadcast_everyone": "broadcast:everyone",
+    "view_chat_logs": "logs:chats",
+    "view_seller_performance": "logs:sellers",
+    "export_users": "export:users",
+    "export_sellers": "export:sellers",
+    "export_products": "export:products",
+    "export_chats": "export:chats",
+    "emergency_disable_buy": "emergency:disable_buy",
+    "emergency_enable_buy": "emergency:enable_buy",
+    "emergency_block_user": "emergency:block",
+    "emergency_unblock_user": "emergency:unblock",
+}
+
+# (prefix, route, number of "_"-separated args)
+LEGACY_PREFIXES = (
+    ("product_", "user:product", 1),
+    ("connect_", "user:connect", 1),
+    ("accept_", "req:accept", 2),
+    ("seller_end_chat_", "seller:end", 1),
+    ("viewsellers_of_", "sellers:view", 1),
+    ("addseller_to_", "sellers:add", 1),
+    ("remseller_from_", "sellers:remove", 1),
+    ("remove_product_", "products:remove", 1),
+    ("assign_to_", "products:assign", 1),
+    ("rmseller_from_", "products:unassign", 1),
+    ("broadcast_cancel_", "broadcast:cancel", 1),
+    ("force_stop_", "sessions:stop", 1),
+)
+
+# ====================================================
+#                CALLBACK DATA SCHEME
+# ====================================================
+
+def encode_callback(namespace, action, *args):
+    """Build callback_data for a route; args that don't fit are stored server-side"""
+    route = f"{CALLBACK_VERSION}{SEPARATOR}{namespace}{SEPARATOR}{action}"
+    if not args:
+        return route
+    payload = SEPARATOR.join(map(str, args))
+    data = f"{route}{SEPARATOR}{payload}"
+    if len(data.encode("utf-8")) <= MAX_CALLBACK_BYTES:
+        return data
+
+    # Content-addressed, so re-rendering the same button doesn't add entries
+    key = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    if utils.data.callback_payloads.get(key) != payload:
+        utils.data.callback_payloads[key] = payload
+    return f"{route}{SEPARATOR}{STORED_MARKER}{key}"
+
+def _decode(data):
+    """Split callback_data into (version, route, raw payload); route is None if unknown"""
+    # Legacy first: their args are product names, which may contain SEPARATOR
+    route = LEGACY_ROUTES.get(data)
+    if route is not None:
+        return 0, route, ""
+    for prefix, route, nargs in LEGACY_PREFIXES:
+        if data.startswith(prefix):
+            payload = data[len(prefix):]
+            if nargs > 1:
+                payload = payload.replace("_", SEPARATOR, nargs - 1)
+            return 0, route, payload
+
+    parts = data.split(SEPARATOR, 3)
+    if parts[0].isdigit():
+        if len(parts) < 3:
+            return None, None, ""
+        return int(parts[0]), f"{parts[1]}{SEPARATOR}{parts[2]}", parts[3] if len(parts) == 4 else ""
+    if len(parts) > 1:
+        return 1, f"{parts[0]}{SEPARATOR}{parts[1]}", SEPARATOR.join(parts[2:])
+    return None, None, ""
+
+def parse_callback_data(data):
+    """Split callback_data into (route, payload); route is None if unknown.
+    A stored payload is returned as its key; callback_args() resolves it"""
+    _, route, payload = _decode(data)
+    return route, payload
+
+def callback_version(data):
+    """Scheme version of callback_data (see CALLBACK_VERSION)"""
+    return _decode(data)[0]
+
+def callback_args(data, count=1):
+    """Return the `count` arguments of callback_data; the last one may contain ':'.
+    Raises ValueError when a stored payload no longer exists"""
+    payload = _decode(data)[2]
+    if payload.startswith(STORED_MARKER):
+        key = payload[len(STORED_MARKER):]
+        payload = utils.data.callback_payloads.get(key)
+        if payload is None:
+            raise ValueError(f"Unknown callback payload {key}")
+    return payload.split(SEPARATOR, count - 1)
+
+def lazy_callback(module, name):
+    """Callback that imports module.name on first use, for rarely used handlers"""
+    target = None
+
+    async def callback(update, context):
+        nonlocal target
+        if target is None:
+            started = time.monotonic()
+            target = getattr(importlib.import_module(module), name)
+            logger.info(f"Loaded {module}.{name} in {(time.monotonic() - started) * 1000:.0f} ms")
+        return await target(update, context)
+
+    return callback
+
+# ====================================================
+#                  CALLBACK ROUTER
+# ====================================================
+
+class CallbackRouter:
+    """O(1) dispatch of callback queries by their namespace:action route"""
+
+    def __init__(self):
+        self.routes = {}
+
+    def add(self, namespace, action, callback):
+        self.routes[f"{namespace}{SEPARATOR}{action}"] = callback
+
+    @staticmethod
+    def matches(namespace, action):
+        """Pattern for a CallbackQueryHandler outside the router (conversation entry points)"""
+        route = f"{namespace}{SEPARATOR}{action}"
+        return lambda data: isinstance(data, str) and parse_callback_data(data)[0] == route
+
+    def _is_routed(self, data):
+        return isinstance(data, str) and parse_callback_data(data)[0] in self.routes
+
+    async def dispatch(self, update, context):
+        route, _ = parse_callback_data(update.callback_query.data)
+        return await self.routes[route](update, context)
+
+    def handler(self):
+        """The single CallbackQueryHandler serving every registered route"""
+        return CallbackQueryHandler(self.dispatch, pattern=self._is_routed)
@@ -0,0 +1,197 @@
+"""
+Product catalog store for Quantum Panel Bot
+The catalog is persisted as a single versioned record. Readers get an
+immutable snapshot; writers build a new version from the stored one and
+write it in one SQLite transaction, conditional on the version they read,
+so concurrent writers in different workers never overwrite each other.
+Every product has a stable numeric ID (never reused), used in callback_data
+"""
+
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from utils.storage import VersionConflict
+
+logger = logging.getLogger(__name__)
+
+CATALOG_NAMESPACE = "catalog"
+CATALOG_KEY = "current"
+
+def _assign_ids(products, next_id):
+    """Give products without an ID the next free ones; returns the new next_id"""
+    next_id = max([next_id] + [p["id"] + 1 for p in products.values() if p.get("id") is not None])
+    for name in sorted(products):
+        if products[name].get("id") is None:
+            products[name]["id"] = next_id
+            next_id += 1
+    return next_id
+
+# ====================================================
+#                 CATALOG SNAPSHOT
+# ====================================================
+
+class CatalogSnapshot:
+    """Immutable view of one catalog version"""
+
+    __slots__ = ("version", "next_id", "ids", "names", "sellers", "descriptions", "images")
+
+    def __init__(self, version, products, next_id):
+        self.version = version
+        self.next_id = next_id
+        # product_name -> product ID, and back
+        self.ids = MappingProxyType({name: p["id"] for name, p in products.items()})
+        self.names = MappingProxyType({p["id"]: name for name, p in products.items()})
+        # product_name -> (seller_id, ...)
+        self.sellers = MappingProxyType({name: tuple(p["sellers"]) for name, p in products.items()})
+        # product_name -> description
+        self.descriptions = MappingProxyType({
+            name: p["description"] for name, p in products.items() if p.get("description") is not None
+        })
+        # product_name -> image path or Telegram file_id
+        self.images = MappingProxyType({
+            name: p["image"] for name, p in products.items() if p.get("image") is not None
+        })
+
+    def to_products(self):
+        """Return a mutable copy of the catalog, used to build the next version"""
+        return {
+            name: {
+                "id": self.ids[name],
+                "sellers": list(sellers),
+                "description": self.descriptions.get(name),
+                "image": self.images.get(name)
+            }
+            for name, sellers in self.sellers.items()
+        }
+
+    def products_for_seller(self, seller_id):
+        """Return all products a seller is assigned to"""
+        return [product for product, sellers in self.sellers.items() if seller_id in sellers]
+
+# ====================================================
+#                  CATALOG STORE
+# ====================================================
+
+class CatalogStore:
+    """Versioned, persistent product catalog shared by every worker"""
+
+    def __init__(self, store, seed_products, refresh_interval=5.0):
+        self._store = store
+        self._write_lock = threading.Lock()
+        self._refresh_interval = refresh_interval
+        self._next_refresh = time.monotonic() + refresh_interval
+
+        record = self._load_record()
+        if record is None:
+            next_id = _assign_ids(seed_products, 1)
+            seed = self._to_record(CatalogSnapshot(1, seed_products, next_id))
+            # Only the first of several workers starting at once seeds it
+            if self._store.update_versioned(
+                CATALOG_NAMESPACE, CATALOG_KEY, lambda current: seed if current is None else None
+            ):
+                logger.info(f"Seeded product catalog with {len(seed_products)} products")
+            record = self._load_record()
+
+        missing_ids = any(p.get("id") is None for p in record["products"].values())
+        self._snapshot = self._from_record(record)
+        if missing_ids:
+            # Catalog written before products had IDs
+            self._commit(lambda products: None)
+            logger.info("Assigned IDs to catalog products")
+
+    @staticmethod
+    def _from_record(record):
+        products = record["products"]
+        next_id = _assign_ids(products, record.get("next_id", 1))
+        return CatalogSnapshot(record["version"], products, next_id)
+
+    def _load_record(self):
+        return dict(self._store.load(CATALOG_NAMESPACE)).get(CATALOG_KEY)
+
+    @staticmethod
+    def _to_record(snapshot):
+        return {
+            "version": snapshot.version,
+            "next_id": snapshot.next_id,
+            "products": snapshot.to_products()
+        }
+
+    def _refresh(self):
+        """Swap in a newer version written by another worker, if there is one"""
+        self._next_refresh = time.monotonic() + self._refresh_interval
+        record = self._load_record()
+        if record is not None and record["version"] > self._snapshot.version:
+            self._snapshot = self._from_record(record)
+            logger.info(f"Reloaded product catalog version {record['version']}")
+
+    def snapshot(self):
+        """Return the current immutable catalog snapshot"""
+        if time.monotonic() >= self._next_refresh:
+            self._refresh()
+        return self._snapshot
+
+    def _commit(self, change):
+        """Apply change(products) to a copy of the stored version and write the
+        next version in one transaction, retrying if another worker got there
+        first. change returns False to abort without writing."""
+        with self._write_lock:
+            while True:
+                built = []
+
+                def build(record):
+                    base = self._from_record(record) if record is not None else self._snapshot
+                    built[:] = [base, None]
+                    products = base.to_products()
+                    if change(products) is False:
+                        return None
+                    next_id = _assign_ids(products, base.next_id)
+                    built[1] = CatalogSnapshot(base.version + 1, products, next_id)
+                    return self._to_record(built[1])
+
+                try:
+                    written = self._store.update_versioned(CATALOG_NAMESPACE, CATALOG_KEY, build)
+                except VersionConflict:
+                    logger.info("Product catalog changed by another worker, retrying")
+                    continue
+                base, snapshot = built
+                self._snapshot = snapshot if written else base
+                self._next_refresh = time.monotonic() + self._refresh_interval
+                return written
+
+    # ---------- writers ----------
+
+    def add_product(self, name, description, image, seller_ids):
+        """Add a new product; returns False if it already exists"""
+        def change(products):
+            if name in products:
+                return False
+            products[name] = {"sellers": list(dict.fromkeys(seller_ids)), "description": description, "image": image}
+        return self._commit(change)
+
+    def remove_product(self, name):
+        """Remove a product; returns False if it doesn't exist"""
+        def change(products):
+            if products.pop(name, None) is None:
+                return False
+        return self._commit(change)
+
+    def add_sellers(self, name, seller_ids):
+        """Assign sellers to a product; returns False if the product doesn't exist"""
+        def change(products):
+            if name not in products:
+                return False
+            sellers = products[name]["sellers"]
+            for sid in seller_ids:
+                if sid not in sellers:
+                    sellers.append(sid)
+        return self._commit(change)
+
+    def remove_seller(self, name, seller_id):
+        """Unassign a seller; returns False if they weren't assigned to the product"""
+        def change(products):
+            if name not in products or seller_id not in products[name]["sellers"]:
+                return False
+            products[name]["sellers"].remove(seller_id)
+        return self._commit(change)
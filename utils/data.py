@@ -1,37 +1,80 @@
 """
 Data storage for Quantum Panel Bot
+Persistent structures are backed by SQLite (see utils.storage) and behave
+like the plain dicts, sets and lists they replace
 """
 
+from config import (
+    DATABASE_PATH, DATABASE_BATCH_SIZE, DATABASE_FLUSH_INTERVAL, SESSION_SNAPSHOT_EVERY,
+    CATALOG_REFRESH_INTERVAL, PRODUCT_SELLERS, PRODUCT_DESCRIPTIONS, PRODUCT_IMAGES,
+    PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, BROADCAST_CONCURRENCY, BROADCAST_STATUS_INTERVAL,
+    FLOOD_LIMIT_MESSAGES, FLOOD_LIMIT_PRODUCT, FLOOD_LIMIT_CONNECT,
+    SELLER_ROUTING, SELLER_OFFER_TIMEOUT, SELLER_ESCALATION_LIMIT, FANOUT_CONCURRENCY, SELLER_MAX_SESSIONS, SELLER_SESSION_LIMITS,
+    WAIT_QUEUE_UPDATE_INTERVAL, WAIT_QUEUE_DURATION_WINDOW, WAIT_QUEUE_DEFAULT_DURATION
+)
+from utils.storage import Store
+from utils.session_journal import SessionJournal
+from utils.catalog import CatalogStore
+from utils.media_cache import MediaCache
+from utils.profile_cache import ProfileCache
+from utils.broadcast import BroadcastEngine
+from utils.gatekeeper import Gatekeeper
+from utils.seller_routing import SellerRouter
+from utils.wait_queue import WaitQueue
+
 # ====================================================
 #                    DATA STORAGE
 # ====================================================
 
+store = Store(DATABASE_PATH, batch_size=DATABASE_BATCH_SIZE, flush_interval=DATABASE_FLUSH_INTERVAL)
+
 # Active sessions: user_id -> {"seller_id": admin_id, "product": product_name}
+# Sessions are changed only through session_journal (see start_session/end_session)
 active_sessions = {}
 
-# Reverse sessions: admin_id -> user_id
+# Reverse sessions: admin_id -> [user_id, ...] (oldest session first)
 reverse_sessions = {}
 
-# Pending requests: user_id -> {"product": product_name}
-pending_requests = {}
+# Customer a seller's plain messages go to: admin_id -> user_id
+# (see reply_target; falls back to the seller's newest session)
+seller_focus = {}
+
+# Pending requests: user_id -> {"product": product_name, "queued_at": timestamp}
+# Changed only through wait_queue, which keeps them in order
+pending_requests = store.dict("pending_requests")
 
 # User product selection: user_id -> product_name (temporary storage)
 user_product_selection = {}
 
+# Last session message or product selection: user_id -> time.monotonic()
+# (the idle reaper's clock, see utils.helpers.reap_idle)
+last_activity = {}
+
 # Seller alerts: seller_id -> bool (True = enabled, False = disabled)
-seller_alerts = {}
+seller_alerts = store.dict("seller_alerts")
 
 # Seller statistics: seller_id -> {total_served, chats_completed, last_10_users, ...}
-seller_stats = {}
+seller_stats = store.dict("seller_stats")
 
 # Chat history: [{user_id, seller_id, product, start_time, end_time, messages}]
-chat_history = []
+chat_history = store.list("chat_history")
 
 # All users who've started the bot
-all_users = set()
+all_users = store.set("all_users")
 
 # Blocked users
-blocked_users = set()
+blocked_users = store.set("blocked_users")
+
+# Users that can't be reached any more (blocked the bot, account deleted);
+# left out of broadcasts until they /start the bot again
+inactive_users = store.set("inactive_users")
+
+# Drops updates from blocked users and flooding users before any handler runs
+gatekeeper = Gatekeeper(
+    blocked_users,
+    limits={"message": FLOOD_LIMIT_MESSAGES, "product": FLOOD_LIMIT_PRODUCT, "connect": FLOOD_LIMIT_CONNECT},
+    active_sessions=active_sessions
+)
 
 # Buy button enabled/disabled
 buy_button_enabled = True
@@ -39,5 +82,56 @@ buy_button_enabled = True
 # Session start times: user_id -> datetime
 session_start_times = {}
 
+# Offers new requests to sellers based on their live load (reverse_sessions)
+seller_router = SellerRouter(
+    reverse_sessions, seller_alerts,
+    strategy=SELLER_ROUTING, offer_timeout=SELLER_OFFER_TIMEOUT, fanout_concurrency=FANOUT_CONCURRENCY,
+    max_sessions=SELLER_MAX_SESSIONS, session_limits=SELLER_SESSION_LIMITS,
+    escalation_limit=SELLER_ESCALATION_LIMIT
+)
+
+# Journal of session starts/ends; rebuilds the three session maps on startup
+session_journal = SessionJournal(
+    store, active_sessions, reverse_sessions, session_start_times,
+    snapshot_every=SESSION_SNAPSHOT_EVERY
+)
+session_journal.restore()
+
+# Product catalog: read with catalog.snapshot(), change with its writer methods
+catalog = CatalogStore(
+    store,
+    seed_products={
+        name: {
+            "sellers": sellers,
+            "description": PRODUCT_DESCRIPTIONS.get(name),
+            "image": PRODUCT_IMAGES.get(name)
+        }
+        for name, sellers in PRODUCT_SELLERS.items()
+    },
+    refresh_interval=CATALOG_REFRESH_INTERVAL
+)
+
+# Pending requests in FIFO order per product; add/remove requests through it
+wait_queue = WaitQueue(
+    pending_requests, catalog, seller_router,
+    window=WAIT_QUEUE_DURATION_WINDOW, default_duration=WAIT_QUEUE_DEFAULT_DURATION,
+    update_interval=WAIT_QUEUE_UPDATE_INTERVAL
+)
+
+# Telegram file_ids of uploaded local images: path -> {file_id, mtime, sha256}
+media_cache = MediaCache(store)
+
+# Names/usernames of users seen in updates: user_id -> Profile (in memory only)
+profile_cache = ProfileCache(capacity=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+# Background broadcast jobs, persisted so they resume after a restart
+broadcasts = BroadcastEngine(
+    store, inactive_users,
+    concurrency=BROADCAST_CONCURRENCY, status_interval=BROADCAST_STATUS_INTERVAL
+)
+
+# callback_data args too long to send inline: key -> payload (see utils.callback_router)
+callback_payloads = store.dict("callback_payloads")
+
 # Temporary data for multi-step processes
-temp_data = {}
\ No newline at end of file
+temp_data = {}
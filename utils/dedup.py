@@ -0,0 +1,51 @@
+"""
+Webhook update de-duplication for Quantum Panel Bot
+Drops updates Telegram redelivers after a slow or failed webhook response
+"""
+
+import threading
+from collections import OrderedDict
+
+# ====================================================
+#            RECENT UPDATE ID TRACKER
+# ====================================================
+
+class UpdateDeduplicator:
+    """Fixed-size LRU of recently seen update IDs with hit counters"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def seen(self, update_id):
+        """Record an update ID; returns True if it was already seen (a replay)"""
+        if update_id is None:
+            return False
+        with self._lock:
+            if update_id in self._seen:
+                self._seen.move_to_end(update_id)
+                self.hits += 1
+                return True
+            self._seen[update_id] = None
+            if len(self._seen) > self.capacity:
+                self._seen.popitem(last=False)
+            self.misses += 1
+            return False
+
+    def forget(self, update_id):
+        """Drop an update ID so a redelivery of it is processed again"""
+        with self._lock:
+            self._seen.pop(update_id, None)
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            return {
+                "duplicates_dropped": self.hits,
+                "unique_updates": self.misses,
+                "tracked_ids": len(self._seen),
+                "capacity": self.capacity
+            }
@@ -0,0 +1,82 @@
+"""
+Concurrent message fan-out for Quantum Panel Bot
+Sends one message to many chats at once with a concurrency bound and records
+per-chat delivery latency and failures. Flood control is handled by the
+bot's rate limiter (see utils.rate_limiter)
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# ====================================================
+#                 DELIVERY STATS
+# ====================================================
+
+class DeliveryStats:
+    """Per-chat delivery counters and latencies, kept in memory"""
+
+    def __init__(self):
+        # chat_id -> {"delivered", "failed", "last_latency_ms", "avg_latency_ms", "last_error"}
+        self.chats = {}
+
+    def _entry(self, chat_id):
+        return self.chats.setdefault(chat_id, {
+            "delivered": 0, "failed": 0,
+            "last_latency_ms": None, "avg_latency_ms": None, "last_error": None
+        })
+
+    def record_delivery(self, chat_id, latency_ms):
+        entry = self._entry(chat_id)
+        entry["delivered"] += 1
+        entry["last_latency_ms"] = latency_ms
+        avg = entry["avg_latency_ms"]
+        entry["avg_latency_ms"] = latency_ms if avg is None else avg + (latency_ms - avg) / entry["delivered"]
+
+    def record_failure(self, chat_id, error):
+        entry = self._entry(chat_id)
+        entry["failed"] += 1
+        entry["last_error"] = str(error)
+
+    def get(self, chat_id):
+        return self.chats.get(chat_id)
+
+delivery_stats = DeliveryStats()
+
+# ====================================================
+#                      FAN-OUT
+# ====================================================
+
+async def _deliver(send, chat_id, semaphore):
+    """Run send(chat_id); returns latency in ms or None on failure"""
+    async with semaphore:
+        started = time.monotonic()
+        try:
+            await send(chat_id)
+        except Exception as e:
+            logger.error(f"Failed to deliver to chat {chat_id}: {e}")
+            delivery_stats.record_failure(chat_id, e)
+            return None
+
+    latency_ms = (time.monotonic() - started) * 1000
+    delivery_stats.record_delivery(chat_id, latency_ms)
+    return latency_ms
+
+async def fan_out(send, chat_ids, concurrency=10):
+    """Call send(chat_id) for every chat concurrently, at most `concurrency` at a time.
+    Returns {chat_id: latency_ms} for delivered chats and {chat_id: None} for failures."""
+    chat_ids = list(dict.fromkeys(chat_ids))
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+    latencies = await asyncio.gather(*(_deliver(send, cid, semaphore) for cid in chat_ids))
+    results = dict(zip(chat_ids, latencies))
+
+    delivered = [ms for ms in latencies if ms is not None]
+    logger.info(
+        f"Fan-out delivered {len(delivered)}/{len(chat_ids)} in "
+        f"{(time.monotonic() - started) * 1000:.0f} ms"
+        + (f" (slowest {max(delivered):.0f} ms)" if delivered else "")
+    )
+    return results
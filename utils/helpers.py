@@ -2,9 +2,27 @@
 Helper functions for Quantum Panel Bot
 """
 
+import asyncio
+import logging
+import threading
+import time
 from datetime import datetime
-from config import ADMINS, SELLERS, PRODUCT_SELLERS
-from utils.data import seller_stats, chat_history
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import (
+    ADMINS, SELLERS, START_IMAGE, MEDIA_CACHE_CHAT_ID, PROFILE_REFRESH_INTERVAL,
+    RATE_LIMIT_GLOBAL, RATE_LIMIT_PER_CHAT, RATE_LIMIT_CHAT_BURST, RATE_LIMIT_PER_GROUP,
+    RATE_LIMIT_MAX_RETRIES
+)
+from utils.data import (
+    seller_stats, chat_history, session_journal, catalog, media_cache, profile_cache,
+    broadcasts, seller_router, active_sessions, reverse_sessions, seller_focus, session_start_times,
+    pending_requests, wait_queue, last_activity
+)
+from utils.callback_router import callback_args, callback_version, encode_callback
+from utils.rate_limiter import PriorityRateLimiter, PRIORITY_REQUEST
+from utils.relay import forget_relay_sender
+
+logger = logging.getLogger(__name__)
 
 # ====================================================
 #                PERMISSION HELPERS
@@ -47,16 +65,192 @@ def update_seller_stats(seller_id, user_id):
         if len(stats["last_10_users"]) > 10:
             stats["last_10_users"] = stats["last_10_users"][:10]
 
-def log_chat(user_id, seller_id, product, start_time, end_time=None):
-    """Log a completed chat to history"""
-    chat_history.append({
+    # Re-assign so the in-place changes are written to storage
+    seller_stats[seller_id] = stats
+
+def log_chat(user_id, seller_id, product, start_time, end_time=None, ended_by=None):
+    """Log a completed chat to history; ended_by notes chats not closed by
+    the seller (e.g. "idle timeout")"""
+    entry = {
         "user_id": user_id,
         "seller_id": seller_id,
         "product": product,
         "start_time": start_time,
         "end_time": end_time or datetime.now(),
         "messages": 0
-    })
+    }
+    if ended_by:
+        entry["ended_by"] = ended_by
+    chat_history.append(entry)
+
+# ====================================================
+#                SESSION HELPERS
+# ====================================================
+
+def start_session(user_id, seller_id, product):
+    """Connect a customer with a seller (journaled for crash recovery).
+    The seller's plain messages go to the newest customer until they switch"""
+    session_journal.start(user_id, seller_id, product)
+    seller_focus[seller_id] = user_id
+    last_activity[user_id] = time.monotonic()
+
+def end_session(user_id):
+    """End a customer's session (journaled); returns the session info or None"""
+    start_time = session_start_times.get(user_id)
+    session_info = session_journal.end(user_id)
+    if session_info:
+        last_activity.pop(user_id, None)
+        if isinstance(start_time, datetime):
+            # Feeds the ETA shown to customers waiting for this product
+            wait_queue.record_duration(session_info["product"], (datetime.now() - start_time).total_seconds())
+        seller_id = session_info["seller_id"]
+        forget_relay_sender(user_id, seller_id)
+        if seller_focus.get(seller_id) == user_id:
+            del seller_focus[seller_id]
+    return session_info
+
+# Held while a request is checked and turned into a session
+_claim_lock = threading.Lock()
+
+def claim_request(user_id, seller_id, product=None):
+    """Compare-and-set acceptance of a pending request: take it off the queue
+    and start the session only if it is still pending (for product, if given)
+    and the seller has room, so exactly one concurrent caller wins.
+    Returns (outcome, product) with outcome "accepted", "taken", "gone" or "full"."""
+    with _claim_lock:
+        if user_id in active_sessions:
+            return "taken", None
+        request = wait_queue.pending_requests.get(user_id)
+        if request is None or (product is not None and request["product"] != product):
+            return "gone", None
+        if not has_session_capacity(seller_id):
+            return "full", None
+        product = wait_queue.remove(user_id)
+        start_session(user_id, seller_id, product)
+        return "accepted", product
+
+def claim_next_request(seller_id):
+    """Like claim_request for the longest-waiting request for the seller's
+    products; returns (outcome, user_id, product), outcome "empty" if none wait"""
+    with _claim_lock:
+        if not has_session_capacity(seller_id):
+            return "full", None, None
+        entry = wait_queue.take_next(get_products_for_seller(seller_id))
+        if entry is None:
+            return "empty", None, None
+        user_id, product = entry
+        start_session(user_id, seller_id, product)
+        return "accepted", user_id, product
+
+def seller_sessions(seller_id):
+    """Customers a seller is chatting with, oldest session first"""
+    return list(reverse_sessions.get(seller_id, ()))
+
+def has_session_capacity(seller_id):
+    """Check if a seller can take another customer"""
+    return seller_router.has_capacity(seller_id)
+
+def reply_target(seller_id):
+    """Customer a seller's plain messages go to: the one they switched to,
+    else their newest session (None without sessions)"""
+    customers = reverse_sessions.get(seller_id)
+    if not customers:
+        return None
+    user_id = seller_focus.get(seller_id)
+    return user_id if user_id in customers else customers[-1]
+
+def set_reply_target(seller_id, user_id):
+    """Switch a seller's replies to one of their customers; returns False if
+    that customer isn't in a session with them"""
+    if user_id not in reverse_sessions.get(seller_id, ()):
+        return False
+    seller_focus[seller_id] = user_id
+    return True
+
+# ====================================================
+#                 REQUEST OFFERS
+# ====================================================
+
+def request_is_pending(user_id):
+    """Whether user_id's request is still waiting for a seller"""
+    return user_id in pending_requests and user_id not in active_sessions
+
+def taken_text(product_name, user_id, by_you):
+    """Text replacing a request notification once the request is taken"""
+    return (
+        f"✅ *REQUEST TAKEN*\n\n"
+        f"━━━━━━━━━━━━━━━━━\n"
+        f"📦 *Product:* {product_name}\n"
+        f"🔑 *User ID:* `{user_id}`\n\n"
+        f"━━━━━━━━━━━━━━━━━\n"
+        + ("You accepted this request." if by_you else "Another seller accepted this request.")
+    )
+
+async def close_offer(bot, seller_id, message_id, text):
+    """Replace a request notification, dropping its Accept button"""
+    try:
+        await bot.edit_message_text(
+            chat_id=seller_id, message_id=message_id, text=text,
+            parse_mode="Markdown", rate_limit_args=PRIORITY_REQUEST
+        )
+    except Exception as e:
+        logger.debug(f"Failed to close request notification for seller {seller_id}: {e}")
+
+def offer_request(bot, user_id, product_name, user_full_name, username):
+    """Offer a queued request to the product's sellers in the background
+    (see SellerRouter.route); returns the routing task, or None if the
+    product no longer exists"""
+    snapshot = catalog.snapshot()
+    if product_name not in snapshot.ids:
+        return None
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("✅ Accept Request", callback_data=encode_callback("req", "accept", user_id, snapshot.ids[product_name]))]
+    ])
+    request_message = (
+        f"🆕 *NEW CONNECTION REQUEST*\n\n"
+        f"━━━━━━━━━━━━━━━━━\n"
+        f"📦 *Product:* {product_name}\n"
+        f"👤 *Customer:* {user_full_name}\n"
+        f"🆔 *Username:* {username}\n"
+        f"🔑 *User ID:* `{user_id}`\n\n"
+        f"━━━━━━━━━━━━━━━━━\n"
+        f"✨ Click *\"Accept\"* to take this customer!"
+    )
+
+    async def send_request(seller_id):
+        message = await bot.send_message(
+            chat_id=seller_id,
+            text=request_message,
+            reply_markup=reply_markup,
+            parse_mode="Markdown",
+            rate_limit_args=PRIORITY_REQUEST
+        )
+        if not request_is_pending(user_id):
+            # Accepted while this notification was on its way
+            await close_offer(bot, seller_id, message.message_id, taken_text(product_name, user_id, False))
+        return message
+
+    return seller_router.start(
+        user_id, product_name, snapshot.sellers[product_name], send_request,
+        lambda: request_is_pending(user_id)
+    )
+
+async def resume_request_routing(bot):
+    """Offer requests left pending by the last run again, oldest first.
+    Their routing tasks did not survive the restart, so otherwise only
+    Take Next Customer would ever reach them"""
+    resumed = 0
+    for user_id, product_name in wait_queue.requests():
+        if not request_is_pending(user_id):
+            continue
+        profile = await profile_cache.resolve(bot, user_id)
+        user_full_name = profile.full_name if profile else "Unknown User"
+        username = f"@{profile.username}" if profile and profile.username else "No username"
+        if offer_request(bot, user_id, product_name, user_full_name, username) is not None:
+            resumed += 1
+    if resumed:
+        logger.info(f"Re-routing {resumed} requests left pending by the last run")
 
 # ====================================================
 #                PRODUCT HELPERS
@@ -64,8 +258,69 @@ def log_chat(user_id, seller_id, product, start_time, end_time=None):
 
 def get_products_for_seller(seller_id):
     """Get all products assigned to a seller"""
-    products = []
-    for product, sellers in PRODUCT_SELLERS.items():
-        if seller_id in sellers:
-            products.append(product)
-    return products
\ No newline at end of file
+    return catalog.snapshot().products_for_seller(seller_id)
+
+def product_from_callback(data, index=0, count=1):
+    """Product name from argument `index` of callback_data.
+    Raises ValueError for unknown products, like callback_args does for bad data"""
+    arg = callback_args(data, count)[index]
+    if callback_version(data) < 2:
+        # Buttons sent before product IDs carry the name itself
+        return arg
+    name = catalog.snapshot().names.get(int(arg))
+    if name is None:
+        raise ValueError(f"Unknown product ID {arg}")
+    return name
+
+# ====================================================
+#                  MEDIA HELPERS
+# ====================================================
+
+async def prewarm_media(bot):
+    """Upload the start image and all product images so their file_ids are cached"""
+    chat_id = MEDIA_CACHE_CHAT_ID or ADMINS[0]
+    paths = [START_IMAGE, *catalog.snapshot().images.values()]
+    await media_cache.prewarm(bot, chat_id, paths)
+
+# ====================================================
+#                  RATE LIMITING
+# ====================================================
+
+def create_rate_limiter():
+    """Build the outbound rate limiter from the config settings"""
+    return PriorityRateLimiter(
+        global_rate=RATE_LIMIT_GLOBAL,
+        chat_rate=RATE_LIMIT_PER_CHAT,
+        chat_burst=RATE_LIMIT_CHAT_BURST,
+        group_rate=RATE_LIMIT_PER_GROUP,
+        max_retries=RATE_LIMIT_MAX_RETRIES
+    )
+
+# ====================================================
+#                BACKGROUND TASKS
+# ====================================================
+
+_background_tasks = set()
+
+async def start_background_tasks(bot):
+    """Start media pre-warm, the profile refresher, queue status updates,
+    unfinished broadcasts and routing of pending requests without waiting for them"""
+    broadcasts.resume(bot)
+    for coro in (
+        resume_request_routing(bot),
+        prewarm_media(bot),
+        profile_cache.run_refresher(bot, PROFILE_REFRESH_INTERVAL),
+        wait_queue.run_updater(bot)
+    ):
+        task = asyncio.create_task(coro)
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+async def stop_background_tasks():
+    """Cancel background tasks that are still running"""
+    await broadcasts.shutdown()
+    await seller_router.shutdown()
+    tasks = list(_background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,127 @@
+"""
+Media cache for Quantum Panel Bot
+Local images are uploaded to Telegram once; the returned file_id is stored
+with the file's mtime and hash and reused for every later send
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+MEDIA_NAMESPACE = "media_cache"
+
+# ====================================================
+#                    MEDIA CACHE
+# ====================================================
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class MediaCache:
+    """Persistent local path -> Telegram file_id cache"""
+
+    def __init__(self, store):
+        # path -> {"file_id": str, "mtime": float, "sha256": str}
+        self.entries = store.dict(MEDIA_NAMESPACE)
+
+    @staticmethod
+    def is_local(photo):
+        """True for local file paths, False for file_ids and URLs"""
+        if photo.startswith(("http://", "https://")):
+            return False
+        return os.path.isfile(photo) or bool(os.path.splitext(photo)[1])
+
+    def lookup(self, path):
+        """Return the cached file_id for a local file, or None if it changed"""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+
+        mtime = os.stat(path).st_mtime
+        if entry["mtime"] == mtime:
+            return entry["file_id"]
+
+        # Touched but not changed (e.g. re-deployed): keep the file_id
+        if _file_hash(path) == entry["sha256"]:
+            self.entries[path] = {**entry, "mtime": mtime}
+            return entry["file_id"]
+
+        logger.info(f"Media changed on disk, dropping cached file_id: {path}")
+        del self.entries[path]
+        return None
+
+    def remember(self, path, message):
+        """Record the file_id Telegram assigned to an uploaded photo"""
+        self.entries[path] = {
+            "file_id": message.photo[-1].file_id,
+            "mtime": os.stat(path).st_mtime,
+            "sha256": _file_hash(path)
+        }
+
+    def forget(self, path):
+        self.entries.pop(path, None)
+
+    async def send_photo(self, send, photo, **kwargs):
+        """Send a photo with send(photo=..., **kwargs), e.g. message.reply_photo
+        or bot.send_photo. Local files are uploaded only when no valid file_id
+        is cached. Raises FileNotFoundError for missing local files."""
+        if not self.is_local(photo):
+            return await send(photo=photo, **kwargs)
+
+        if not os.path.isfile(photo):
+            raise FileNotFoundError(photo)
+
+        file_id = self.lookup(photo)
+        if file_id is not None:
+            try:
+                return await send(photo=file_id, **kwargs)
+            except BadRequest as e:
+                # Caption/markup errors would fail the upload too; only a bad id is retried
+                if "file" not in str(e).lower():
+                    raise
+                logger.warning(f"Cached file_id rejected for {photo}, re-uploading: {e}")
+                self.forget(photo)
+
+        with open(photo, 'rb') as f:
+            message = await send(photo=f, **kwargs)
+        self.remember(photo, message)
+        return message
+
+    async def prewarm(self, bot, chat_id, paths):
+        """Upload every local image without a valid cached file_id to chat_id.
+        The upload messages are deleted again right away."""
+        started = time.monotonic()
+        uploaded = failed = 0
+        for path in dict.fromkeys(paths):
+            if not self.is_local(path):
+                continue
+            file_started = time.monotonic()
+            try:
+                if self.lookup(path) is not None:
+                    continue
+                with open(path, 'rb') as f:
+                    message = await bot.send_photo(chat_id=chat_id, photo=f, disable_notification=True)
+                self.remember(path, message)
+                uploaded += 1
+                logger.info(f"Pre-warmed {path} in {time.monotonic() - file_started:.2f}s")
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to pre-warm {path} after {time.monotonic() - file_started:.2f}s: {e}")
+                continue
+            try:
+                await message.delete()
+            except Exception as e:
+                logger.warning(f"Failed to delete pre-warm upload of {path}: {e}")
+        logger.info(
+            f"Media pre-warm finished in {time.monotonic() - started:.2f}s: "
+            f"{uploaded} uploaded, {failed} failed"
+        )
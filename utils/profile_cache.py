@@ -0,0 +1,114 @@
+"""
+User profile cache for Quantum Panel Bot
+Names and usernames are collected from incoming updates and refreshed in the
+background, so views that list users don't need a get_chat call per user
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+Profile = namedtuple("Profile", ["full_name", "username"])
+
+# ====================================================
+#                  PROFILE CACHE
+# ====================================================
+
+class ProfileCache:
+    """Bounded user_id -> Profile cache with a TTL.
+    Stale entries are still served; they are queued for the next batch refresh."""
+
+    def __init__(self, capacity=5000, ttl=3600, refresh_concurrency=8):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.refresh_concurrency = refresh_concurrency
+        # user_id -> (Profile, fetched_at), least recently used first
+        self._entries = OrderedDict()
+        # user_ids that were asked for while missing or stale
+        self._wanted = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _put(self, user_id, profile):
+        self._entries[user_id] = (profile, time.monotonic())
+        self._entries.move_to_end(user_id)
+        self._wanted.discard(user_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def observe(self, user):
+        """Record a telegram User/Chat seen in an update"""
+        if user is not None:
+            self._put(user.id, Profile(user.full_name, user.username))
+
+    def get(self, user_id):
+        """Return the cached profile (possibly stale) or None, without any API call"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self._wanted.add(user_id)
+            return None
+        profile, fetched_at = entry
+        self._entries.move_to_end(user_id)
+        if time.monotonic() - fetched_at > self.ttl:
+            self._wanted.add(user_id)
+        return profile
+
+    async def _fetch(self, bot, user_id, semaphore):
+        async with semaphore:
+            try:
+                chat = await bot.get_chat(user_id)
+            except Exception as e:
+                logger.error(f"Failed to fetch profile for {user_id}: {e}")
+                return None
+        profile = Profile(chat.full_name, chat.username)
+        self._put(user_id, profile)
+        return profile
+
+    async def resolve_many(self, bot, user_ids):
+        """Return {user_id: Profile}, fetching only missing ids (concurrently).
+        Ids that can't be fetched are left out."""
+        profiles = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            profile = self.get(user_id)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                profiles[user_id] = profile
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.refresh_concurrency)
+            fetched = await asyncio.gather(*(self._fetch(bot, uid, semaphore) for uid in missing))
+            profiles.update((uid, p) for uid, p in zip(missing, fetched) if p is not None)
+        return profiles
+
+    async def resolve(self, bot, user_id):
+        """Return the Profile for one user, or None if it can't be fetched"""
+        return (await self.resolve_many(bot, [user_id])).get(user_id)
+
+    async def refresh(self, bot):
+        """Re-fetch every missing or stale profile that was asked for"""
+        wanted, self._wanted = self._wanted, set()
+        if not wanted:
+            return
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.refresh_concurrency)
+        results = await asyncio.gather(*(self._fetch(bot, uid, semaphore) for uid in wanted))
+        refreshed = sum(1 for p in results if p is not None)
+        logger.info(
+            f"Refreshed {refreshed}/{len(wanted)} profiles in "
+            f"{(time.monotonic() - started) * 1000:.0f} ms"
+        )
+
+    async def run_refresher(self, bot, interval):
+        """Batch-refresh wanted profiles every interval seconds, forever"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(bot)
+            except Exception as e:
+                logger.error(f"Profile refresh failed: {e}", exc_info=True)
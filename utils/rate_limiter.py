@@ -0,0 +1,198 @@
+"""
+Outbound rate limiter for Quantum Panel Bot
+Every Bot API request that targets a chat passes through a per-chat and a
+global token bucket. When the global bucket runs dry, waiting requests are
+released in priority order, so live session relays are never stuck behind a
+broadcast. Flood control (RetryAfter) pauses all sends and is retried.
+
+Pass the lane with rate_limit_args, e.g.:
+    await context.bot.send_message(..., rate_limit_args=PRIORITY_RELAY)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, lower goes first
+PRIORITY_RELAY = 0       # buyer <-> seller session messages
+PRIORITY_REQUEST = 1     # new request notifications to sellers
+PRIORITY_ADMIN = 2       # admin/seller views and everything without a lane
+PRIORITY_STATUS = 3      # queue position updates to waiting customers
+PRIORITY_BROADCAST = 4   # broadcasts
+
+def retry_after_seconds(error):
+    """Seconds to wait for a RetryAfter error (int or timedelta depending on PTB settings)"""
+    value = error.retry_after
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+# ====================================================
+#                   TOKEN BUCKET
+# ====================================================
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def idle(self):
+        """True once the bucket has refilled completely"""
+        self._refill()
+        return self.tokens >= self.burst
+
+# ====================================================
+#              PRIORITY RATE LIMITER
+# ====================================================
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """Global + per-chat token buckets with priority lanes and RetryAfter handling"""
+
+    def __init__(
+        self, global_rate=30, chat_rate=1.0, chat_burst=3, group_rate=20 / 60,
+        max_retries=3, max_chat_buckets=10000
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_chat_buckets = max_chat_buckets
+        self._chat_buckets = {}
+        # (priority, seq, future) waiting for a global token
+        self._waiters = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._scheduler = None
+        self._paused_until = 0.0
+        self.stats = {"sent": 0, "flood_waits": 0, "gave_up": 0}
+
+    async def initialize(self):
+        self._wakeup = asyncio.Event()
+        self._scheduler = asyncio.create_task(self._run_scheduler())
+
+    async def shutdown(self):
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+
+    @property
+    def queued(self):
+        """Requests waiting for a global token, per priority lane"""
+        counts = {}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                counts[priority] = counts.get(priority, 0) + 1
+        return counts
+
+    # ---------- per-chat buckets ----------
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                self._chat_buckets = {cid: b for cid, b in self._chat_buckets.items() if not b.idle}
+            # Negative ids are groups/channels, which Telegram limits much harder
+            is_group = isinstance(chat_id, int) and chat_id < 0
+            bucket = TokenBucket(self.group_rate, 1) if is_group else TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _acquire_chat(self, chat_id):
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            wait = bucket.try_take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    # ---------- global bucket ----------
+
+    async def _acquire_global(self, priority):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._wakeup.set()
+        await future
+
+    async def _run_scheduler(self):
+        """Hand out global tokens to waiting requests, highest priority first"""
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            if self._waiters[0][2].done():
+                # Cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self.global_bucket.try_take()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            future.set_result(None)
+
+    # ---------- request processing ----------
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        # Requests not aimed at a chat (getChat, answerCallbackQuery, ...) aren't throttled
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+
+        priority = PRIORITY_ADMIN if rate_limit_args is None else rate_limit_args
+        attempt = 0
+        while True:
+            await self._acquire_chat(chat_id)
+            await self._acquire_global(priority)
+            try:
+                result = await callback(*args, **kwargs)
+                self.stats["sent"] += 1
+                return result
+            except RetryAfter as e:
+                attempt += 1
+                self.stats["flood_waits"] += 1
+                wait = retry_after_seconds(e)
+                if attempt > self.max_retries:
+                    self.stats["gave_up"] += 1
+                    logger.error(f"{endpoint} to {chat_id} dropped after {attempt} flood waits")
+                    raise
+                # Flood control is applied to the whole bot, so pause every lane
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+                logger.warning(f"Flood control on {endpoint} to {chat_id}: pausing sends for {wait:.0f}s")
+                await asyncio.sleep(wait)
@@ -0,0 +1,85 @@
+"""
+Session message relay for Quantum Panel Bot
+Messages are relayed with copy_message, so text keeps its formatting and
+media is re-sent by file_id without passing through this server. A short
+header is only sent when the sender on the other side changes. Relayed
+messages remember where they came from, so a seller can answer one of
+several customers by replying to that customer's message
+"""
+
+import logging
+import time
+from collections import OrderedDict
+
+from utils.rate_limiter import PRIORITY_RELAY
+
+logger = logging.getLogger(__name__)
+
+# Relay counters, exposed on /webhook_stats
+relay_stats = {
+    "relayed": 0, "media": 0, "failed": 0, "headers": 0,
+    "bytes_avoided": 0, "total_latency_ms": 0.0, "max_latency_ms": 0.0
+}
+
+# destination chat_id -> sender of the last message relayed into it
+_last_sender = {}
+
+# (destination chat_id, message_id) -> chat the relayed message came from,
+# oldest dropped first beyond MAX_ORIGINS
+MAX_ORIGINS = 20000
+_origins = OrderedDict()
+
+def _remember_origin(chat_id, message_id, source_chat_id):
+    _origins[(chat_id, message_id)] = source_chat_id
+    if len(_origins) > MAX_ORIGINS:
+        _origins.popitem(last=False)
+
+def relay_origin(chat_id, message_id):
+    """Chat a message relayed into chat_id came from, or None if unknown"""
+    return _origins.get((chat_id, message_id))
+
+def media_size(message):
+    """Size in bytes of the media attached to a message (0 for plain text)"""
+    media = (
+        message.photo[-1] if message.photo else
+        message.document or message.video or message.voice or message.audio or
+        message.video_note or message.animation or message.sticker
+    )
+    return (media.file_size or 0) if media else 0
+
+def forget_relay_sender(*chat_ids):
+    """Reset header tracking, e.g. when a session ends"""
+    for chat_id in chat_ids:
+        _last_sender.pop(chat_id, None)
+
+async def relay_message(bot, message, chat_id, header):
+    """Copy message into chat_id, preceded by header if the sender changed"""
+    started = time.monotonic()
+    sender_id = message.from_user.id
+    try:
+        if _last_sender.get(chat_id) != sender_id:
+            sent = await bot.send_message(chat_id=chat_id, text=header, rate_limit_args=PRIORITY_RELAY)
+            _last_sender[chat_id] = sender_id
+            relay_stats["headers"] += 1
+            _remember_origin(chat_id, sent.message_id, message.chat_id)
+        copied = await bot.copy_message(
+            chat_id=chat_id,
+            from_chat_id=message.chat_id,
+            message_id=message.message_id,
+            rate_limit_args=PRIORITY_RELAY
+        )
+        _remember_origin(chat_id, copied.message_id, message.chat_id)
+    except Exception:
+        relay_stats["failed"] += 1
+        _last_sender.pop(chat_id, None)
+        raise
+
+    latency_ms = (time.monotonic() - started) * 1000
+    size = media_size(message)
+    relay_stats["relayed"] += 1
+    relay_stats["total_latency_ms"] += latency_ms
+    relay_stats["max_latency_ms"] = max(relay_stats["max_latency_ms"], latency_ms)
+    if size or not message.text:
+        relay_stats["media"] += 1
+        relay_stats["bytes_avoided"] += size
+    logger.debug(f"Relayed message {message.message_id} to {chat_id} in {latency_ms:.0f} ms ({size} bytes avoided)")
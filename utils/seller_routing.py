@@ -0,0 +1,165 @@
+"""
+Seller routing for Quantum Panel Bot
+A new request is offered to one seller first instead of every seller at
+once: least loaded sellers (fewest active sessions) first and sellers at
+their session limit last, with ties in round-robin or
+least-recently-assigned order. If nobody accepts within the offer timeout the
+request escalates in widening waves (1, 2, 4, ... more sellers), and once
+escalation_limit seconds have passed everyone left is offered it at once, so
+even a long seller list sees it before it expires. Earlier offers stay valid,
+so the first Accept still wins
+"""
+
+import asyncio
+import logging
+import time
+
+from utils.fanout import fan_out
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("round_robin", "least_recent", "all")
+
+class SellerRouter:
+    """Chooses which sellers are offered a request, and when"""
+
+    def __init__(
+        self, reverse_sessions, seller_alerts, strategy="round_robin", offer_timeout=45.0,
+        fanout_concurrency=10, max_sessions=1, session_limits=None, escalation_limit=300.0
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown seller routing strategy {strategy!r}")
+        # Live load (seller_id -> [user_id, ...]) and notification preferences
+        self.reverse_sessions = reverse_sessions
+        self.seller_alerts = seller_alerts
+        self.max_sessions = max_sessions
+        self.session_limits = session_limits or {}
+        self.strategy = strategy
+        self.offer_timeout = offer_timeout
+        self.escalation_limit = escalation_limit
+        self.fanout_concurrency = fanout_concurrency
+        # product -> rotation offset for round-robin
+        self._cursor = {}
+        # seller_id -> time.monotonic() of their last accepted request
+        self._last_assigned = {}
+        # user_id -> Event set once their request is accepted
+        self._accepted = {}
+        # user_id -> [(seller_id, message_id), ...] offers sent for the request
+        self.offers = {}
+        self._tasks = {}
+        self.stats = {"routed": 0, "offers": 0, "escalations": 0, "unanswered": 0}
+
+    def load(self, seller_id):
+        """Number of customers the seller is chatting with"""
+        return len(self.reverse_sessions.get(seller_id, ()))
+
+    def session_limit(self, seller_id):
+        return self.session_limits.get(seller_id, self.max_sessions)
+
+    def has_capacity(self, seller_id):
+        return self.load(seller_id) < self.session_limit(seller_id)
+
+    def rank(self, product, sellers):
+        """Sellers with alerts on, in the order they are offered the request"""
+        available = [sid for sid in dict.fromkeys(sellers) if self.seller_alerts.get(sid, True)]
+        if not available:
+            return []
+        if self.strategy == "least_recent":
+            available.sort(key=lambda sid: self._last_assigned.get(sid, 0.0))
+        else:
+            start = self._cursor.get(product, 0) % len(available)
+            self._cursor[product] = start + 1
+            available = available[start:] + available[:start]
+        # Stable sort: sellers at their limit last, then by load, keeping the order above for ties
+        return sorted(available, key=lambda sid: (not self.has_capacity(sid), self.load(sid)))
+
+    # ---------- routing ----------
+
+    async def _offer_wave(self, user_id, wave, send_offer):
+        """Offer the request to every seller in wave; returns how many offers were sent"""
+        async def send(seller_id):
+            message = await send_offer(seller_id)
+            self.offers.setdefault(user_id, []).append((seller_id, message.message_id))
+            self.stats["offers"] += 1
+        results = await fan_out(send, wave, concurrency=self.fanout_concurrency)
+        return sum(1 for latency in results.values() if latency is not None)
+
+    def start(self, user_id, product, sellers, send_offer, is_pending):
+        """Route a request in the background (see route); a task still routing
+        an earlier offer of the same request is cancelled"""
+        previous = self._tasks.get(user_id)
+        if previous is not None:
+            previous.cancel()
+        task = asyncio.create_task(
+            self.route(user_id, product, sellers, send_offer, is_pending), name=f"route_request_{user_id}"
+        )
+        self._tasks[user_id] = task
+
+        def forget_task(finished):
+            # A newer task may have taken the slot already
+            if self._tasks.get(user_id) is finished:
+                del self._tasks[user_id]
+        task.add_done_callback(forget_task)
+        return task
+
+    async def shutdown(self):
+        """Stop routing; requests stay pending and their sent offers stay valid"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def route(self, user_id, product, sellers, send_offer, is_pending):
+        """Offer user_id's request until it is accepted or every seller has been offered it.
+        send_offer(seller_id) sends the offer and returns the Message;
+        is_pending() tells whether the request is still open"""
+        self.stats["routed"] += 1
+        order = self.rank(product, sellers)
+        accepted = self._accepted[user_id] = asyncio.Event()
+        started = time.monotonic()
+        try:
+            offered = 0
+            size = len(order) if self.strategy == "all" else 1
+            while order:
+                if not is_pending():
+                    return
+                if time.monotonic() - started + self.offer_timeout > self.escalation_limit:
+                    # Out of time for another round: everyone left gets it now
+                    size = len(order)
+                wave, order = order[:size], order[size:]
+                sent = await self._offer_wave(user_id, wave, send_offer)
+                if not sent:
+                    continue
+                if offered:
+                    self.stats["escalations"] += 1
+                offered += sent
+                size *= 2
+                try:
+                    await asyncio.wait_for(accepted.wait(), self.offer_timeout)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            if is_pending():
+                self.stats["unanswered"] += 1
+                logger.warning(f"Request from {user_id} for {product} not accepted by any of {offered} sellers")
+        finally:
+            if self._accepted.get(user_id) is accepted:
+                del self._accepted[user_id]
+            if not is_pending():
+                # Offers sent after accepted() collected them; the sender closes those
+                self.offers.pop(user_id, None)
+
+    def accepted(self, user_id, seller_id):
+        """Record that seller_id took user_id's request; returns the offers that were sent"""
+        self._last_assigned[seller_id] = time.monotonic()
+        event = self._accepted.get(user_id)
+        if event is not None:
+            event.set()
+        return self.offers.pop(user_id, [])
+
+    def forget(self, user_id):
+        """Drop routing state for a request that was withdrawn or expired"""
+        event = self._accepted.get(user_id)
+        if event is not None:
+            event.set()
+        return self.offers.pop(user_id, [])
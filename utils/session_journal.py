@@ -0,0 +1,125 @@
+"""
+Session journal for Quantum Panel Bot
+Every session start and end is appended to a journal, with periodic compact
+snapshots, so live buyer-seller pairings can be rebuilt after a restart.
+The session maps live in this process's memory and a snapshot trims the
+whole journal, so only one bot process may run against a database
+"""
+
+import logging
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_LOG = "session_journal"
+SNAPSHOT_NAMESPACE = "session_snapshot"
+SNAPSHOT_KEY = "latest"
+
+# ====================================================
+#                  SESSION JOURNAL
+# ====================================================
+
+class SessionJournal:
+    """Append-only journal of session transitions over the in-memory session maps"""
+
+    def __init__(self, store, active_sessions, reverse_sessions, session_start_times, snapshot_every=500):
+        self.store = store
+        self.active_sessions = active_sessions
+        self.reverse_sessions = reverse_sessions
+        self.session_start_times = session_start_times
+        self.snapshot_every = snapshot_every
+        self._since_snapshot = 0
+
+    # ---------- state transitions ----------
+
+    def _apply_start(self, user_id, seller_id, product, started_at):
+        self.active_sessions[user_id] = {"seller_id": seller_id, "product": product}
+        customers = self.reverse_sessions.setdefault(seller_id, [])
+        if user_id not in customers:
+            customers.append(user_id)
+        self.session_start_times[user_id] = started_at
+
+    def _apply_end(self, user_id):
+        session_info = self.active_sessions.pop(user_id, None)
+        if session_info is None:
+            return None
+        customers = self.reverse_sessions.get(session_info["seller_id"], [])
+        if user_id in customers:
+            customers.remove(user_id)
+        if not customers:
+            self.reverse_sessions.pop(session_info["seller_id"], None)
+        self.session_start_times.pop(user_id, None)
+        return session_info
+
+    def _apply(self, event):
+        if event["op"] == "start":
+            self._apply_start(event["user_id"], event["seller_id"], event["product"], event["at"])
+        elif event["op"] == "end":
+            self._apply_end(event["user_id"])
+
+    # ---------- journaling ----------
+
+    def _record(self, event):
+        """Append an event and flush it to disk right away (SQLite assigns its seq).
+        Deliberately not left to the write-behind queue: a session opened just
+        before a crash must survive it, and starts/ends come at chat pace, so
+        the small synchronous commit on the event loop is cheap"""
+        self.store.append(JOURNAL_LOG, event)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        self.store.flush()
+
+    def start(self, user_id, seller_id, product, started_at=None):
+        """Open a session and journal it"""
+        started_at = started_at or datetime.now()
+        self._apply_start(user_id, seller_id, product, started_at)
+        self._record({
+            "op": "start", "user_id": user_id, "seller_id": seller_id,
+            "product": product, "at": started_at
+        })
+
+    def end(self, user_id):
+        """Close a session and journal it; returns the closed session info or None"""
+        session_info = self._apply_end(user_id)
+        if session_info is not None:
+            self._record({"op": "end", "user_id": user_id})
+        return session_info
+
+    def snapshot(self):
+        """Write a compact snapshot of the live sessions and drop the journal behind it.
+        Covers every event in the journal, which is only right with a single writer"""
+        # The snapshot covers the journal up to the last seq written
+        self.store.flush()
+        seq = self.store.last_seq(JOURNAL_LOG)
+        sessions = [
+            [user_id, info["seller_id"], info["product"], self.session_start_times.get(user_id)]
+            for user_id, info in self.active_sessions.items()
+        ]
+        self.store.put(SNAPSHOT_NAMESPACE, SNAPSHOT_KEY, {"seq": seq, "sessions": sessions})
+        self.store.trim_log(JOURNAL_LOG, seq)
+        self._since_snapshot = 0
+
+    # ---------- recovery ----------
+
+    def restore(self):
+        """Rebuild the session maps from the last snapshot plus the journal tail"""
+        started = time.perf_counter()
+        snapshot = dict(self.store.load(SNAPSHOT_NAMESPACE)).get(SNAPSHOT_KEY)
+        snapshot_seq = 0
+        if snapshot:
+            snapshot_seq = snapshot["seq"]
+            for user_id, seller_id, product, started_at in snapshot["sessions"]:
+                self._apply_start(user_id, seller_id, product, started_at or datetime.now())
+
+        events = self.store.load_log_entries(JOURNAL_LOG)
+        for seq, event in events:
+            if seq > snapshot_seq:
+                self._apply(event)
+        self._since_snapshot = len(events)
+
+        logger.info(
+            f"Restored {len(self.active_sessions)} sessions from journal "
+            f"({len(events)} events replayed) in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
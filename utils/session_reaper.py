@@ -0,0 +1,114 @@
+"""
+Idle reaper for Quantum Panel Bot
+A repeating JobQueue job that ends sessions nobody has written in for
+SESSION_IDLE_TIMEOUT seconds, expires requests no seller accepted within
+PENDING_REQUEST_TIMEOUT and drops stale product selections. State is changed
+before anyone is notified, so an Accept racing the reaper sees a consistent
+request (see claim_request)
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from config import SESSION_IDLE_TIMEOUT, PENDING_REQUEST_TIMEOUT, PRODUCT_SELECTION_TIMEOUT
+from utils.data import (
+    active_sessions, session_start_times, pending_requests, user_product_selection,
+    last_activity, wait_queue, seller_router
+)
+from utils.helpers import log_chat, end_session
+from utils.rate_limiter import PRIORITY_ADMIN
+
+logger = logging.getLogger(__name__)
+
+# Reaper counters, exposed on /webhook_stats
+reaper_stats = {"runs": 0, "sessions": 0, "requests": 0, "selections": 0}
+
+async def _notify(bot, chat_id, text, message_id=None):
+    """Send text to chat_id, or put it in place of message_id"""
+    try:
+        if message_id is None:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown", rate_limit_args=PRIORITY_ADMIN)
+        else:
+            await bot.edit_message_text(
+                chat_id=chat_id, message_id=message_id, text=text,
+                parse_mode="Markdown", rate_limit_args=PRIORITY_ADMIN
+            )
+    except Exception as e:
+        logger.debug(f"Failed to notify {chat_id} of expiry: {e}")
+
+def _idle(user_id, now, timeout):
+    # Entries from before a restart have no timestamp yet: their clock starts now
+    return now - last_activity.setdefault(user_id, now) >= timeout
+
+def _end_idle_sessions(now):
+    """End idle sessions; returns the notifications to send"""
+    notices = []
+    for user_id in [uid for uid in active_sessions if _idle(uid, now, SESSION_IDLE_TIMEOUT)]:
+        session_info = active_sessions[user_id]
+        seller_id = session_info["seller_id"]
+        product = session_info["product"]
+        log_chat(user_id, seller_id, product, session_start_times.get(user_id, datetime.now()), ended_by="idle timeout")
+        end_session(user_id)
+        minutes = SESSION_IDLE_TIMEOUT // 60
+        notices.append((user_id, (
+            f"⌛ *CONVERSATION ENDED*\n\n"
+            f"There were no messages for {minutes} minutes, so the conversation was closed.\n\n"
+            f"💡 If you still need help, tap *Buy Key(s)* again!"
+        ), None))
+        notices.append((seller_id, (
+            f"⌛ *CONVERSATION ENDED*\n\n"
+            f"📦 *Product:* {product}\n"
+            f"👤 *Customer ID:* `{user_id}`\n\n"
+            f"Closed after {minutes} minutes without messages."
+        ), None))
+    reaper_stats["sessions"] += len(notices) // 2
+    return notices
+
+def _expire_requests(wall_now):
+    """Expire requests nobody accepted in time; returns the notifications to send"""
+    notices = []
+    expired = [
+        uid for uid, request in pending_requests.items()
+        if wall_now - request.get("queued_at", 0) >= PENDING_REQUEST_TIMEOUT
+    ]
+    for user_id in expired:
+        product = wait_queue.remove(user_id)
+        notices.append((user_id, (
+            f"⌛ *REQUEST EXPIRED*\n\n"
+            f"📦 Product: *{product}*\n\n"
+            f"No seller was available in time. Please tap *Buy Key(s)* to try again."
+        ), None))
+        for seller_id, message_id in seller_router.forget(user_id):
+            notices.append((seller_id, (
+                f"⌛ *REQUEST EXPIRED*\n\n"
+                f"📦 *Product:* {product}\n"
+                f"🔑 *User ID:* `{user_id}`"
+            ), message_id))
+    reaper_stats["requests"] += len(expired)
+    return notices
+
+def _expire_selections(now):
+    stale = [
+        uid for uid in user_product_selection
+        if uid not in active_sessions and _idle(uid, now, PRODUCT_SELECTION_TIMEOUT)
+    ]
+    for user_id in stale:
+        del user_product_selection[user_id]
+        last_activity.pop(user_id, None)
+    reaper_stats["selections"] += len(stale)
+
+async def reap_idle(context):
+    """JobQueue callback: end idle sessions and expire stale requests and selections"""
+    now = time.monotonic()
+    before = dict(reaper_stats)
+    reaper_stats["runs"] += 1
+    notices = _end_idle_sessions(now) + _expire_requests(time.time())
+    _expire_selections(now)
+    if notices:
+        logger.info(
+            f"Ended {reaper_stats['sessions'] - before['sessions']} idle sessions, "
+            f"expired {reaper_stats['requests'] - before['requests']} requests"
+        )
+        await asyncio.gather(*(_notify(context.bot, *notice) for notice in notices))
@@ -0,0 +1,443 @@
+"""
+SQLite-backed storage for Quantum Panel Bot
+Containers keep the data in memory for O(1) reads and write every change
+through to SQLite in batches, so state survives a process restart
+"""
+
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import groupby
+
+logger = logging.getLogger(__name__)
+
+# ====================================================
+#                 VALUE ENCODING
+# ====================================================
+
+def _encode_default(value):
+    """JSON fallback for values the json module can't encode natively"""
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+def _decode_hook(obj):
+    """Turn tagged JSON objects back into Python values"""
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+def encode(value):
+    """Serialize a key or value for storage"""
+    return json.dumps(value, default=_encode_default, separators=(",", ":"))
+
+def decode(text):
+    """Deserialize a stored key or value"""
+    return json.loads(text, object_hook=_decode_hook)
+
+# ====================================================
+#                   SQLITE STORE
+# ====================================================
+
+# Log seqs are assigned by SQLite (AUTOINCREMENT: increasing and never
+# reused), so several processes can append to the same log
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS kv ("
+    " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT,"
+    " PRIMARY KEY (namespace, key)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS log ("
+    " seq INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, value TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS log_namespace_seq ON log (namespace, seq)"
+)
+
+# Databases written before seqs were assigned by SQLite: rows are copied in
+# order and new seqs continue above the old ones, so stored seqs stay comparable
+_MIGRATE_LOG = (
+    "ALTER TABLE log RENAME TO log_v1",
+    _SCHEMA[1],
+    "INSERT INTO sqlite_sequence (name, seq) SELECT 'log', COALESCE(MAX(seq), 0) FROM log_v1",
+    "INSERT INTO log (namespace, value) SELECT namespace, value FROM log_v1 ORDER BY seq, namespace",
+    "DROP TABLE log_v1"
+)
+
+# Write statements, keyed by pending operation type. Parameters are always
+# bound, so sqlite3's statement cache reuses the prepared statements
+_STATEMENTS = {
+    "put": "INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)",
+    "delete": "DELETE FROM kv WHERE namespace = ? AND key = ?",
+    "clear": "DELETE FROM kv WHERE namespace = ?",
+    "append": "INSERT INTO log (namespace, value) VALUES (?, ?)",
+    "clear_log": "DELETE FROM log WHERE namespace = ?",
+    "trim_log": "DELETE FROM log WHERE namespace = ? AND seq <= ?"
+}
+
+class StoreWriteError(Exception):
+    """Queued writes SQLite rejected outright (kept in Store.failed_writes)"""
+
+class VersionConflict(Exception):
+    """A versioned record changed between being read and written"""
+
+class Store:
+    """SQLite database in WAL mode with a batched write-behind queue.
+    A batch SQLite rejects is retried one write at a time: writes that fail
+    because the database is busy go back on the queue, writes that can never
+    succeed are kept in failed_writes and reported, and the rest are written"""
+
+    def __init__(self, path, batch_size=100, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        self._lock = threading.RLock()
+        self._pending = []
+        self.failed_writes = []
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,),
+            name="store-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _create_schema(self):
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'log'").fetchone()
+        if row is not None and "AUTOINCREMENT" not in row[0]:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for statement in _MIGRATE_LOG:
+                self._conn.execute(statement)
+            self._conn.execute("COMMIT")
+            logger.info(f"Migrated log table of {self.path} to database-assigned seqs")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    # ---------- write queue ----------
+
+    def _queue(self, op, params):
+        """Queue a write; flush immediately once a full batch is waiting"""
+        with self._lock:
+            self._pending.append((op, params))
+            if len(self._pending) >= self.batch_size:
+                self._flush_logged()
+
+    def _rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def _write_one_by_one(self, pending):
+        """Retry a rejected batch write by write; returns the writes that can never succeed"""
+        failed = []
+        for index, (op, params) in enumerate(pending):
+            try:
+                self._conn.execute(_STATEMENTS[op], params)
+            except sqlite3.OperationalError as e:
+                # Busy/locked/I/O: keep this write and everything after it, in order
+                self._pending[:0] = pending[index:]
+                logger.warning(f"Re-queued {len(pending) - index} writes to {self.path}: {e}")
+                break
+            except sqlite3.Error as e:
+                logger.error(f"Write {op} {params!r} rejected by {self.path}: {e}")
+                failed.append((op, params, str(e)))
+        return failed
+
+    def flush(self):
+        """Write all queued changes in a single transaction.
+        Raises StoreWriteError if SQLite rejected some of them; the others are written"""
+        with self._lock:
+            if not self._pending or self._conn is None:
+                return
+            pending, self._pending = self._pending, []
+            try:
+                self._conn.execute("BEGIN")
+                # Consecutive writes of the same kind go through one executemany
+                for op, group in groupby(pending, key=lambda item: item[0]):
+                    self._conn.executemany(_STATEMENTS[op], [params for _, params in group])
+                self._conn.execute("COMMIT")
+                return
+            except sqlite3.Error as e:
+                self._rollback()
+                logger.warning(f"Batch of {len(pending)} writes to {self.path} failed ({e}), retrying one by one")
+            failed = self._write_one_by_one(pending)
+            if failed:
+                self.failed_writes.extend(failed)
+                raise StoreWriteError(f"{len(failed)} writes rejected by {self.path}: {failed[0][2]}")
+
+    def _flush_logged(self):
+        """flush() for callers that queued unrelated writes: errors are logged, not raised"""
+        try:
+            self.flush()
+        except StoreWriteError as e:
+            logger.error(str(e))
+
+    def _flush_periodically(self, interval):
+        """Background thread: flush queued writes every interval seconds"""
+        while not self._closed.wait(interval):
+            self._flush_logged()
+
+    def close(self):
+        """Flush outstanding writes and close the database"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            self._flush_logged()
+            self._conn.close()
+            self._conn = None
+
+    # ---------- key/value namespaces ----------
+
+    def put(self, namespace, key, value):
+        self._queue("put", (namespace, encode(key), encode(value)))
+
+    def delete(self, namespace, key):
+        self._queue("delete", (namespace, encode(key)))
+
+    def clear(self, namespace):
+        self._queue("clear", (namespace,))
+
+    def update_versioned(self, namespace, key, build):
+        """Read-modify-write of a {"version": n, ...} record in one immediate
+        transaction, bypassing the write queue. build(record or None) returns
+        the new record, or None to leave it alone. The write is conditional on
+        the stored version still being the one build saw (VersionConflict if
+        not). Returns True if the new record was written"""
+        encoded_key = encode(key)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, encoded_key)
+                ).fetchone()
+                current = decode(row[0]) if row else None
+                record = build(current)
+                if record is None:
+                    self._conn.execute("COMMIT")
+                    return False
+                if current is None:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO kv (namespace, key, value) VALUES (?, ?, ?)",
+                        (namespace, encoded_key, encode(record))
+                    )
+                else:
+                    cursor = self._conn.execute(
+                        "UPDATE kv SET value = ? WHERE namespace = ? AND key = ?"
+                        " AND json_extract(value, '$.version') = ?",
+                        (encode(record), namespace, encoded_key, current["version"])
+                    )
+                if cursor.rowcount != 1:
+                    raise VersionConflict(f"{namespace}/{key} changed during update")
+                self._conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self._rollback()
+                raise
+
+    def load(self, namespace):
+        """Return all (key, value) pairs stored in a namespace"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        return [(decode(key), decode(value)) for key, value in rows]
+
+    # ---------- append-only logs ----------
+
+    def append(self, namespace, value):
+        """Queue a log entry; its seq is assigned by SQLite when it is written"""
+        self._queue("append", (namespace, encode(value)))
+
+    def clear_log(self, namespace):
+        self._queue("clear_log", (namespace,))
+
+    def trim_log(self, namespace, up_to_seq):
+        """Drop log entries up to and including a sequence number"""
+        self._queue("trim_log", (namespace, up_to_seq))
+
+    def load_log(self, namespace):
+        """Return all entries of a log in insertion order"""
+        return [value for _, value in self.load_log_entries(namespace)]
+
+    def load_log_entries(self, namespace):
+        """Return all (seq, entry) pairs of a log in insertion order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, value FROM log WHERE namespace = ? ORDER BY seq", (namespace,)
+            ).fetchall()
+        return [(seq, decode(value)) for seq, value in rows]
+
+    def last_seq(self, namespace):
+        """Highest seq written to a log (0 if empty); queued entries don't count"""
+        with self._lock:
+            (seq,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM log WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return seq
+
+    # ---------- container factories ----------
+
+    def dict(self, namespace):
+        return PersistentDict(self, namespace)
+
+    def set(self, namespace):
+        return PersistentSet(self, namespace)
+
+    def list(self, namespace):
+        return PersistentList(self, namespace)
+
+# ====================================================
+#              WRITE-THROUGH CONTAINERS
+# ====================================================
+
+class PersistentDict(dict):
+    """dict whose changes are written through to a Store namespace.
+    Values mutated in place must be re-assigned to be persisted."""
+
+    def __init__(self, store, namespace):
+        super().__init__(store.load(namespace))
+        self._store = store
+        self._namespace = namespace
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._store.put(self._namespace, key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._store.delete(self._namespace, key)
+
+    def pop(self, key, *default):
+        had_key = key in self
+        value = super().pop(key, *default)
+        if had_key:
+            self._store.delete(self._namespace, key)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._store.delete(self._namespace, key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        self._store.clear(self._namespace)
+
+class PersistentSet(set):
+    """set whose changes are written through to a Store namespace"""
+
+    def __init__(self, store, namespace):
+        super().__init__(key for key, _ in store.load(namespace))
+        self._store = store
+        self._namespace = namespace
+
+    def add(self, item):
+        if item not in self:
+            super().add(item)
+            self._store.put(self._namespace, item, None)
+
+    def update(self, *iterables):
+        for iterable in iterables:
+            for item in iterable:
+                self.add(item)
+
+    def difference_update(self, *iterables):
+        for iterable in iterables:
+            for item in list(iterable):
+                self.discard(item)
+
+    def intersection_update(self, *iterables):
+        keep = set(self).intersection(*iterables)
+        self.difference_update([item for item in self if item not in keep])
+
+    def symmetric_difference_update(self, iterable):
+        for item in set(iterable):
+            if item in self:
+                self.discard(item)
+            else:
+                self.add(item)
+
+    # In-place operators must mutate and return self: set's own versions
+    # would skip the store
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+    def discard(self, item):
+        if item in self:
+            super().discard(item)
+            self._store.delete(self._namespace, item)
+
+    def remove(self, item):
+        super().remove(item)
+        self._store.delete(self._namespace, item)
+
+    def pop(self):
+        item = super().pop()
+        self._store.delete(self._namespace, item)
+        return item
+
+    def clear(self):
+        super().clear()
+        self._store.clear(self._namespace)
+
+class PersistentList(list):
+    """Append-only list whose entries are written through to a Store log"""
+
+    def __init__(self, store, namespace):
+        super().__init__(store.load_log(namespace))
+        self._store = store
+        self._namespace = namespace
+
+    def append(self, item):
+        self._store.append(self._namespace, item)
+        super().append(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def clear(self):
+        super().clear()
+        self._store.clear_log(self._namespace)
+
+    def _append_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is append-only; use append, extend or clear")
+
+    # The log can only grow or be cleared, so anything else would be lost on restart
+    __setitem__ = __delitem__ = __imul__ = _append_only
+    insert = pop = remove = sort = reverse = _append_only
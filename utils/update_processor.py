@@ -0,0 +1,65 @@
+"""
+Concurrent update processing for Quantum Panel Bot
+Updates from different users run in parallel, updates from the same user run in order
+"""
+
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# ====================================================
+#            PER-USER UPDATE PROCESSOR
+# ====================================================
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while serializing each user's updates on its own lane"""
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # Lane key -> [lock, number of updates holding or waiting for the lock]
+        self._lanes = {}
+
+    @staticmethod
+    def lane_key(update):
+        """Return the lane an update belongs to (user ID, else chat ID)"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return update.effective_user.id
+        if update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    @property
+    def active_lanes(self):
+        """Number of users that currently have updates in flight"""
+        return len(self._lanes)
+
+    async def process_update(self, update, coroutine):
+        """Wait for the user's lane first, then for a global concurrency slot"""
+        key = self.lane_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = [asyncio.Lock(), 0]
+        lane[1] += 1
+        try:
+            async with lane[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            lane[1] -= 1
+            if lane[1] == 0:
+                del self._lanes[key]
+
+    async def do_process_update(self, update, coroutine):
+        """Run the update's handler coroutine"""
+        await coroutine
+
+    async def initialize(self):
+        """Nothing to set up"""
+
+    async def shutdown(self):
+        """Nothing to tear down"""
@@ -0,0 +1,198 @@
+"""
+Customer wait queue for Quantum Panel Bot
+Pending requests wait in a FIFO queue per product, backed by the persisted
+pending_requests so the order survives a restart. Sellers pull the head of
+the queue with "Take next customer". Waiting customers see their position
+and an ETA (from a rolling average of recent session durations), edited into
+one status message at most every update interval and only when it changes
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+
+from utils.rate_limiter import PRIORITY_STATUS
+
+logger = logging.getLogger(__name__)
+
+def status_text(product, position, eta_minutes):
+    """Queue status shown to a waiting customer"""
+    return (
+        f"🧾 *Queue Status*\n\n"
+        f"📦 Product: *{product}*\n"
+        f"👥 Position: *#{position}*\n"
+        f"⏱️ Estimated wait: *~{eta_minutes} min*"
+    )
+
+# ====================================================
+#                    WAIT QUEUE
+# ====================================================
+
+class WaitQueue:
+    """FIFO queue of pending requests per product, with position/ETA updates"""
+
+    def __init__(
+        self, pending_requests, catalog, seller_router,
+        window=50, default_duration=300.0, update_interval=60.0
+    ):
+        # user_id -> {"product", "queued_at"}, persisted
+        self.pending_requests = pending_requests
+        self.catalog = catalog
+        self.seller_router = seller_router
+        self.window = window
+        self.default_duration = default_duration
+        self.update_interval = update_interval
+        # product -> OrderedDict(user_id -> queued_at), oldest first
+        self._queues = {}
+        # user_id -> product
+        self._products = {}
+        # user_id -> (chat_id, message_id) of the status message, and the (position, eta) it shows
+        self._status = {}
+        self._shown = {}
+        # product -> recent session durations in seconds, and their running sums
+        self._durations = {}
+        self._duration_sums = {}
+        self.stats = {"queued": 0, "taken": 0, "updates": 0}
+
+        # Rebuild the order of requests left pending by the last run
+        for user_id, request in sorted(pending_requests.items(), key=lambda item: item[1].get("queued_at", 0)):
+            self._push(user_id, request["product"], request.get("queued_at", 0))
+
+    def _push(self, user_id, product, queued_at):
+        self._queues.setdefault(product, OrderedDict())[user_id] = queued_at
+        self._products[user_id] = product
+
+    def __len__(self):
+        return len(self._products)
+
+    def __contains__(self, user_id):
+        return user_id in self._products
+
+    # ---------- queue ----------
+
+    def add(self, user_id, product):
+        """Queue a request at the back of its product's queue"""
+        queued_at = time.time()
+        self.pending_requests[user_id] = {"product": product, "queued_at": queued_at}
+        self._push(user_id, product, queued_at)
+        self.stats["queued"] += 1
+
+    def remove(self, user_id):
+        """Drop a request wherever it is in its queue; returns its product or None"""
+        self.pending_requests.pop(user_id, None)
+        self._status.pop(user_id, None)
+        self._shown.pop(user_id, None)
+        product = self._products.pop(user_id, None)
+        if product is not None:
+            queue = self._queues[product]
+            del queue[user_id]
+            if not queue:
+                del self._queues[product]
+        return product
+
+    def take_next(self, products):
+        """Remove and return (user_id, product) of the longest-waiting request
+        for any of products, or None if nobody is waiting"""
+        heads = [
+            (next(iter(self._queues[product].items())), product)
+            for product in products if product in self._queues
+        ]
+        if not heads:
+            return None
+        (user_id, _), product = min(heads, key=lambda head: head[0][1])
+        self.remove(user_id)
+        self.stats["taken"] += 1
+        return user_id, product
+
+    def requests(self):
+        """(user_id, product) of every queued request, oldest first"""
+        queued = sorted(
+            (queued_at, user_id, product)
+            for product, queue in self._queues.items() for user_id, queued_at in queue.items()
+        )
+        return [(user_id, product) for _, user_id, product in queued]
+
+    def waiting(self, products):
+        """Number of requests waiting for any of products"""
+        return sum(len(self._queues.get(product, ())) for product in products)
+
+    def position(self, user_id):
+        """1-based place of a request in its product's queue, or None"""
+        product = self._products.get(user_id)
+        if product is None:
+            return None
+        for position, queued_id in enumerate(self._queues[product], 1):
+            if queued_id == user_id:
+                return position
+
+    # ---------- ETA ----------
+
+    def record_duration(self, product, seconds):
+        """Add a finished session's duration to the product's rolling average"""
+        durations = self._durations.setdefault(product, deque(maxlen=self.window))
+        total = self._duration_sums.get(product, 0.0)
+        if len(durations) == durations.maxlen:
+            total -= durations[0]
+        durations.append(seconds)
+        self._duration_sums[product] = total + seconds
+
+    def average_duration(self, product):
+        durations = self._durations.get(product)
+        if durations:
+            return self._duration_sums[product] / len(durations)
+        count = sum(len(durations) for durations in self._durations.values())
+        if count:
+            return sum(self._duration_sums.values()) / count
+        return self.default_duration
+
+    def eta_minutes(self, product, position):
+        """Estimated wait: everyone up to position served by the product's
+        sellers in parallel, one average session per slot"""
+        sellers = self.catalog.snapshot().sellers.get(product, ())
+        slots = max(1, sum(self.seller_router.session_limit(sid) for sid in sellers))
+        return math.ceil(position * self.average_duration(product) / slots / 60)
+
+    # ---------- status updates ----------
+
+    def track_status(self, user_id, message):
+        """Keep message up to date with the customer's queue position"""
+        product = self._products.get(user_id)
+        if product is None:
+            return None
+        position = self.position(user_id)
+        self._status[user_id] = (message.chat_id, message.message_id)
+        self._shown[user_id] = (position, self.eta_minutes(product, position))
+        return self._shown[user_id]
+
+    async def update_status(self, bot):
+        """Edit every status message whose position or ETA changed"""
+        for product, queue in list(self._queues.items()):
+            for position, user_id in enumerate(list(queue), 1):
+                if user_id not in self._status:
+                    continue
+                shown = (position, self.eta_minutes(product, position))
+                if shown == self._shown.get(user_id):
+                    continue
+                self._shown[user_id] = shown
+                chat_id, message_id = self._status[user_id]
+                try:
+                    await bot.edit_message_text(
+                        chat_id=chat_id, message_id=message_id,
+                        text=status_text(product, *shown),
+                        parse_mode="Markdown",
+                        rate_limit_args=PRIORITY_STATUS
+                    )
+                    self.stats["updates"] += 1
+                except Exception as e:
+                    logger.debug(f"Failed to update queue status for {user_id}: {e}")
+
+    async def run_updater(self, bot):
+        """Refresh queue status messages every update_interval seconds, forever"""
+        while True:
+            await asyncio.sleep(self.update_interval)
+            try:
+                await self.update_status(bot)
+            except Exception as e:
+                logger.error(f"Queue status update failed: {e}", exc_info=True)